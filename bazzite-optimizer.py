@@ -7,12 +7,15 @@ Dynamic Hardware-Aware Optimizations
 
 import os
 import sys
+import copy
+import functools
 import subprocess
 import logging
 import json
 import time
 import shutil
 import re
+import shlex
 from pathlib import Path
 from datetime import datetime, timedelta
 from typing import Dict, List, Tuple, Optional, Any, Union
@@ -24,6 +27,8 @@ import threading
 import signal
 import tempfile
 import statistics
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 
 # ============================================================================
 # CONFIGURATION AND CONSTANTS
@@ -41,6 +46,9 @@ CRASH_RECOVERY_DIR = Path("/var/cache/gaming-optimizer/recovery")
 PROFILE_STATE_DIR = Path("/var/lib/gaming-optimizer")
 TIMESTAMP = datetime.now().strftime("%Y%m%d_%H%M%S")
 
+# Logger configured by setup_logging(); module helpers log through it too
+LOGGER = logging.getLogger('bazzite-optimizer')
+
 # Minimum requirements
 MIN_KERNEL_VERSION = (6, 1, 0)  # For MGLRU support
 MIN_DISK_SPACE_GB = 10  # Increased for stability testing logs
@@ -1594,8 +1602,43 @@ BAZZITE_UJUST_COMMANDS = [
 # ============================================================================
 
 
+class ConsoleFormatter(logging.Formatter):
+    """Custom formatter that adds extra spaces for better visual alignment"""
+    
+    def format(self, record):
+        # Get the level name
+        levelname = record.levelname
+        
+        # Add extra spaces based on level
+        if levelname == "DEBUG":
+            formatted_level = f"{levelname}  "  # 2 extra spaces
+        elif levelname == "INFO":
+            formatted_level = f"{levelname}   "  # 3 extra spaces
+        elif levelname == "ERROR":
+            formatted_level = f"{levelname}  "  # 2 extra spaces
+        else:
+            formatted_level = levelname
+        
+        # Create the formatted message
+        return f"{formatted_level} - {record.getMessage()}"
+
+
+# Detailed formatter for file logging
+FILE_LOG_FORMATTER = logging.Formatter(
+    '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
+)
+
+
 def setup_logging() -> logging.Logger:
-    """Configure comprehensive logging system with rotation"""
+    """Configure comprehensive logging system with rotation
+
+    Safe to call more than once: later calls return the configured logger
+    instead of stacking another set of handlers on it.
+    """
+    logger = LOGGER
+    if logger.handlers:
+        return logger
+
     # Create log directory with fallback for CI/testing environments
     log_dir = ensure_directory_with_fallback(LOG_DIR, "bazzite-optimizer/logs")
     if log_dir:
@@ -1603,39 +1646,12 @@ def setup_logging() -> logging.Logger:
     else:
         log_file = None
 
-    # Create detailed formatter for file logging
-    formatter = logging.Formatter(
-        '%(asctime)s - %(name)s - %(levelname)s - %(funcName)s:%(lineno)d - %(message)s'
-    )
-
-    # Custom console formatter with improved spacing
-    class ConsoleFormatter(logging.Formatter):
-        """Custom formatter that adds extra spaces for better visual alignment"""
-        
-        def format(self, record):
-            # Get the level name
-            levelname = record.levelname
-            
-            # Add extra spaces based on level
-            if levelname == "DEBUG":
-                formatted_level = f"{levelname}  "  # 2 extra spaces
-            elif levelname == "INFO":
-                formatted_level = f"{levelname}   "  # 3 extra spaces
-            elif levelname == "ERROR":
-                formatted_level = f"{levelname}  "  # 2 extra spaces
-            else:
-                formatted_level = levelname
-            
-            # Create the formatted message
-            return f"{formatted_level} - {record.getMessage()}"
-
     # Console handler for user feedback with improved formatting
     console_handler = logging.StreamHandler()
     console_handler.setFormatter(ConsoleFormatter())
     console_handler.setLevel(logging.DEBUG)
 
     # Configure logger
-    logger = logging.getLogger('bazzite-optimizer')
     logger.setLevel(logging.DEBUG)
     logger.propagate = False  # Fix: Prevent duplicate logging to root logger
     logger.addHandler(console_handler)
@@ -1644,7 +1660,7 @@ def setup_logging() -> logging.Logger:
     if log_file:
         try:
             file_handler = logging.FileHandler(log_file)
-            file_handler.setFormatter(formatter)
+            file_handler.setFormatter(FILE_LOG_FORMATTER)
             file_handler.setLevel(logging.DEBUG)
             logger.addHandler(file_handler)
         except (PermissionError, OSError):
@@ -1740,12 +1756,12 @@ def validate_grub_changes(grub_file: Path) -> bool:
         critical_params = ['root=', 'BOOT_IMAGE=']
         for param in critical_params:
             if param not in content:
-                logging.warning(f"Critical boot parameter '{param}' missing in GRUB config")
+                LOGGER.warning(f"Critical boot parameter '{param}' missing in GRUB config")
                 return False
 
         # Validate syntax (basic check)
         if content.count('"') % 2 != 0:
-            logging.warning("Unmatched quotes in GRUB configuration")
+            LOGGER.warning("Unmatched quotes in GRUB configuration")
             return False
 
         return True
@@ -1811,6 +1827,141 @@ def print_colored(message: str, color: str = Colors.ENDC, end: str = "\n") -> No
     print(f"{color}{message}{Colors.ENDC}", end=end)
 
 
+# Characters /bin/sh would interpret; commands without any are exec'd directly
+_SHELL_META = frozenset("|&;<>()$`\\\"'*?[]{}#~%!\n")
+
+
+def _split_simple_command(command: str) -> Optional[List[str]]:
+    """argv for a command that needs no shell parsing, else None"""
+    if any(c in _SHELL_META for c in command):
+        return None
+    argv = command.split()
+    # FOO=bar cmd is an environment assignment only the shell understands
+    if not argv or "=" in argv[0]:
+        return None
+    return argv
+
+
+class ShellPool:
+    """Long-lived bash that runs short queries without a fork+exec of sh each
+
+    run() has run_command()'s return contract. Commands share one shell and
+    read stdin from /dev/null, so they must not change its state (cd,
+    export, exit); use it for read-only queries only, via query_shell().
+    """
+
+    def __init__(self):
+        self._proc: Optional[subprocess.Popen] = None
+        self._lock = threading.Lock()
+        self._token = f"__bazzite_query_done_{os.getpid()}_{id(self)}__"
+        fd, self._err_path = tempfile.mkstemp(prefix="bazzite-query-", suffix=".err")
+        os.close(fd)
+
+    def run(self, command: str, timeout: int = 30) -> Tuple[int, str, str]:
+        """Run command in the shared shell; (returncode, stdout, stderr)"""
+        with self._lock:
+            try:
+                if self._proc is None or self._proc.poll() is not None:
+                    self._proc = subprocess.Popen(
+                        ["/bin/bash", "--noprofile", "--norc"],
+                        stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                        stderr=subprocess.DEVNULL, text=True, start_new_session=True)
+                proc = self._proc
+                # The token line carries the exit status; the newline before it
+                # keeps output without a trailing newline off the token line
+                proc.stdin.write(
+                    f"{{ {command}\n}} </dev/null 2>{shlex.quote(self._err_path)}\n"
+                    f"printf '\\n%s %d\\n' {self._token} $?\n")
+                proc.stdin.flush()
+            except OSError as e:
+                self._stop()
+                return -1, "", str(e)
+
+            expired = threading.Event()
+
+            def kill() -> None:
+                expired.set()
+                self._kill_group(proc)
+
+            timer = threading.Timer(timeout, kill)
+            timer.start()
+            lines = []
+            returncode = None
+            try:
+                for line in proc.stdout:
+                    if line.startswith(self._token):
+                        returncode = int(line.split()[1])
+                        break
+                    lines.append(line)
+            finally:
+                timer.cancel()
+
+            if expired.is_set():
+                self._stop()
+                return -1, "", f"Command timed out after {timeout} seconds"
+            if returncode is None:
+                self._stop()
+                return -1, "", "Query shell exited unexpectedly"
+            with open(self._err_path) as f:
+                stderr = f.read()
+            return returncode, "".join(lines)[:-1], stderr
+
+    @staticmethod
+    def _kill_group(proc: subprocess.Popen) -> None:
+        """Kill the shell and any command it is running, which holds stdout"""
+        try:
+            os.killpg(proc.pid, signal.SIGKILL)
+        except OSError:
+            pass
+
+    def _stop(self) -> None:
+        """Kill the shell; the next run() starts a fresh one"""
+        if self._proc is not None:
+            self._kill_group(self._proc)
+            self._proc.wait()
+            self._proc = None
+
+    def close(self) -> None:
+        """Stop the shell and remove its stderr file"""
+        with self._lock:
+            self._stop()
+            try:
+                os.unlink(self._err_path)
+            except OSError:
+                pass
+
+
+# Pool that run_command() uses inside query_shell(), None outside of one.
+# Worker threads read it while query_shell() swaps it, so both hold the lock;
+# the pool runs one command at a time anyway, so holding it costs nothing.
+_QUERY_SHELL: Optional[ShellPool] = None
+_QUERY_SHELL_LOCK = threading.Lock()
+
+
+@contextmanager
+def query_shell():
+    """Run every run_command() in the block through one ShellPool
+
+    For bursts of read-only queries such as validation. Nothing in the
+    block may rely on a command changing the shell's state.
+    """
+    global _QUERY_SHELL
+    with _QUERY_SHELL_LOCK:
+        if _QUERY_SHELL is not None:
+            pool = None
+        else:
+            pool = _QUERY_SHELL = ShellPool()
+    if pool is None:
+        yield
+        return
+    try:
+        yield
+    finally:
+        with _QUERY_SHELL_LOCK:
+            _QUERY_SHELL = None
+        pool.close()
+
+
 def run_command(command: str, shell: bool = True, check: bool = True,
                 timeout: int = 30, dry_run_skip: bool = True) -> Tuple[int, str, str]:
     """Execute shell command with timeout and error handling
@@ -1836,15 +1987,22 @@ def run_command(command: str, shell: bool = True, check: bool = True,
             print_colored(f"  [DRY-RUN] Would execute: {display_cmd}", Colors.OKCYAN)
             return 0, "", ""  # Simulate success
     
+    with _QUERY_SHELL_LOCK:
+        if _QUERY_SHELL is not None:
+            return _QUERY_SHELL.run(command, timeout)
+
+    run_kwargs = dict(capture_output=True, text=True, check=check, timeout=timeout)
     try:
-        result = subprocess.run(
-            command,
-            shell=shell,
-            capture_output=True,
-            text=True,
-            check=check,
-            timeout=timeout
-        )
+        # Skip the intermediate /bin/sh when there is nothing for it to parse
+        argv = _split_simple_command(command) if shell else None
+        if argv is not None:
+            try:
+                result = subprocess.run(argv, shell=False, **run_kwargs)
+            except FileNotFoundError:
+                # Shell builtins and missing tools: let sh handle and report them
+                result = subprocess.run(command, shell=True, **run_kwargs)
+        else:
+            result = subprocess.run(command, shell=shell, **run_kwargs)
         return result.returncode, result.stdout, result.stderr
     except subprocess.TimeoutExpired:
         return -1, "", f"Command timed out after {timeout} seconds"
@@ -1854,6 +2012,68 @@ def run_command(command: str, shell: bool = True, check: bool = True,
         return -1, "", str(e)
 
 
+# Device classes and models matched against the cached lspci listing
+_LSPCI_GPU_RE = re.compile(r"^.*(?:VGA|3D|Display).*$", re.MULTILINE)
+_LSPCI_CREATIVE_RE = re.compile(r"creative", re.IGNORECASE)
+_LSPCI_INTEL_NIC_RE = re.compile(r"I225-V|Ethernet.*I225|I226", re.IGNORECASE)
+
+# check_hardware_capabilities() flags: (key, gpu_vendor value) and
+# (key, pattern searched in the lspci listing)
+_GPU_VENDOR_CAPS = (
+    ("has_nvidia", "nvidia"),
+    ("has_amd_gpu", "amd"),
+    ("has_intel_gpu", "intel"),
+)
+_LSPCI_CAPS = (
+    ("has_creative_audio", _LSPCI_CREATIVE_RE),
+    ("has_intel_nic", _LSPCI_INTEL_NIC_RE),  # I225-V etc
+)
+
+
+@functools.lru_cache(maxsize=1)
+def _lspci_output() -> str:
+    """PCI device listing, read once per run; empty if lspci is unavailable"""
+    returncode, stdout, _ = run_command("lspci", shell=False, check=False, timeout=5)
+    return stdout if returncode == 0 else ""
+
+
+# Reads made by read_sysfs_text() inside system_snapshot(), keyed by path
+_SYSTEM_SNAPSHOT: Dict[str, Optional[str]] = {}
+_snapshot_depth = 0
+
+
+@contextmanager
+def system_snapshot():
+    """Read each /proc or /sys file at most once inside the block
+
+    For read-only phases such as validation, where several checks read the
+    same files. Do not wrap code that changes the values being read (e.g.
+    applying a CPU governor); the snapshot is dropped when the outermost
+    block exits.
+    """
+    global _snapshot_depth
+    _snapshot_depth += 1
+    try:
+        yield
+    finally:
+        _snapshot_depth -= 1
+        if _snapshot_depth == 0:
+            _SYSTEM_SNAPSHOT.clear()
+
+
+def read_sysfs_text(path: str) -> Optional[str]:
+    """Read a small /proc or /sys file in-process; None if it cannot be read"""
+    if _snapshot_depth and path in _SYSTEM_SNAPSHOT:
+        return _SYSTEM_SNAPSHOT[path]
+    try:
+        text = Path(path).read_text()
+    except OSError:
+        text = None
+    if _snapshot_depth:
+        _SYSTEM_SNAPSHOT[path] = text
+    return text
+
+
 def ensure_directory_with_fallback(system_path: Path, fallback_subpath: str, 
                                   logger: Optional[logging.Logger] = None) -> Optional[Path]:
     """
@@ -1893,24 +2113,35 @@ def backup_file(filepath: Path) -> Optional[Path]:
         if backup_dir:
             try:
                 backup_path = backup_dir / f"{filepath.name}.{TIMESTAMP}"
-                shutil.copy2(filepath, backup_path)
-                logging.info(f"Backed up {filepath} to {backup_path}")
+                # Restores need the contents and mode, not timestamps or xattrs;
+                # copyfile uses sendfile(2) on Linux
+                shutil.copyfile(filepath, backup_path)
+                shutil.copymode(filepath, backup_path)
+                LOGGER.info(f"Backed up {filepath} to {backup_path}")
                 return backup_path
             except (PermissionError, OSError) as e:
-                logging.debug(f"Could not create backup for {filepath}: {e}")
+                LOGGER.debug(f"Could not create backup for {filepath}: {e}")
                 return None
         else:
-            logging.debug(f"Could not create backup directory for {filepath}")
+            LOGGER.debug(f"Could not create backup directory for {filepath}")
             return None
     return None
 
 
-def write_config_file(filepath: Path, content: str, executable: bool = False) -> bool:
-    """Write configuration file with proper permissions and backup"""
+def write_config_file(filepath: Path, content: Union[str, bytes], executable: bool = False) -> bool:
+    """Write configuration file with proper permissions and backup
+
+    The content goes to a temporary file in the same directory, which then
+    replaces filepath in one rename, so an interrupted run never leaves a
+    truncated config behind. content may be pre-encoded UTF-8 bytes, so a
+    caller writing one template to many paths encodes it only once.
+    """
     global DRY_RUN
     
     # TEAM_013: Dry-run mode - narrate without writing
     if DRY_RUN:
+        if isinstance(content, bytes):
+            content = content.decode("utf-8", errors="replace")
         mode = "executable" if executable else "config"
         print_colored(f"  [DRY-RUN] Would write {mode} file: {filepath}", Colors.OKCYAN)
         # Show first few lines of content
@@ -1928,21 +2159,33 @@ def write_config_file(filepath: Path, content: str, executable: bool = False) ->
         try:
             filepath.parent.mkdir(parents=True, exist_ok=True)
         except (PermissionError, OSError) as e:
-            logging.debug(f"Could not create parent directory for {filepath}: {e}")
+            LOGGER.debug(f"Could not create parent directory for {filepath}: {e}")
             return False
             
-        filepath.write_text(content)
-
-        if executable:
-            filepath.chmod(0o755)
-        else:
-            filepath.chmod(0o644)
+        mode = 0o755 if executable else 0o644
+        # A unique name, so concurrent writers and unrelated *.tmp files
+        # next to the target are never clobbered
+        fd, tmp_path = tempfile.mkstemp(dir=filepath.parent, prefix=filepath.name + ".")
+        try:
+            with open(fd, "wb") as f:
+                # mkstemp creates the file 0600; set the final mode exactly
+                os.fchmod(fd, mode)
+                f.write(content.encode("utf-8") if isinstance(content, str) else content)
+                f.flush()
+                os.fsync(fd)
+            os.replace(tmp_path, filepath)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            raise
 
-        logging.info(f"Created configuration file: {filepath}")
+        LOGGER.info(f"Created configuration file: {filepath}")
         return True
     except (PermissionError, OSError) as e:
         # Log permission errors as debug in CI environments
-        logging.debug(f"Could not write {filepath}: {e}")
+        LOGGER.debug(f"Could not write {filepath}: {e}")
         return False
     except Exception as e:
         # Use logger instance instead of root logger to prevent duplication
@@ -1967,8 +2210,62 @@ def get_smart_disk_space() -> int:
     return 0
 
 
+# get_system_info() results are reused for this many seconds; free disk
+# space is the only field expected to change within a run
+_SYSTEM_INFO_TTL = 60.0
+_system_info_cache: Optional[Tuple[float, Dict[str, Any]]] = None
+_system_info_lock = threading.Lock()
+
+# ID= and VARIANT_ID= values in /etc/os-release, quoted or not
+_OS_RELEASE_ID_RE = re.compile(r'^ID="?([^"\n]*)"?\s*$', re.MULTILINE)
+_OS_RELEASE_VARIANT_RE = re.compile(r'^VARIANT_ID="?([^"\n]*)"?\s*$', re.MULTILINE)
+
+
+_CPU_VENDOR_RE = re.compile(r"intel|amd", re.IGNORECASE)
+_MEMTOTAL_RE = re.compile(rb"^MemTotal:\s+(\d+)\s+kB", re.MULTILINE)
+
+
+@functools.lru_cache(maxsize=1)
+def _cpu_cores() -> int:
+    """Physical CPU cores; fixed for the life of the process"""
+    return psutil.cpu_count(logical=False) or 0
+
+
+@functools.lru_cache(maxsize=1)
+def _cpu_threads() -> int:
+    """Logical CPUs; fixed for the life of the process"""
+    return os.cpu_count() or 0
+
+
+@functools.lru_cache(maxsize=1)
+def _ram_bytes() -> int:
+    """Installed RAM from /proc/meminfo's MemTotal, via psutil if unreadable"""
+    try:
+        match = _MEMTOTAL_RE.search(Path("/proc/meminfo").read_bytes())
+    except OSError:
+        match = None
+    if match:
+        return int(match.group(1)) * 1024
+    return psutil.virtual_memory().total
+
+
 def get_system_info() -> Dict[str, Any]:
-    """Gather comprehensive system information - v4 enhanced"""
+    """Gather comprehensive system information - v4 enhanced
+
+    Probing spawns subprocesses and reads /proc, so the result is cached
+    for _SYSTEM_INFO_TTL seconds. Each caller gets its own deep copy, so
+    changing a nested list such as gpus leaves the cache untouched.
+    """
+    global _system_info_cache
+    with _system_info_lock:
+        now = time.monotonic()
+        if _system_info_cache is None or now - _system_info_cache[0] >= _SYSTEM_INFO_TTL:
+            _system_info_cache = (now, _collect_system_info())
+        return copy.deepcopy(_system_info_cache[1])
+
+
+def _collect_system_info() -> Dict[str, Any]:
+    """Probe the system for get_system_info()"""
     info = {
         "kernel": platform.release(),
         "kernel_version": tuple(map(int, re.match(r'^(\d+)\.(\d+)\.(\d+)', platform.release()).groups())) if re.match(r'^(\d+)\.(\d+)\.(\d+)', platform.release()) else (0, 0, 0),
@@ -1982,16 +2279,13 @@ def get_system_info() -> Dict[str, Any]:
 
     # Get distribution info
     try:
-        if Path("/etc/os-release").exists():
-            with open("/etc/os-release") as f:
-                lines = f.readlines()
-                for line in lines:
-                    if line.startswith("ID="):
-                        info["distribution"] = line.split("=")[1].strip().strip('"')
-                    if line.startswith("VARIANT_ID="):
-                        variant = line.split("=")[1].strip().strip('"')
-                        if variant in ["silverblue", "kinoite", "sericea", "bazzite"]:
-                            info["is_immutable"] = True
+        os_release = Path("/etc/os-release").read_text()
+        match = _OS_RELEASE_ID_RE.search(os_release)
+        if match:
+            info["distribution"] = match.group(1).strip()
+        match = _OS_RELEASE_VARIANT_RE.search(os_release)
+        if match and match.group(1).strip() in ("silverblue", "kinoite", "sericea", "bazzite"):
+            info["is_immutable"] = True
     except Exception:
         pass
 
@@ -2004,16 +2298,13 @@ def get_system_info() -> Dict[str, Any]:
 
     # Get CPU info
     info["cpu_model"] = platform.processor() or "unknown"
-    info["cpu_cores"] = psutil.cpu_count(logical=False) or 0
-    info["cpu_threads"] = psutil.cpu_count(logical=True) or 0
-    info["cpu_vendor"] = "unknown"  # Default
-    if "intel" in info["cpu_model"].lower():
-        info["cpu_vendor"] = "intel"
-    elif "amd" in info["cpu_model"].lower():
-        info["cpu_vendor"] = "amd"
+    info["cpu_cores"] = _cpu_cores()
+    info["cpu_threads"] = _cpu_threads()
+    vendor = _CPU_VENDOR_RE.search(info["cpu_model"])
+    info["cpu_vendor"] = vendor.group(0).lower() if vendor else "unknown"
 
     # Get RAM info
-    info["ram_gb"] = round(psutil.virtual_memory().total / (1024**3))
+    info["ram_gb"] = round(_ram_bytes() / (1024**3))
 
     # Get Disk info
     try:
@@ -2038,10 +2329,10 @@ def get_system_info() -> Dict[str, Any]:
             info["gpu_vendor"] = "unknown"
     except ImportError:
         # Fallback to old method if platforms module not available
-        returncode, stdout, _ = run_command("lspci | grep -E 'VGA|3D|Display'", check=False)
-        if returncode == 0:
-            info["gpus"] = stdout.strip().split("\n")
-            gpu_str = stdout.lower()
+        gpu_lines = _LSPCI_GPU_RE.findall(_lspci_output())
+        if gpu_lines:
+            info["gpus"] = gpu_lines
+            gpu_str = "\n".join(gpu_lines).lower()
             if "nvidia" in gpu_str:
                 info["gpu_vendor"] = "nvidia"
             elif "amd" in gpu_str or "ati" in gpu_str:
@@ -2049,57 +2340,54 @@ def get_system_info() -> Dict[str, Any]:
             elif "intel" in gpu_str:
                 info["gpu_vendor"] = "intel"
 
-    # Get network interfaces
-    for interface in psutil.net_if_addrs().keys():
-        if interface != "lo":
-            info["network_interfaces"].append(interface)
+    # Get network interfaces (names only, so skip psutil's per-address lookup)
+    try:
+        interfaces = sorted(os.listdir("/sys/class/net"))
+    except OSError:
+        interfaces = list(psutil.net_if_addrs())
+    info["network_interfaces"] = [name for name in interfaces if name != "lo"]
 
     # Get NVMe devices
-    returncode, stdout, _ = run_command(
-        "ls /dev/nvme* 2>/dev/null | grep -E 'nvme[0-9]n[0-9]$'", check=False)
-    if returncode == 0 and stdout.strip():
-        info["nvme_devices"] = stdout.strip().split("\n")
+    info["nvme_devices"] = sorted(str(p) for p in Path("/dev").glob("nvme[0-9]n[0-9]"))
 
     return info
 
 
 def check_hardware_capabilities() -> Dict[str, Any]:
     """Detect system hardware capabilities for dynamic profiles"""
-    system_info = get_system_info()
-    caps = {
-        "has_nvidia": system_info["gpu_vendor"] == "nvidia",
-        "has_amd_gpu": system_info["gpu_vendor"] == "amd",
-        "has_intel_gpu": system_info["gpu_vendor"] == "intel",
-        "has_nvme": len(system_info["nvme_devices"]) > 0,
-        "has_creative_audio": False,
-        "has_intel_nic": False,
-        "is_immutable": system_info["is_immutable"],
-        "resizable_bar": False,
-        "ram_gb": system_info["ram_gb"],
-        "cpu_vendor": system_info["cpu_vendor"]
-    }
-
-    # Check Creative audio
-    returncode, stdout, _ = run_command("lspci | grep -i creative", check=False)
-    if returncode == 0 and stdout:
-        caps["has_creative_audio"] = True
-
-    # Check Intel NIC (I225-V etc)
-    returncode, stdout, _ = run_command("lspci | grep -i 'I225-V\\|Ethernet.*I225\\|I226'", check=False)
-    if returncode == 0 and stdout:
-        caps["has_intel_nic"] = True
-
-    # Check Resizable BAR
-    returncode, stdout, _ = run_command(
-        "lspci -vv 2>/dev/null | grep -i 'resizable bar'", check=False)
-    if returncode == 0 and stdout and "disabled" not in stdout.lower():
-        caps["resizable_bar"] = True
-
+    # The probes are independent, so their subprocesses run side by side
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        info_future = pool.submit(get_system_info)
+        lspci_future = pool.submit(_lspci_output)
+        rebar_future = pool.submit(
+            run_command, "lspci -vv 2>/dev/null | grep -i 'resizable bar'", check=False)
+        system_info = info_future.result()
+        lspci = lspci_future.result()
+        rebar_rc, rebar_out, _ = rebar_future.result()
+
+    caps = {key: system_info["gpu_vendor"] == vendor for key, vendor in _GPU_VENDOR_CAPS}
+    caps.update((key, pattern.search(lspci) is not None) for key, pattern in _LSPCI_CAPS)
+    caps.update(
+        has_nvme=len(system_info["nvme_devices"]) > 0,
+        is_immutable=system_info["is_immutable"],
+        resizable_bar=bool(rebar_rc == 0 and rebar_out and "disabled" not in rebar_out.lower()),
+        ram_gb=system_info["ram_gb"],
+        cpu_vendor=system_info["cpu_vendor"],
+    )
     return caps
 
 
 def check_nvidia_driver_version() -> Optional[str]:
     """Check NVIDIA driver version and variant - v4 enhanced"""
+    # A loaded nvidia module publishes its version in sysfs; the procfs
+    # banner names the open kernel module variant
+    version = read_sysfs_text("/sys/module/nvidia/version")
+    if version is not None:
+        version = version.strip()
+        if "Open Kernel Module" in (read_sysfs_text("/proc/driver/nvidia/version") or ""):
+            version += " (Open)"
+        return version
+
     if not check_nvidia_gpu_exists():
         return None
 
@@ -2306,8 +2594,8 @@ class BaseOptimizer:
                 self._package_manager = self._platform_services.package_manager
             else:
                 # Fallback for backward compatibility
-                from platforms.traditional.rpm import DnfPackageManager
-                self._package_manager = DnfPackageManager()
+                from platforms.traditional.rpm import get_package_manager
+                self._package_manager = get_package_manager()
         return self._package_manager
 
     def set_profile(self, profile: str):
@@ -2508,8 +2796,8 @@ class BaseOptimizer:
         # Check if optimizations are actually applied by examining key system settings
         try:
             # Check CPU governor
-            returncode, stdout, _ = run_command("cat /sys/devices/system/cpu/cpu0/cpufreq/scaling_governor", check=False)
-            current_governor = stdout.strip() if returncode == 0 else "unknown"
+            governor = read_sysfs_text("/sys/devices/system/cpu/cpu0/cpufreq/scaling_governor")
+            current_governor = governor.strip() if governor is not None else "unknown"
             
             # Check if NVIDIA GPU optimizations are applied
             gpu_optimized = False
@@ -5618,9 +5906,9 @@ class KernelOptimizer(BaseOptimizer):
         validations = {}
 
         # Check if mitigations are disabled with improved logic
-        returncode, stdout, _ = run_command("cat /proc/cmdline", check=False)
-        if returncode == 0:
-            validations["mitigations_disabled"] = "mitigations=off" in stdout.lower()
+        cmdline = read_sysfs_text("/proc/cmdline")
+        if cmdline is not None:
+            validations["mitigations_disabled"] = "mitigations=off" in cmdline.lower()
         else:
             validations["mitigations_disabled"] = False
 
@@ -5635,8 +5923,8 @@ class KernelOptimizer(BaseOptimizer):
             self.logger.info("Removing legacy kernel parameters...")
             
             # Get current kernel parameters
-            returncode, current_params, _ = run_command("cat /proc/cmdline", check=False)
-            if returncode != 0:
+            current_params = read_sysfs_text("/proc/cmdline")
+            if current_params is None:
                 self.logger.warning("Could not read current kernel parameters")
                 return False
                 
@@ -5670,8 +5958,8 @@ class KernelOptimizer(BaseOptimizer):
             self.logger.info(f"Cleaning up parameters from previous profile: {last_profile} → {new_profile}")
             
             # Get current kernel parameters
-            returncode, current_params, _ = run_command("cat /proc/cmdline", check=False)
-            if returncode != 0:
+            current_params = read_sysfs_text("/proc/cmdline")
+            if current_params is None:
                 self.logger.warning("Could not read current kernel parameters")
                 return False
                 
@@ -6711,9 +6999,9 @@ parallel="yes"
         
         # Check critical kernel parameters
         try:
-            returncode, stdout, _ = run_command("cat /proc/cmdline", check=False)
-            if returncode == 0:
-                cmdline = stdout.strip()
+            cmdline = read_sysfs_text("/proc/cmdline")
+            if cmdline is not None:
+                cmdline = cmdline.strip()
                 validations["nvidia_drm_modeset"] = "nvidia-drm.modeset=1" in cmdline
                 validations["processor_max_cstate"] = "processor.max_cstate=1" in cmdline
                 validations["pci_realloc"] = "pci=realloc" in cmdline
@@ -7375,7 +7663,8 @@ class BazziteGamingOptimizer:
 
                 # Validate each module after application
                 if hasattr(optimizer, 'validate'):
-                    validations = optimizer.validate()
+                    with system_snapshot():
+                        validations = optimizer.validate()
                     self.validation_results[name] = validations
 
                     # Show validation status
@@ -7842,7 +8131,8 @@ Kernel Management:
         # Handle validation mode
         if args.validate:
             self.profile = args.profile
-            validations = self.validate_all_optimizations()
+            with system_snapshot(), query_shell():
+                validations = self.validate_all_optimizations()
 
             print_colored("\nValidation Results:", Colors.HEADER)
             for category, checks in validations.items():
@@ -7944,9 +8234,8 @@ Kernel Management:
     def _validate_zram_enabled(self) -> bool:
         """Validate ZRAM is enabled with Bazzite-specific detection"""
         # Method 1: Check for active ZRAM devices via /dev/zram*
-        returncode, stdout, _ = run_command("ls /dev/zram* 2>/dev/null", check=False)
-        if returncode == 0 and stdout.strip():
-            zram_devices = [line.strip() for line in stdout.strip().split('\n') if line.strip()]
+        zram_devices = list(Path("/dev").glob("zram*"))
+        if zram_devices:
             self.logger.debug(f"ZRAM validation: Found {len(zram_devices)} ZRAM devices in /dev/")
             return True
         
@@ -7968,9 +8257,8 @@ Kernel Management:
             return True
         
         # Method 5: Check for ZRAM block devices in /sys/block/
-        returncode4, stdout4, _ = run_command("ls /sys/block/zram* 2>/dev/null", check=False)
-        if returncode4 == 0 and stdout4.strip():
-            zram_blocks = stdout4.strip().split('\n')
+        zram_blocks = list(Path("/sys/block").glob("zram*"))
+        if zram_blocks:
             self.logger.debug(f"ZRAM validation: Found {len(zram_blocks)} ZRAM block devices in /sys/block/")
             return True
         
@@ -3,14 +3,50 @@ Extended Handheld Support - ROG Ally, Mobile AMD APUs, Multi-Monitor
 Comprehensive support for additional handheld devices and mobile platforms
 """
 
-import os
+import re
+import shlex
 import subprocess
 import logging
+import functools
+import glob
+import time
 from pathlib import Path
-from typing import Dict, Optional, List
-from dataclasses import dataclass
+from typing import Dict, Optional, List, Tuple
+from dataclasses import dataclass, field
 from enum import Enum
 
+from platforms.detection import which
+from platform_support.sysfs import SysfsWriter
+
+logger = logging.getLogger(__name__)
+
+
+def _run(cmd: List[str], timeout: int = 5) -> Tuple[bool, str]:
+    """Run a command without raising; returns (succeeded, stdout)"""
+    try:
+        result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout)
+    except subprocess.TimeoutExpired:
+        logger.warning(f"Timed out after {timeout}s: {' '.join(cmd)}")
+        return False, ""
+    except FileNotFoundError:
+        logger.warning(f"Command not found: {cmd[0]}")
+        return False, ""
+
+    if result.returncode != 0:
+        logger.warning(f"{' '.join(cmd)} failed ({result.returncode}): {result.stderr.strip()}")
+        return False, result.stdout
+    return True, result.stdout
+
+
+def _sudo_write_many(writes: List[Tuple[str, str]]) -> bool:
+    """Write (path, value) pairs through a single sudo shell"""
+    if not writes:
+        return True
+    script = '\n'.join(f'echo {shlex.quote(value)} > {shlex.quote(path)}'
+                       for path, value in writes)
+    ok, _ = _run(['sudo', 'sh', '-c', script], timeout=10)
+    return ok
+
 
 # ============================================================================
 # ROG Ally Support
@@ -37,34 +73,35 @@ class ROGAllyInfo:
     current_tdp: int = 15
 
 
+_sysfs = SysfsWriter()
+
+
+@functools.lru_cache(maxsize=1)
+def _dmi_product_name() -> str:
+    """Read the DMI product name (boot-stable, so read once per process)"""
+    try:
+        return Path('/sys/class/dmi/id/product_name').read_text().strip()
+    except OSError:
+        return ""
+
+
 class ROGAllyDetector:
     """Detect and identify ROG Ally hardware"""
 
     @staticmethod
     def is_rog_ally() -> bool:
         """Check if running on ROG Ally"""
-        try:
-            product_file = Path('/sys/class/dmi/id/product_name')
-            if product_file.exists():
-                product = product_file.read_text().strip()
-                return 'ROG Ally' in product or 'RC71L' in product
-        except:
-            pass
-        return False
+        product = _dmi_product_name()
+        return 'ROG Ally' in product or 'RC71L' in product
 
     @staticmethod
     def detect_model() -> ROGAllyModel:
         """Detect specific ROG Ally model"""
-        try:
-            product_file = Path('/sys/class/dmi/id/product_name')
-            if product_file.exists():
-                product = product_file.read_text().strip()
-                if 'RC72L' in product or 'Ally X' in product:
-                    return ROGAllyModel.ALLY_X
-                elif 'RC71L' in product:
-                    return ROGAllyModel.ALLY_2023
-        except:
-            pass
+        product = _dmi_product_name()
+        if 'RC72L' in product or 'Ally X' in product:
+            return ROGAllyModel.ALLY_X
+        elif 'RC71L' in product:
+            return ROGAllyModel.ALLY_2023
         return ROGAllyModel.UNKNOWN
 
 
@@ -74,6 +111,9 @@ class ROGAllyOptimizer:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
         self.info = ROGAllyInfo(model=ROGAllyDetector.detect_model())
+        # Only CPUs with a cpufreq policy expose a governor (offline cores don't)
+        self._gov_paths = sorted(
+            glob.glob('/sys/devices/system/cpu/cpu[0-9]*/cpufreq/scaling_governor'))
 
     def apply_handheld_profile(self, profile: str = "balanced") -> bool:
         """Apply ROG Ally optimized profile"""
@@ -92,27 +132,31 @@ class ROGAllyOptimizer:
 
     def _apply_tdp(self, watts: int) -> bool:
         """Set TDP via ryzenadj"""
-        try:
-            subprocess.run([
-                'sudo', 'ryzenadj',
-                f'--stapm-limit={watts * 1000}',
-                f'--fast-limit={watts * 1000}',
-                f'--slow-limit={watts * 1000}'
-            ], check=True, capture_output=True)
-            return True
-        except:
+        if not which('ryzenadj'):
             return False
+        ok, _ = _run([
+            'sudo', 'ryzenadj',
+            f'--stapm-limit={watts * 1000}',
+            f'--fast-limit={watts * 1000}',
+            f'--slow-limit={watts * 1000}'
+        ])
+        return ok
 
     def _set_cpu_governor(self, governor: str) -> bool:
-        """Set CPU governor"""
-        try:
-            for cpu in range(os.cpu_count() or 8):
-                gov_file = f'/sys/devices/system/cpu/cpu{cpu}/cpufreq/scaling_governor'
-                subprocess.run(['sudo', 'sh', '-c', f'echo {governor} > {gov_file}'],
-                             check=True, capture_output=True)
-            return True
-        except:
+        """Set CPU governor on all CPUs"""
+        if _sysfs.available() and self._gov_paths:
+            return all([_sysfs.write(f, governor) for f in self._gov_paths])
+
+        # cpupower updates every policy in a single call
+        if which('cpupower'):
+            ok, _ = _run(['sudo', 'cpupower', 'frequency-set', '-g', governor])
+            if ok:
+                return True
+
+        # Fall back to one sudo shell writing every scaling_governor file
+        if not self._gov_paths:
             return False
+        return _sudo_write_many([(f, governor) for f in self._gov_paths])
 
     def enable_120hz_display(self) -> bool:
         """Enable 120Hz display mode"""
@@ -146,16 +190,7 @@ class MobileAMDAPU:
     @staticmethod
     def detect_apu() -> Optional[str]:
         """Detect mobile AMD APU"""
-        try:
-            result = subprocess.run(['lscpu'], capture_output=True, text=True)
-            cpu_info = result.stdout
-
-            for apu_model in MobileAMDAPU.MOBILE_APUS.keys():
-                if apu_model in cpu_info:
-                    return apu_model
-        except:
-            pass
-        return None
+        return _detect_mobile_apu()
 
     @staticmethod
     def get_apu_config(apu_model: str) -> Optional[Dict]:
@@ -165,30 +200,39 @@ class MobileAMDAPU:
     @staticmethod
     def optimize_for_battery(enable: bool = True) -> bool:
         """Optimize APU for battery life"""
-        try:
-            if enable:
-                # Set CPU governor to powersave
-                subprocess.run(['sudo', 'cpupower', 'frequency-set', '-g', 'powersave'],
-                             check=True, capture_output=True)
-
-                # Set GPU power profile to low
-                gpu_profile = Path('/sys/class/drm/card0/device/power_dpm_force_performance_level')
-                if gpu_profile.exists():
-                    subprocess.run(['sudo', 'sh', '-c', f'echo low > {gpu_profile}'],
-                                 check=True, capture_output=True)
-            else:
-                # Performance mode
-                subprocess.run(['sudo', 'cpupower', 'frequency-set', '-g', 'performance'],
-                             check=True, capture_output=True)
-
-                gpu_profile = Path('/sys/class/drm/card0/device/power_dpm_force_performance_level')
-                if gpu_profile.exists():
-                    subprocess.run(['sudo', 'sh', '-c', f'echo high > {gpu_profile}'],
-                                 check=True, capture_output=True)
-            return True
-        except:
+        # Battery: powersave CPU + low GPU level; otherwise performance + high
+        governor, level = ('powersave', 'low') if enable else ('performance', 'high')
+
+        ok, _ = _run(['sudo', 'cpupower', 'frequency-set', '-g', governor])
+        if not ok:
             return False
 
+        # Set GPU power profile
+        gpu_profile = Path('/sys/class/drm/card0/device/power_dpm_force_performance_level')
+        if gpu_profile.exists():
+            if _sysfs.available():
+                return _sysfs.write(str(gpu_profile), level)
+            ok = _sudo_write_many([(str(gpu_profile), level)])
+        return ok
+
+
+# Longest names first so "Z1 Extreme" wins over "Z1" and "6800HS" over "6800H"
+_APU_RE = re.compile(r'\b(' + '|'.join(
+    re.escape(model) for model in sorted(MobileAMDAPU.MOBILE_APUS, key=len, reverse=True)
+) + r')\b')
+
+
+@functools.lru_cache(maxsize=1)
+def _detect_mobile_apu() -> Optional[str]:
+    """Scan /proc/cpuinfo for a known mobile APU (CPU model is boot-stable)"""
+    try:
+        cpu_info = Path('/proc/cpuinfo').read_text()
+    except OSError:
+        return None
+
+    match = _APU_RE.search(cpu_info)
+    return match.group(1) if match else None
+
 
 # ============================================================================
 # Multi-Monitor Gaming Profiles
@@ -203,112 +247,153 @@ class MonitorConfig:
     position: str  # e.g., "0x0"
     primary: bool = False
     gsync_compatible: bool = False
+    modes: List[Tuple[str, float]] = field(default_factory=list)  # (resolution, rate)
+
+
+# "<name> connected [primary] <WxH>+<X>+<Y> ..." lines from xrandr
+_XRANDR_OUTPUT_RE = re.compile(r'^(\S+) connected( primary)?\s+(\d+x\d+)\+(\d+\+\d+)', re.M)
+# Indented "<WxH> <rate>[*][+] ..." mode lines following an output line
+_XRANDR_MODE_RE = re.compile(r'^\s+(\d+x\d+)\S*[ \t]+(.*)$', re.M)
+# First non-indented line, which ends an output's mode list
+_XRANDR_BLOCK_END_RE = re.compile(r'^\S', re.M)
+
+
+def _parse_xrandr_modes(block: str) -> Tuple[List[Tuple[str, float]], Optional[float]]:
+    """Parse an output's mode lines into (modes, current refresh rate)"""
+    modes = []
+    current_rate = None
+    for match in _XRANDR_MODE_RE.finditer(block):
+        resolution = match.group(1)
+        for token in match.group(2).split():
+            try:
+                rate = float(token.rstrip('*+'))
+            except ValueError:
+                continue
+            modes.append((resolution, rate))
+            if '*' in token:
+                current_rate = rate
+    return modes, current_rate
 
 
 class MultiMonitorManager:
     """Manage multi-monitor gaming configurations"""
 
+    # Seconds a detect_monitors() result is reused before querying X again
+    DETECT_CACHE_TTL = 2.0
+
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        self._monitor_cache: Optional[tuple] = None  # (monotonic time, monitors)
 
-    def detect_monitors(self) -> List[MonitorConfig]:
+    def detect_monitors(self, force: bool = False) -> List[MonitorConfig]:
         """Detect connected monitors"""
-        monitors = []
+        if not force and self._monitor_cache is not None:
+            cached_at, cached = self._monitor_cache
+            if time.monotonic() - cached_at < self.DETECT_CACHE_TTL:
+                return list(cached)
 
-        try:
-            # Try X11 first
-            result = subprocess.run(['xrandr', '--query'], capture_output=True, text=True)
-
-            if result.returncode == 0:
-                current_monitor = None
-                for line in result.stdout.splitlines():
-                    if ' connected' in line:
-                        parts = line.split()
-                        name = parts[0]
-                        primary = 'primary' in line
-
-                        # Parse resolution and refresh
-                        res_info = None
-                        for part in parts:
-                            if 'x' in part and '+' in part:
-                                res_info = part
-                                break
-
-                        if res_info:
-                            resolution = res_info.split('+')[0]
-                            position = '+'.join(res_info.split('+')[1:])
-
-                            monitors.append(MonitorConfig(
-                                name=name,
-                                resolution=resolution,
-                                refresh_rate=60,  # Default
-                                position=position,
-                                primary=primary
-                            ))
-        except:
-            pass
-
-        return monitors
+        monitors = []
+        if not which('xrandr'):
+            return monitors
+
+        # Try X11 first; --current reads server state without re-probing outputs
+        ok, output = _run(['xrandr', '--current'], timeout=2)
+
+        if ok:
+            for match in _XRANDR_OUTPUT_RE.finditer(output):
+                # Mode lines run until the next non-indented line
+                block_start = output.find('\n', match.end()) + 1 or len(output)
+                block_end = _XRANDR_BLOCK_END_RE.search(output, block_start)
+                block = output[block_start:block_end.start() if block_end else len(output)]
+                modes, current_rate = _parse_xrandr_modes(block)
+
+                monitors.append(MonitorConfig(
+                    name=match.group(1),
+                    resolution=match.group(3),
+                    refresh_rate=round(current_rate) if current_rate else 60,
+                    position=match.group(4),
+                    primary=bool(match.group(2)),
+                    modes=modes
+                ))
+
+        self._monitor_cache = (time.monotonic(), monitors)
+        return list(monitors)
 
     def create_gaming_profile(self, primary_monitor: str,
                             resolution: str = "1920x1080",
                             refresh_rate: int = 144) -> bool:
         """Create gaming profile for multi-monitor setup"""
-        try:
-            # Example: Set primary monitor to high refresh for gaming
-            subprocess.run([
-                'xrandr',
-                '--output', primary_monitor,
-                '--mode', resolution,
-                '--rate', str(refresh_rate),
-                '--primary'
-            ], check=True, capture_output=True)
-            return True
-        except:
+        if not which('xrandr'):
+            return False
+        monitor = next((m for m in self.detect_monitors() if m.name == primary_monitor), None)
+        if monitor and monitor.modes and not any(
+                res == resolution and abs(rate - refresh_rate) < 0.5
+                for res, rate in monitor.modes):
+            self.logger.warning(f"Mode {resolution}@{refresh_rate}Hz not available on {primary_monitor}")
             return False
 
+        # Example: Set primary monitor to high refresh for gaming
+        ok, _ = _run([
+            'xrandr',
+            '--output', primary_monitor,
+            '--mode', resolution,
+            '--rate', str(refresh_rate),
+            '--primary'
+        ])
+        self._monitor_cache = None
+        return ok
+
     def apply_per_monitor_settings(self, monitor_settings: Dict[str, Dict]) -> bool:
         """Apply different settings to each monitor"""
-        try:
-            for monitor, settings in monitor_settings.items():
-                cmd = ['xrandr', '--output', monitor]
-
-                if 'resolution' in settings:
-                    cmd.extend(['--mode', settings['resolution']])
-                if 'refresh_rate' in settings:
-                    cmd.extend(['--rate', str(settings['refresh_rate'])])
-                if 'position' in settings:
-                    cmd.extend(['--pos', settings['position']])
-                if settings.get('primary'):
-                    cmd.append('--primary')
-
-                subprocess.run(cmd, check=True, capture_output=True)
-            return True
-        except:
+        if not which('xrandr'):
             return False
+        if not monitor_settings:
+            return True
+
+        # One xrandr call applies every output in a single screen reconfiguration
+        cmd = ['xrandr']
+        for monitor, settings in monitor_settings.items():
+            cmd.extend(['--output', monitor])
+
+            if 'resolution' in settings:
+                cmd.extend(['--mode', settings['resolution']])
+            if 'refresh_rate' in settings:
+                cmd.extend(['--rate', str(settings['refresh_rate'])])
+            if 'position' in settings:
+                cmd.extend(['--pos', settings['position']])
+            if settings.get('primary'):
+                cmd.append('--primary')
+
+        ok, _ = _run(cmd)
+        self._monitor_cache = None
+        return ok
 
     def disable_secondary_monitors_for_gaming(self) -> bool:
         """Disable secondary monitors for single-monitor gaming"""
-        try:
-            monitors = self.detect_monitors()
-            primary = next((m for m in monitors if m.primary), None)
-
-            if not primary:
-                return False
-
-            # Disable non-primary monitors
-            for monitor in monitors:
-                if not monitor.primary:
-                    subprocess.run(['xrandr', '--output', monitor.name, '--off'],
-                                 check=True, capture_output=True)
-            return True
-        except:
+        if not which('xrandr'):
+            return False
+        monitors = self.detect_monitors()
+        primary = next((m for m in monitors if m.primary), None)
+
+        if not primary:
             return False
 
+        # Disable non-primary monitors in one xrandr call
+        cmd = ['xrandr']
+        for monitor in monitors:
+            if not monitor.primary:
+                cmd.extend(['--output', monitor.name, '--off'])
+        if len(cmd) == 1:
+            return True
+
+        ok, _ = _run(cmd)
+        self._monitor_cache = None
+        return ok
+
     def restore_all_monitors(self) -> bool:
         """Restore all monitors after gaming"""
-        try:
-            subprocess.run(['xrandr', '--auto'], check=True, capture_output=True)
-            return True
-        except:
+        if not which('xrandr'):
             return False
+        ok, _ = _run(['xrandr', '--auto'])
+        self._monitor_cache = None
+        return ok
@@ -0,0 +1,49 @@
+"""
+Shared sysfs helpers for the platform support modules
+"""
+
+import os
+from typing import Dict
+
+
+class SysfsWriter:
+    """Write sysfs attributes through file descriptors kept open between calls.
+
+    Opening a sysfs attribute needs root, so this is only used when the
+    process already runs as root; otherwise callers fall back to the sudo
+    based paths, which pay a sudo + fork/exec per call instead.
+    """
+
+    def __init__(self):
+        self._fds: Dict[str, int] = {}
+
+    @staticmethod
+    def available() -> bool:
+        """Check whether direct sysfs writes are permitted"""
+        return os.geteuid() == 0
+
+    def write(self, path: str, value: str) -> bool:
+        """Write value to a sysfs attribute, reusing its cached descriptor"""
+        try:
+            fd = self._fds.get(path)
+            if fd is None:
+                fd = os.open(path, os.O_WRONLY)
+                self._fds[path] = fd
+            os.pwrite(fd, value.encode(), 0)
+            return True
+        except OSError:
+            self._discard(path)
+            return False
+
+    def _discard(self, path: str):
+        fd = self._fds.pop(path, None)
+        if fd is not None:
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+    def close(self):
+        """Close all cached descriptors"""
+        for path in list(self._fds):
+            self._discard(path)
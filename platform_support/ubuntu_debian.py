@@ -3,11 +3,15 @@ Ubuntu/Debian Platform Support
 Extends optimization support to Ubuntu and Debian distributions
 """
 
+import os
 import subprocess
 import logging
-from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from typing import List, Optional
 
+from platforms.detection import parse_os_release, which
+from platform_support.sysfs import SysfsWriter
+
 
 class UbuntuDebianOptimizer:
     """Ubuntu/Debian specific optimizations"""
@@ -16,26 +20,20 @@ class UbuntuDebianOptimizer:
         self.logger = logging.getLogger(__name__)
         self.is_ubuntu = self._detect_ubuntu()
         self.is_debian = self._detect_debian()
+        self._sysfs = SysfsWriter()
 
     def _detect_ubuntu(self) -> bool:
         """Detect if running on Ubuntu"""
-        try:
-            if Path('/etc/os-release').exists():
-                with open('/etc/os-release') as f:
-                    content = f.read()
-                    return 'Ubuntu' in content or 'ubuntu' in content.lower()
-        except:
-            pass
-        return False
+        os_info = parse_os_release()
+        return (os_info.get('ID', '').lower() == 'ubuntu'
+                or 'ubuntu' in os_info.get('ID_LIKE', '').lower().split())
 
     def _detect_debian(self) -> bool:
         """Detect if running on Debian"""
-        try:
-            if Path('/etc/debian_version').exists():
-                return True
-        except:
-            pass
-        return False
+        os_info = parse_os_release()
+        return (os_info.get('ID', '').lower() == 'debian'
+                or 'debian' in os_info.get('ID_LIKE', '').lower().split()
+                or os.path.exists('/etc/debian_version'))
 
     def is_supported(self) -> bool:
         """Check if platform is supported"""
@@ -43,24 +41,34 @@ class UbuntuDebianOptimizer:
 
     def install_package(self, package: str) -> bool:
         """Install package using apt"""
+        return self.install_packages([package])
+
+    def install_packages(self, packages: List[str]) -> bool:
+        """Install several packages in a single apt transaction"""
+        if not packages:
+            return True
         try:
+            # env keeps DEBIAN_FRONTEND across sudo so debconf never prompts
             subprocess.run(
-                ['sudo', 'apt', 'install', '-y', package],
+                ['sudo', 'env', 'DEBIAN_FRONTEND=noninteractive',
+                 'apt', 'install', '-y', *packages],
                 check=True,
-                capture_output=True
+                capture_output=True,
+                timeout=1800
             )
-            self.logger.info(f"Installed package: {package}")
+            self.logger.info(f"Installed packages: {' '.join(packages)}")
             return True
-        except subprocess.CalledProcessError as e:
-            self.logger.error(f"Failed to install {package}: {e}")
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            self.logger.error(f"Failed to install {' '.join(packages)}: {e}")
             return False
 
     def update_packages(self) -> bool:
         """Update package lists"""
         try:
-            subprocess.run(['sudo', 'apt', 'update'], check=True, capture_output=True)
+            subprocess.run(['sudo', 'apt', 'update'], check=True, capture_output=True,
+                           timeout=300)
             return True
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
             self.logger.error(f"Failed to update packages: {e}")
             return False
 
@@ -69,18 +77,37 @@ class UbuntuDebianOptimizer:
         optimizations = [
             self._optimize_kernel_parameters,
             self._optimize_cpu_governor,
-            self._optimize_io_scheduler,
-            self._install_gaming_tools
+            self._optimize_io_scheduler
         ]
 
+        # Authenticate once up front so the parallel sudo calls below reuse
+        # the cached credentials instead of racing each other for a prompt
+        try:
+            subprocess.run(['sudo', '-v'], check=True)
+        except (FileNotFoundError, subprocess.CalledProcessError) as e:
+            self.logger.error(f"Failed to obtain sudo credentials: {e}")
+            return False
+
+        # The tuning steps touch independent subsystems (sysctl, cpufreq,
+        # block queues), so run them side by side instead of back to back
+        try:
+            with ThreadPoolExecutor(max_workers=len(optimizations)) as executor:
+                futures = [executor.submit(optimization) for optimization in optimizations]
+        finally:
+            self._sysfs.close()
+
         results = []
-        for optimization in optimizations:
+        for future in futures:
             try:
-                results.append(optimization())
+                results.append(future.result())
             except Exception as e:
                 self.logger.error(f"Optimization failed: {e}")
                 results.append(False)
 
+        # apt holds the dpkg lock for the whole transaction, so it runs on
+        # its own after the tuning steps
+        results.append(self._install_gaming_tools())
+
         return all(results)
 
     def _optimize_kernel_parameters(self) -> bool:
@@ -93,44 +120,65 @@ class UbuntuDebianOptimizer:
         }
 
         try:
-            for param, value in params.items():
-                subprocess.run(
-                    ['sudo', 'sysctl', '-w', f'{param}={value}'],
-                    check=True,
-                    capture_output=True
-                )
+            # sysctl -w accepts every assignment in one invocation
+            subprocess.run(
+                ['sudo', 'sysctl', '-w',
+                 *(f'{param}={value}' for param, value in params.items())],
+                check=True,
+                capture_output=True,
+                timeout=10
+            )
             return True
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
             self.logger.error(f"Failed to set kernel parameters: {e}")
             return False
 
     def _optimize_cpu_governor(self) -> bool:
         """Set CPU governor to performance"""
+        # A single cpupower call sets every CPU policy at once
+        if not which('cpupower'):
+            self.logger.warning("cpupower not available")
+            return False
         try:
             subprocess.run(
                 ['sudo', 'cpupower', 'frequency-set', '-g', 'performance'],
                 check=True,
-                capture_output=True
+                capture_output=True,
+                timeout=10
             )
             return True
-        except (FileNotFoundError, subprocess.CalledProcessError):
-            self.logger.warning("cpupower not available")
+        except (FileNotFoundError, subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            self.logger.warning(f"Failed to set CPU governor: {e}")
             return False
 
     def _optimize_io_scheduler(self) -> bool:
         """Optimize I/O scheduler for SSDs"""
         try:
-            # Set scheduler to none for NVMe drives
-            for device in Path('/sys/block').glob('nvme*'):
-                scheduler_file = device / 'queue' / 'scheduler'
-                if scheduler_file.exists():
-                    subprocess.run(
-                        ['sudo', 'sh', '-c', f'echo none > {scheduler_file}'],
-                        check=True,
-                        capture_output=True
-                    )
+            # Set scheduler to none for NVMe drives (/sys/block lists whole disks only)
+            with os.scandir('/sys/block') as entries:
+                scheduler_files = [
+                    f'/sys/block/{entry.name}/queue/scheduler'
+                    for entry in entries if entry.name.startswith('nvme')
+                ]
+            scheduler_files = [f for f in scheduler_files if os.path.exists(f)]
+            if not scheduler_files:
+                return True
+
+            if self._sysfs.available():
+                if not all([self._sysfs.write(f, 'none') for f in scheduler_files]):
+                    self.logger.error("Failed to write I/O scheduler for every NVMe device")
+                    return False
+            else:
+                # One sudo tee covers every device
+                subprocess.run(
+                    ['sudo', 'tee', *scheduler_files],
+                    input=b'none',
+                    check=True,
+                    capture_output=True,
+                    timeout=10
+                )
             return True
-        except Exception as e:
+        except (OSError, subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
             self.logger.error(f"Failed to optimize I/O scheduler: {e}")
             return False
 
@@ -143,10 +191,7 @@ class UbuntuDebianOptimizer:
             'lutris'
         ]
 
-        for package in packages:
-            self.install_package(package)
-
-        return True
+        return self.install_packages(packages)
 
 
 class PPAManager:
@@ -155,18 +200,25 @@ class PPAManager:
     def __init__(self):
         self.logger = logging.getLogger(__name__)
 
-    def add_ppa(self, ppa: str) -> bool:
-        """Add a PPA repository"""
+    def add_ppa(self, ppa: str, update: bool = True) -> bool:
+        """Add a PPA repository
+
+        Pass update=False when adding several PPAs and refresh the package
+        index once afterwards.
+        """
         try:
             subprocess.run(
-                ['sudo', 'add-apt-repository', '-y', ppa],
+                ['sudo', 'add-apt-repository', '-y', '--no-update', ppa],
                 check=True,
-                capture_output=True
+                capture_output=True,
+                timeout=120
             )
-            subprocess.run(['sudo', 'apt', 'update'], check=True, capture_output=True)
+            if update:
+                subprocess.run(['sudo', 'apt', 'update'], check=True, capture_output=True,
+                               timeout=300)
             self.logger.info(f"Added PPA: {ppa}")
             return True
-        except subprocess.CalledProcessError as e:
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
             self.logger.error(f"Failed to add PPA {ppa}: {e}")
             return False
 
@@ -179,6 +231,15 @@ class PPAManager:
 
         results = []
         for ppa in ppas:
-            results.append(self.add_ppa(ppa))
+            results.append(self.add_ppa(ppa, update=False))
+
+        # Refresh the package index once for all added PPAs
+        if any(results):
+            try:
+                subprocess.run(['sudo', 'apt', 'update'], check=True, capture_output=True,
+                               timeout=300)
+            except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+                self.logger.error(f"Failed to update package lists: {e}")
+                return False
 
         return all(results)
@@ -6,6 +6,7 @@ Provides:
 - PlatformType: Enum of supported platform types
 - PlatformInfo: Dataclass with platform metadata
 - detect_platform(): Detect current platform
+- invalidate_detection_cache(): Forget memoized detection results
 - PackageManager: ABC for package management
 - KernelParamManager: ABC for kernel parameter management
 - PlatformServices: Factory for platform-specific implementations
@@ -15,6 +16,7 @@ from .detection import (
     PlatformType,
     PlatformInfo,
     detect_platform,
+    invalidate_detection_cache,
     # TEAM_009: eGPU support
     GPUInfo,
     detect_gpus,
@@ -42,6 +44,7 @@ __all__ = [
     "PlatformType",
     "PlatformInfo", 
     "detect_platform",
+    "invalidate_detection_cache",
     # TEAM_009: eGPU support
     "GPUInfo",
     "detect_gpus",
@@ -172,3 +172,24 @@ class KernelParamManager(ABC):
             List of pending params, or None if same as current
         """
         pass
+
+
+def _param_name(param: str) -> str:
+    """Name part of a kernel parameter ("mitigations" for "mitigations=off")."""
+    return param.split("=", 1)[0]
+
+
+def _dedup_merge(current: List[str], new: List[str]) -> List[str]:
+    """
+    Merge kernel parameters, letting new ones replace same-named current ones.
+    
+    Current parameters whose names are not in new keep their order (including
+    repeated names such as several console= entries); new parameters follow,
+    one per name with the last value winning. Runs in O(len(current) + len(new)).
+    """
+    incoming = {}
+    for param in new:
+        incoming[_param_name(param)] = param
+    merged = [p for p in current if _param_name(p) not in incoming]
+    merged.extend(incoming.values())
+    return merged
@@ -9,14 +9,21 @@ Detects the current Linux distribution and determines:
 - Special features (ujust availability)
 """
 
+import bisect
+import functools
 import subprocess
 import shutil
+from collections import namedtuple
+from array import array
 from enum import Enum, auto
-from dataclasses import dataclass
+from dataclasses import dataclass, replace
 from pathlib import Path
-from typing import Dict, List, Optional
+from typing import Dict, List, Mapping, Optional, Tuple
 import logging
 import os
+import re
+import shlex
+import types
 
 
 class PlatformType(Enum):
@@ -36,7 +43,7 @@ GPU_VENDORS = {
 }
 
 
-@dataclass
+@dataclass(frozen=True)
 class GPUInfo:
     """TEAM_009: GPU information for eGPU and multi-GPU support."""
     card_path: str              # /sys/class/drm/card0
@@ -48,10 +55,11 @@ class GPUInfo:
     is_primary: bool            # True if selected for gaming
     is_rendering: bool          # True if actively rendering
     driver: Optional[str]       # "nvidia", "nouveau", "amdgpu", "i915"
+    pci_slot: str = ""          # "0000:01:00.0"
 
 
 # TEAM_013: GPU capability profiles by generation
-@dataclass
+@dataclass(frozen=True)
 class NvidiaGPUCapabilities:
     """TEAM_013: NVIDIA GPU capabilities for dynamic optimization."""
     generation: str             # "ampere", "ada", "blackwell", "turing", "pascal", "unknown"
@@ -109,8 +117,53 @@ NVIDIA_GENERATIONS = {
     },
 }
 
+# Architecture codes like GA106, AD102, GB203, TU116, GP104
+_NVIDIA_ARCH_RE = re.compile(r'\b(G[ABP]\d{3}|TU\d{3}|AD\d{3})\b')
 
-@dataclass
+# Flattened, immutable view of NVIDIA_GENERATIONS used by classification
+NvidiaGenSpec = namedtuple(
+    "NvidiaGenSpec", "name prefixes patterns safe_core safe_mem safe_power"
+)
+_NV_GENS = tuple(
+    NvidiaGenSpec(
+        gen_name,
+        tuple(gen_data["prefixes"]),
+        tuple(pattern.upper() for pattern in gen_data["name_patterns"]),
+        gen_data["safe_core_offset"],
+        gen_data["safe_mem_offset"],
+        gen_data["safe_power_limit"],
+    )
+    for gen_name, gen_data in NVIDIA_GENERATIONS.items()
+)
+# Conservative limits for GPUs matching no known generation
+_NV_UNKNOWN_GEN = NvidiaGenSpec("unknown", (), (), 100, 300, 105)
+
+# Lookup tables: architecture prefix (e.g. "GA1") to generation, and name
+# patterns longest first so "GTX 16" wins over "GTX 1"
+_ARCH_PREFIX_TO_GEN = {prefix: spec for spec in _NV_GENS for prefix in spec.prefixes}
+_NAME_PATTERNS_SORTED = tuple(sorted(
+    ((pattern, spec) for spec in _NV_GENS for pattern in spec.patterns),
+    key=lambda item: len(item[0]),
+    reverse=True,
+))
+
+# Typical VRAM (MB) and TDP (W) per GeForce model number, used when the
+# driver cannot be queried
+_SKU_VRAM_MB = {
+    "3060": 12288, "3070": 8192, "3080": 10240, "3090": 24576,
+    "4060": 8192, "4070": 12288, "4080": 16384, "4090": 24576,
+}
+_SKU_TDP_WATTS = {
+    "3060": 170, "3070": 220, "3080": 320, "3090": 350,
+    "4060": 115, "4070": 200, "4080": 320, "4090": 450,
+    "5080": 360, "5090": 575,
+}
+_SKU_RE = re.compile(r'(?<!\d)([2-5]0[5-9]0)(?!\d)')
+# Explicit memory size in the marketing name, e.g. "RTX 3080 12GB"
+_VRAM_GB_RE = re.compile(r'(?<!\d)(\d{1,2})\s*GB\b', re.IGNORECASE)
+
+
+@dataclass(frozen=True)
 class CPUTopology:
     """TEAM_012: CPU topology information for hybrid CPU support."""
     total_cores: int            # Physical cores
@@ -197,7 +250,7 @@ INTEL_I225_DEVICE_IDS = [
 ]
 
 
-@dataclass
+@dataclass(frozen=True)
 class PlatformInfo:
     """Platform metadata collected during detection."""
     platform_type: PlatformType
@@ -209,55 +262,271 @@ class PlatformInfo:
     boot_method: str       # "rpm-ostree-kargs", "grub", "systemd-boot"
 
 
-def _parse_os_release() -> Dict[str, str]:
-    """Parse /etc/os-release into a dictionary."""
-    result = {}
-    os_release = Path("/etc/os-release")
-    if os_release.exists():
-        with open(os_release) as f:
-            for line in f:
-                line = line.strip()
-                if "=" in line:
-                    key, _, value = line.partition("=")
-                    result[key] = value.strip('"')
-    return result
+@functools.lru_cache(maxsize=None)
+def which(tool: str) -> Optional[str]:
+    """Cached shutil.which(); tool locations do not change during a run."""
+    return shutil.which(tool)
 
 
-def _check_rpm_ostree_deployment() -> bool:
-    """Check if system has an rpm-ostree deployment."""
-    if not shutil.which("rpm-ostree"):
+@functools.lru_cache(maxsize=1)
+def parse_os_release(path: str = "/etc/os-release") -> Mapping[str, str]:
+    """
+    Parse /etc/os-release into a read-only mapping.
+    
+    Cached, since the file is boot-stable; the mapping is shared by every
+    caller, so it cannot be modified.
+    """
+    result: Dict[str, str] = {}
+    try:
+        # The file is tiny; one raw read avoids the buffered text-IO stack
+        fd = os.open(path, os.O_RDONLY)
+        try:
+            data = os.read(fd, 65536)
+        finally:
+            os.close(fd)
+    except OSError:
+        return types.MappingProxyType(result)
+
+    text = data.decode("utf-8", "replace")
+    try:
+        # os-release uses shell quoting rules (quotes, backslash escapes, comments)
+        lexer = shlex.shlex(text, posix=True)
+        lexer.whitespace_split = True
+        for token in lexer:
+            key, sep, value = token.partition("=")
+            if sep:
+                result[key] = value
+    except ValueError:
+        # Unbalanced quotes: fall back to a plain line split
+        result.clear()
+        for line in text.splitlines():
+            line = line.strip()
+            if "=" in line and not line.startswith("#"):
+                key, _, value = line.partition("=")
+                result[key] = value.strip('"')
+    return types.MappingProxyType(result)
+
+
+@functools.lru_cache(maxsize=2)
+def _check_rpm_ostree_deployment(verify: bool = False) -> bool:
+    """
+    Check if system has an rpm-ostree deployment.
+    
+    Normally answered from the filesystem alone. With verify=True and no
+    boot marker, rpm-ostree itself is asked whether a deployment exists
+    (slow: goes through D-Bus).
+    """
+    if not which("rpm-ostree"):
         return False
+    # ostree creates this marker when it boots a deployment
+    if os.path.isfile("/run/ostree-booted"):
+        return True
+    # ostree systems always have a deployment directory (/ostree links to /sysroot/ostree)
+    has_deploy_dir = (os.path.isdir("/sysroot/ostree/deploy")
+                      or os.path.isdir("/ostree/deploy"))
+    if not verify or not has_deploy_dir:
+        return has_deploy_dir
     try:
         result = subprocess.run(
             ["rpm-ostree", "status", "--json"],
             capture_output=True,
-            timeout=10
+            timeout=3
         )
         return result.returncode == 0 and b"deployments" in result.stdout
     except (subprocess.TimeoutExpired, FileNotFoundError):
         return False
 
 
+@functools.lru_cache(maxsize=2)
 def _detect_boot_method(is_immutable: bool) -> str:
     """Detect how kernel parameters are configured."""
     if is_immutable:
         return "rpm-ostree-kargs"
-    if Path("/etc/default/grub").exists():
+    if os.path.isfile("/etc/default/grub"):
         return "grub"
-    if Path("/boot/loader/entries").exists():
+    if os.path.isdir("/boot/loader/entries"):
         return "systemd-boot"
     return "unknown"
 
 
+def _read_sysfs_small(path, size: int = 64) -> Optional[str]:
+    """
+    Read a short sysfs attribute with one raw read, stripped of whitespace.
+    
+    Skips the buffered text-IO stack of Path.read_text(); sysfs attributes
+    are single values well under a page. Returns None if unreadable.
+    """
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        return os.read(fd, size).strip().decode("utf-8", "replace")
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+
+
 # TEAM_012: CPU Topology Detection
 
+def _parse_cpumask(path: Path) -> List[int]:
+    """Parse a sysfs CPU list such as "0-15" or "16-23,24" into CPU IDs."""
+    text = _read_sysfs_small(path, 4096)
+    if text is None:
+        return []
+    
+    cpus = []
+    try:
+        for part in text.split(","):
+            if not part:
+                continue
+            if "-" in part:
+                start, _, end = part.partition("-")
+                cpus.extend(range(int(start), int(end) + 1))
+            else:
+                cpus.append(int(part))
+    except ValueError:
+        return []
+    return cpus
+
+
+# CPUID leaf 0x1A EAX[31:24] core types on Intel hybrid parts
+_CPUID_CORE_TYPE_ATOM = 0x20
+_CPUID_CORE_TYPE_CORE = 0x40
+
+
+def _cpuid(cpu_id: int, leaf: int, subleaf: int = 0) -> Optional[Tuple[int, int, int, int]]:
+    """
+    Execute CPUID on a specific CPU through the kernel's cpuid driver.
+    
+    /dev/cpu/N/cpuid runs the instruction on CPU N for us (the file offset
+    selects leaf/subleaf), so no affinity pinning or native code is needed.
+    Requires the cpuid module and root; returns None when unavailable.
+    """
+    try:
+        fd = os.open(f"/dev/cpu/{cpu_id}/cpuid", os.O_RDONLY)
+    except OSError:
+        return None
+    try:
+        data = os.pread(fd, 16, (subleaf << 32) | leaf)
+    except OSError:
+        return None
+    finally:
+        os.close(fd)
+    if len(data) != 16:
+        return None
+    return tuple(int.from_bytes(data[i:i + 4], "little") for i in range(0, 16, 4))
+
+
+def _detect_hybrid_from_cpuid(online_cpus: List[int]) -> Optional[Tuple[List[int], List[int]]]:
+    """Split CPUs into (P-cores, E-cores) using CPUID leaf 0x1A, or None."""
+    if not online_cpus:
+        return None
+    leaf0 = _cpuid(online_cpus[0], 0x0)
+    if leaf0 is None or leaf0[0] < 0x1A:
+        return None
+    # CPUID.07H:EDX[15] is the hybrid flag
+    leaf7 = _cpuid(online_cpus[0], 0x7)
+    if leaf7 is None or not leaf7[3] & (1 << 15):
+        return None
+    
+    p_cores, e_cores = [], []
+    for cpu_id in online_cpus:
+        regs = _cpuid(cpu_id, 0x1A)
+        if regs is None:
+            return None
+        core_type = regs[0] >> 24
+        if core_type == _CPUID_CORE_TYPE_CORE:
+            p_cores.append(cpu_id)
+        elif core_type == _CPUID_CORE_TYPE_ATOM:
+            e_cores.append(cpu_id)
+    
+    if not (p_cores and e_cores):
+        return None
+    return p_cores, e_cores
+
+
+def _count_physical_cores(online_cpus: List[int]) -> int:
+    """
+    Count physical cores as unique (package, core) pairs.
+    
+    Uses the "physical id" / "core id" fields of /proc/cpuinfo, falling back
+    to sysfs topology files where those fields are absent (e.g. ARM).
+    Returns 0 if neither source is readable.
+    """
+    cores = set()
+    try:
+        with open("/proc/cpuinfo") as f:
+            package = core = None
+            for line in f:
+                if line.startswith("physical id"):
+                    package = line.partition(":")[2].strip()
+                elif line.startswith("core id"):
+                    core = line.partition(":")[2].strip()
+                elif not line.strip():
+                    if core is not None:
+                        cores.add((package, core))
+                    package = core = None
+            if core is not None:
+                cores.add((package, core))
+    except OSError:
+        pass
+    if cores:
+        return len(cores)
+    
+    for cpu_id in online_cpus:
+        topology = f"/sys/devices/system/cpu/cpu{cpu_id}/topology"
+        package = _read_sysfs_small(f"{topology}/physical_package_id")
+        core = _read_sysfs_small(f"{topology}/core_id")
+        if package is not None and core is not None:
+            cores.add((package, core))
+    return len(cores)
+
+
+def _read_cpu_max_freqs(cpu_ids: List[int],
+                        base: str = "/sys/devices/system/cpu") -> Dict[int, int]:
+    """
+    Read cpuinfo_max_freq (kHz) for each CPU.
+    
+    Files are opened relative to one directory fd and read with a single
+    pread, so each CPU costs one short openat/pread/close instead of a full
+    path walk. CPUs without cpufreq are omitted.
+    """
+    freqs = {}
+    try:
+        dir_fd = os.open(base, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return freqs
+    try:
+        for cpu_id in cpu_ids:
+            try:
+                fd = os.open(f"cpu{cpu_id}/cpufreq/cpuinfo_max_freq", os.O_RDONLY,
+                             dir_fd=dir_fd)
+            except OSError:
+                continue
+            try:
+                freqs[cpu_id] = int(os.pread(fd, 32, 0))
+            except (OSError, ValueError):
+                pass
+            finally:
+                os.close(fd)
+    finally:
+        os.close(dir_fd)
+    return freqs
+
+
 def detect_cpu_topology() -> CPUTopology:
     """
     TEAM_012: Detect CPU topology including hybrid P-core/E-core architecture.
     
     For Intel Alder Lake and newer hybrid CPUs, identifies:
-    - P-cores (Performance): Higher max frequency
-    - E-cores (Efficiency): Lower max frequency
+    - P-cores (Performance): listed in /sys/devices/cpu_core/cpus
+    - E-cores (Efficiency): listed in /sys/devices/cpu_atom/cpus
+    
+    Kernels without those PMU entries (containers, older kernels) fall
+    back to CPUID leaf 0x1A via /dev/cpu/N/cpuid, then to comparing max
+    frequencies (E-cores clock noticeably lower).
     
     Returns CPUTopology with recommended cores to isolate for gaming.
     """
@@ -265,13 +534,11 @@ def detect_cpu_topology() -> CPUTopology:
     
     cpu_path = Path("/sys/devices/system/cpu")
     
-    # Get total CPUs
-    online_cpus = []
-    for cpu_dir in sorted(cpu_path.glob("cpu[0-9]*")):
-        cpu_name = cpu_dir.name
-        if cpu_name.startswith("cpu") and cpu_name[3:].isdigit():
-            cpu_id = int(cpu_name[3:])
-            online_cpus.append(cpu_id)
+    # Get total CPUs: the kernel's online list is one read; the scheduler
+    # affinity mask covers systems where sysfs is not mounted
+    online_cpus = _parse_cpumask(cpu_path / "online")
+    if not online_cpus:
+        online_cpus = sorted(os.sched_getaffinity(0))
     
     total_threads = len(online_cpus)
     if total_threads == 0:
@@ -282,28 +549,33 @@ def detect_cpu_topology() -> CPUTopology:
         )
     
     # Get physical core count
-    try:
-        import psutil
-        total_cores = psutil.cpu_count(logical=False) or total_threads
-    except ImportError:
-        total_cores = total_threads
+    total_cores = _count_physical_cores(online_cpus) or total_threads
+    
+    # The kernel exports the authoritative P/E split for hybrid Intel CPUs
+    online_set = set(online_cpus)
+    p_cores = [c for c in _parse_cpumask(Path("/sys/devices/cpu_core/cpus")) if c in online_set]
+    e_cores = [c for c in _parse_cpumask(Path("/sys/devices/cpu_atom/cpus")) if c in online_set]
+    is_hybrid = bool(p_cores and e_cores)
+    
+    if not is_hybrid and not (os.path.exists("/sys/devices/cpu_core")
+                              or os.path.exists("/sys/devices/cpu_atom")):
+        cpuid_split = _detect_hybrid_from_cpuid(online_cpus)
+        if cpuid_split:
+            p_cores, e_cores = cpuid_split
+            is_hybrid = True
+    
+    if is_hybrid:
+        logger.info(f"Detected hybrid CPU: P-cores={p_cores}, E-cores={e_cores}")
+    else:
+        p_cores = []
+        e_cores = []
     
-    # Detect hybrid architecture by checking max frequencies
+    # Fallback: detect hybrid architecture by checking max frequencies
     cpu_freqs = {}
-    for cpu_id in online_cpus:
-        freq_file = cpu_path / f"cpu{cpu_id}" / "cpufreq" / "cpuinfo_max_freq"
-        if freq_file.exists():
-            try:
-                freq = int(freq_file.read_text().strip())
-                cpu_freqs[cpu_id] = freq
-            except (ValueError, IOError):
-                pass
+    if not is_hybrid:
+        cpu_freqs = _read_cpu_max_freqs(online_cpus)
     
     # Determine if hybrid based on frequency variance
-    p_cores = []
-    e_cores = []
-    is_hybrid = False
-    
     if cpu_freqs:
         freqs = list(cpu_freqs.values())
         max_freq = max(freqs)
@@ -355,17 +627,33 @@ def detect_thunderbolt_devices() -> List[str]:
     tb_path = Path("/sys/bus/thunderbolt/devices")
     if tb_path.exists():
         for device in tb_path.iterdir():
-            name_file = device / "device_name"
-            if name_file.exists():
-                try:
-                    name = name_file.read_text().strip()
-                    if name:
-                        devices.append(name)
-                except Exception:
-                    pass
+            name = _read_sysfs_small(str(device / "device_name"), 256)
+            if name:
+                devices.append(name)
     return devices
 
 
+THUNDERBOLT_DEVICES_PATH = "/sys/bus/thunderbolt/devices"
+_EGPU_ENCLOSURE_KEYWORDS = ("core", "egpu", "breakaway")
+
+
+def _has_egpu_enclosure() -> bool:
+    """TEAM_009: True if any Thunderbolt device name looks like an eGPU enclosure."""
+    try:
+        entries = os.scandir(THUNDERBOLT_DEVICES_PATH)
+    except OSError:
+        return False
+    with entries:
+        for entry in entries:
+            name = _read_sysfs_small(os.path.join(entry.path, "device_name"), 256)
+            if name is None:
+                continue
+            name = name.lower()
+            if any(keyword in name for keyword in _EGPU_ENCLOSURE_KEYWORDS):
+                return True
+    return False
+
+
 def _get_gpu_name_from_lspci(pci_slot: str) -> str:
     """TEAM_009: Get GPU name from lspci output."""
     try:
@@ -383,8 +671,123 @@ def _get_gpu_name_from_lspci(pci_slot: str) -> str:
     return "Unknown"
 
 
-def _get_active_rendering_gpu() -> Optional[str]:
-    """TEAM_009: Detect which GPU is actively rendering (for Q3:C)."""
+# TEAM_009: PCI ID database locations (hwdata on Fedora, pciutils on Debian)
+PCI_IDS_PATHS = ("/usr/share/hwdata/pci.ids", "/usr/share/misc/pci.ids")
+
+
+# Vendors whose device names _load_pci_ids() keeps
+_GPU_VENDOR_IDS = frozenset(int(vendor_id, 16) for vendor_id in GPU_VENDORS)
+
+
+@functools.lru_cache(maxsize=1)
+def _load_pci_ids() -> Tuple[array, List[str]]:
+    """
+    TEAM_009: Load GPU device names from the PCI ID database.
+    
+    Returns parallel sequences: a sorted array of (vendor << 16 | device)
+    keys and the matching device names. Packing the IDs into one machine
+    integer keeps the table compact compared with a dict of tuple keys.
+    Only device lines of GPU_VENDORS are kept; other vendors' blocks,
+    subsystem entries (two tabs) and everything after the last GPU vendor
+    are skipped, and the file is streamed rather than read whole. Both
+    sequences are empty when no database is installed.
+    """
+    for path in PCI_IDS_PATHS:
+        try:
+            f = open(path, encoding="utf-8", errors="replace")
+        except OSError:
+            continue
+        
+        entries = []
+        vendor = None
+        pending = set(_GPU_VENDOR_IDS)
+        with f:
+            for line in f:
+                if line.startswith("\t"):
+                    if vendor is None or line.startswith("\t\t"):
+                        continue
+                    device_id, _, name = line[1:].partition("  ")
+                    try:
+                        entries.append((vendor << 16 | int(device_id, 16), name.strip()))
+                    except ValueError:
+                        pass
+                    continue
+                if not line.strip() or line.startswith("#"):
+                    continue
+                if not pending or line.startswith("C "):
+                    break  # Past the last GPU vendor (vendors are sorted by ID)
+                try:
+                    vendor = int(line[:4], 16)
+                except ValueError:
+                    vendor = None
+                    continue
+                if vendor in pending:
+                    pending.discard(vendor)
+                else:
+                    vendor = None
+        entries.sort(key=lambda entry: entry[0])
+        return array("L", [key for key, _ in entries]), [name for _, name in entries]
+    return array("L"), []
+
+
+def _lookup_pci_name(vendor_id: str, device_id: str) -> Optional[str]:
+    """TEAM_009: Binary-search pci.ids for a "0x10de"/"0x2504" style ID pair."""
+    try:
+        key = int(vendor_id, 16) << 16 | int(device_id, 16)
+    except ValueError:
+        return None
+    keys, names = _load_pci_ids()
+    index = bisect.bisect_left(keys, key)
+    if index < len(keys) and keys[index] == key:
+        return names[index]
+    return None
+
+
+def _get_gpu_name(vendor_id: str, device_id: str, pci_slot: str) -> str:
+    """TEAM_009: Resolve a GPU name from pci.ids, falling back to lspci."""
+    name = _lookup_pci_name(vendor_id, device_id)
+    if name:
+        return name
+    return _get_gpu_name_from_lspci(pci_slot) if pci_slot else "Unknown"
+
+
+DRM_CLASS_PATH = "/sys/class/drm"
+
+
+def _scan_drm_class() -> Tuple[List[str], List[str]]:
+    """
+    TEAM_009: List /sys/class/drm in one pass.
+    
+    Returns (cards, connectors): card nodes such as "card0" in numeric order,
+    and connector nodes such as "card0-DP-1" sorted by name.
+    """
+    cards = []
+    connectors = []
+    try:
+        with os.scandir(DRM_CLASS_PATH) as entries:
+            for entry in entries:
+                name = entry.name
+                if not name.startswith("card"):
+                    continue
+                if name[4:].isdigit():
+                    cards.append(name)
+                elif "-" in name:
+                    connectors.append(name)
+    except OSError:
+        pass
+    cards.sort(key=lambda name: int(name[4:]))
+    connectors.sort()
+    return cards, connectors
+
+
+def _get_active_rendering_gpu(connectors: Optional[List[str]] = None) -> Optional[str]:
+    """
+    TEAM_009: Detect which GPU is actively rendering (for Q3:C).
+    
+    Args:
+        connectors: DRM connector names from _scan_drm_class(); scanned here
+            when not supplied.
+    """
     logger = logging.getLogger(__name__)
     
     # Method 1: Check DRI_PRIME environment
@@ -394,21 +797,15 @@ def _get_active_rendering_gpu() -> Optional[str]:
         return f"card{dri_prime}" if dri_prime.isdigit() else dri_prime
     
     # Method 2: Check which card has connected displays
-    drm_path = Path("/sys/class/drm")
-    for card_dir in sorted(drm_path.glob("card[0-9]*")):
-        if "-" not in card_dir.name:  # Skip card0-DP-1 etc
-            continue
-        status_file = card_dir / "status"
-        if status_file.exists():
-            try:
-                status = status_file.read_text().strip()
-                if status == "connected":
-                    # Extract card number from card0-DP-1
-                    card_name = card_dir.name.split("-")[0]
-                    logger.debug(f"Found connected display on {card_name}")
-                    return card_name
-            except Exception:
-                pass
+    if connectors is None:
+        connectors = _scan_drm_class()[1]
+    for connector in connectors:
+        status = _read_sysfs_small(f"{DRM_CLASS_PATH}/{connector}/status")
+        if status == "connected":
+            # Extract card number from card0-DP-1
+            card_name = connector.split("-")[0]
+            logger.debug(f"Found connected display on {card_name}")
+            return card_name
     
     # Method 3: Check /proc/driver/nvidia for NVIDIA
     nvidia_proc = Path("/proc/driver/nvidia/gpus")
@@ -420,6 +817,57 @@ def _get_active_rendering_gpu() -> Optional[str]:
     return None
 
 
+def _read_uevent(device_path: Path) -> Dict[str, str]:
+    """TEAM_009: Parse a sysfs device's uevent file (KEY=value lines)."""
+    result = {}
+    try:
+        text = (device_path / "uevent").read_text()
+    except OSError:
+        return result
+    for line in text.splitlines():
+        key, sep, value = line.partition("=")
+        if sep:
+            result[key] = value
+    return result
+
+
+# TEAM_009: Intel Thunderbolt controller PCIe bridge device IDs (Alpine Ridge,
+# Titan Ridge, Goshen Ridge), as found upstream of an eGPU inside its enclosure
+_THUNDERBOLT_BRIDGE_IDS = frozenset({
+    "0x1576", "0x1578", "0x15c0", "0x15d3", "0x15da",
+    "0x15e7", "0x15ea", "0x15ef", "0x0b26",
+})
+_PCI_ADDRESS_RE = re.compile(r'^[0-9a-f]{4}:[0-9a-f]{2}:[0-9a-f]{2}\.[0-7]$')
+
+
+def _pci_device_is_behind_thunderbolt(device_path: Path) -> bool:
+    """
+    TEAM_009: Check whether a PCI device sits behind a Thunderbolt link.
+    
+    The kernel marks devices below an external-facing port as "removable";
+    failing that, the upstream bridges are walked looking for an Intel
+    Thunderbolt controller.
+    """
+    def read(path: Path) -> str:
+        return _read_sysfs_small(path) or ""
+    
+    try:
+        resolved = device_path.resolve()
+    except OSError:
+        return False
+    if read(resolved / "removable") == "removable":
+        return True
+    
+    for bridge in resolved.parents:
+        if not _PCI_ADDRESS_RE.match(bridge.name):
+            break  # Reached the PCI root (e.g. /sys/devices/pci0000:00)
+        if (read(bridge / "class").startswith("0x0604")
+                and read(bridge / "vendor") == "0x8086"
+                and read(bridge / "device") in _THUNDERBOLT_BRIDGE_IDS):
+            return True
+    return False
+
+
 def detect_gpus() -> List[GPUInfo]:
     """
     TEAM_009: Detect all GPUs with detailed info.
@@ -430,65 +878,54 @@ def detect_gpus() -> List[GPUInfo]:
     - Whether it's actively rendering
     - Driver in use
     
+    The scan runs once per process; see invalidate_detection_cache().
+    
     Returns:
         List of GPUInfo objects, sorted with primary GPU first
     """
+    return list(_detect_gpus_cached())
+
+
+@functools.lru_cache(maxsize=1)
+def _detect_gpus_cached() -> Tuple[GPUInfo, ...]:
+    return tuple(_detect_gpus_uncached())
+
+
+def _detect_gpus_uncached() -> List[GPUInfo]:
+    """Scan /sys/class/drm for GPUs (uncached implementation of detect_gpus)."""
     logger = logging.getLogger(__name__)
     gpus = []
-    thunderbolt_devices = detect_thunderbolt_devices()
-    has_egpu_enclosure = any(
-        "core" in d.lower() or "egpu" in d.lower() or "breakaway" in d.lower()
-        for d in thunderbolt_devices
-    )
+    has_egpu_enclosure = _has_egpu_enclosure()
     
-    active_gpu = _get_active_rendering_gpu()
-    drm_path = Path("/sys/class/drm")
+    # One directory pass serves both the card list and the connector status scan
+    cards, connectors = _scan_drm_class()
+    active_gpu = _get_active_rendering_gpu(connectors)
     
-    for card_dir in sorted(drm_path.glob("card[0-9]")):
+    for card_name in cards:
+        card_dir = Path(DRM_CLASS_PATH, card_name)
         device_path = card_dir / "device"
         if not device_path.exists():
             continue
         
-        # Read vendor and device IDs
-        vendor_file = device_path / "vendor"
-        device_file = device_path / "device"
-        driver_link = device_path / "driver"
-        
         try:
-            vendor_id = vendor_file.read_text().strip() if vendor_file.exists() else ""
-            device_id = device_file.read_text().strip() if device_file.exists() else ""
+            # uevent carries vendor:device, bound driver and PCI slot in one read
+            uevent = _read_uevent(device_path)
+            vendor_hex, _, device_hex = uevent.get("PCI_ID", "").partition(":")
+            vendor_id = f"0x{vendor_hex.lower()}" if vendor_hex else ""
+            device_id = f"0x{device_hex.lower()}" if device_hex else ""
             vendor = GPU_VENDORS.get(vendor_id, "unknown")
+            driver = uevent.get("DRIVER")
+            pci_slot = uevent.get("PCI_SLOT_NAME", "")
             
-            # Get driver name
-            driver = None
-            if driver_link.exists():
-                driver = driver_link.resolve().name
-            
-            # Get PCI slot for name lookup
-            pci_slot = ""
-            uevent_file = device_path / "uevent"
-            if uevent_file.exists():
-                for line in uevent_file.read_text().splitlines():
-                    if line.startswith("PCI_SLOT_NAME="):
-                        pci_slot = line.split("=")[1]
-                        break
+            name = _get_gpu_name(vendor_id, device_id, pci_slot)
             
-            name = _get_gpu_name_from_lspci(pci_slot) if pci_slot else "Unknown"
-            
-            # Determine if eGPU: discrete GPU + Thunderbolt enclosure present
-            # High PCI bus numbers (>0x10) often indicate external
-            is_egpu = False
-            if has_egpu_enclosure and vendor in ("nvidia", "amd"):
-                # Check PCI bus number - eGPUs typically have high bus numbers
-                # PCI slot format: domain:bus:device.function (e.g., 0000:3c:00.0)
-                if pci_slot:
-                    try:
-                        parts = pci_slot.split(":")
-                        if len(parts) >= 2:
-                            bus_num = int(parts[1], 16)  # [1] is bus, not [0] (domain)
-                            is_egpu = bus_num > 0x10  # External buses are usually > 16
-                    except (ValueError, IndexError):
-                        pass
+            # Determine if eGPU: discrete GPU + Thunderbolt enclosure present,
+            # confirmed by the PCI topology above the device
+            is_egpu = (
+                has_egpu_enclosure
+                and vendor in ("nvidia", "amd")
+                and _pci_device_is_behind_thunderbolt(device_path)
+            )
             
             # Check if this is the active rendering GPU
             is_rendering = (active_gpu == card_dir.name or 
@@ -511,7 +948,8 @@ def detect_gpus() -> List[GPUInfo]:
                 is_egpu=is_egpu,
                 is_primary=is_primary,
                 is_rendering=is_rendering,
-                driver=driver
+                driver=driver,
+                pci_slot=pci_slot
             )
             gpus.append(gpu)
             logger.debug(f"Detected GPU: {gpu}")
@@ -532,12 +970,11 @@ def detect_gpus() -> List[GPUInfo]:
     
     # If no GPU marked primary, mark first discrete as primary
     if gpus and not any(g.is_primary for g in gpus):
-        for gpu in gpus:
-            if gpu.vendor in ("nvidia", "amd"):
-                gpu.is_primary = True
-                break
-        else:
-            gpus[0].is_primary = True
+        index = next(
+            (i for i, g in enumerate(gpus) if g.vendor in ("nvidia", "amd")),
+            0,
+        )
+        gpus[index] = replace(gpus[index], is_primary=True)
     
     return gpus
 
@@ -559,133 +996,117 @@ def detect_nvidia_capabilities(gpu: GPUInfo = None) -> Optional[NvidiaGPUCapabil
     then returns appropriate safe overclock limits and capabilities.
     
     Args:
-        gpu: Optional GPUInfo. If None, detects primary GPU.
+        gpu: Optional GPUInfo. If None, detects primary GPU (cached per process).
+            Callers that only have a device name can use _classify_nvidia().
         
     Returns:
         NvidiaGPUCapabilities with generation-appropriate limits, or None if not NVIDIA.
     """
-    logger = logging.getLogger(__name__)
-    
     if gpu is None:
-        gpu = get_primary_gpu()
+        return _detect_primary_nvidia_capabilities()
+    return _detect_nvidia_capabilities_uncached(gpu)
+
+
+@functools.lru_cache(maxsize=1)
+def _detect_primary_nvidia_capabilities() -> Optional[NvidiaGPUCapabilities]:
+    return _detect_nvidia_capabilities_uncached(get_primary_gpu())
+
+
+def _get_nvidia_vram_mb(pci_slot: str) -> int:
+    """TEAM_013: Total VRAM in MB for the NVIDIA GPU at pci_slot, or 0 if unknown."""
+    try:
+        return _query_nvidia_vram_mb(pci_slot)
+    except Exception:
+        return 0
+
+
+@functools.lru_cache(maxsize=None)
+def _query_nvidia_vram_mb(pci_slot: str) -> int:
+    """
+    Ask nvidia-smi for the VRAM of one GPU (all GPUs when the slot is unknown).
+    
+    Cached per slot so nvidia-smi is spawned at most once per GPU. Failures
+    raise instead of returning, and lru_cache does not cache exceptions, so
+    a transient nvidia-smi error is retried on the next call.
+    """
+    cmd = ["nvidia-smi", "--query-gpu=memory.total", "--format=csv,noheader,nounits"]
+    if pci_slot:
+        cmd += ["-i", pci_slot]
+    result = subprocess.run(cmd, capture_output=True, timeout=5, check=True)
+    return int(result.stdout.decode().strip().split('\n')[0])
+
+
+def _detect_nvidia_capabilities_uncached(gpu: Optional[GPUInfo]) -> Optional[NvidiaGPUCapabilities]:
+    """Classify an NVIDIA GPU (uncached implementation of detect_nvidia_capabilities)."""
+    logger = logging.getLogger(__name__)
     
     if gpu is None or gpu.vendor != "nvidia":
         return None
     
+    caps = _classify_nvidia(gpu.name, _get_nvidia_vram_mb(gpu.pci_slot) or None)
+    
+    if caps.generation == "unknown":
+        logger.warning(f"Unknown NVIDIA generation for {gpu.name}, using conservative limits")
+    logger.info(f"Detected NVIDIA {caps.generation.upper()} GPU: {gpu.name} "
+                f"({caps.architecture_code}), VRAM: {caps.vram_mb}MB, "
+                f"safe OC: +{caps.safe_core_offset_max}MHz core, "
+                f"+{caps.safe_mem_offset_max}MHz mem")
+    
+    return caps
+
+
+def _classify_nvidia(name: str, vram_mb: Optional[int] = None) -> NvidiaGPUCapabilities:
+    """
+    TEAM_013: Derive NVIDIA capabilities from the device name alone.
+    
+    Pure lookup with no sysfs or subprocess access, for callers that already
+    hold the GPU name (e.g. from an earlier detect_gpus()).
+    
+    Args:
+        name: Device name such as "GA106 [GeForce RTX 3060]".
+        vram_mb: Known VRAM in MB; estimated from the name when None.
+    """
     # Extract architecture code from name (e.g., "GA106" from "GA106 [GeForce RTX 3060]")
     arch_code = ""
-    name_upper = gpu.name.upper()
+    name_upper = name.upper()
     
-    # Look for architecture patterns like GA106, AD102, GB203, TU116, GP104
-    import re
-    arch_match = re.search(r'\b(G[ABP]\d{3}|TU\d{3}|AD\d{3})\b', name_upper)
+    arch_match = _NVIDIA_ARCH_RE.search(name_upper)
     if arch_match:
         arch_code = arch_match.group(1)
     
     # Detect generation from architecture code or name
-    detected_gen = "unknown"
-    gen_info = None
-    
-    for gen_name, gen_data in NVIDIA_GENERATIONS.items():
-        # Check architecture prefix
-        for prefix in gen_data["prefixes"]:
-            if arch_code.startswith(prefix):
-                detected_gen = gen_name
-                gen_info = gen_data
-                break
-        if gen_info:
-            break
-        
-        # Check name patterns
-        for pattern in gen_data["name_patterns"]:
-            if pattern.upper() in name_upper:
-                detected_gen = gen_name
-                gen_info = gen_data
-                break
-        if gen_info:
-            break
-    
-    # Get VRAM from nvidia-smi
-    vram_mb = 0
-    try:
-        result = subprocess.run(
-            ["nvidia-smi", "--query-gpu=memory.total", "--format=csv,noheader,nounits"],
-            capture_output=True, timeout=5
+    gen = _ARCH_PREFIX_TO_GEN.get(arch_code[:3])
+    if gen is None:
+        gen = next(
+            (spec for pattern, spec in _NAME_PATTERNS_SORTED if pattern in name_upper),
+            _NV_UNKNOWN_GEN,
         )
-        if result.returncode == 0:
-            vram_mb = int(result.stdout.decode().strip().split('\n')[0])
-    except Exception:
-        # Estimate from GPU name
-        if "3060" in gpu.name:
-            vram_mb = 12288
-        elif "3070" in gpu.name:
-            vram_mb = 8192
-        elif "3080" in gpu.name:
-            vram_mb = 10240 if "10" in gpu.name else 12288
-        elif "3090" in gpu.name:
-            vram_mb = 24576
-        elif "4060" in gpu.name:
-            vram_mb = 8192
-        elif "4070" in gpu.name:
-            vram_mb = 12288
-        elif "4080" in gpu.name:
-            vram_mb = 16384
-        elif "4090" in gpu.name:
-            vram_mb = 24576
-        else:
-            vram_mb = 8192  # Conservative default
     
-    # Use generation-specific limits or conservative defaults
-    if gen_info:
-        safe_core = gen_info["safe_core_offset"]
-        safe_mem = gen_info["safe_mem_offset"]
-        safe_power = gen_info["safe_power_limit"]
-    else:
-        # Conservative defaults for unknown GPUs
-        safe_core = 100
-        safe_mem = 300
-        safe_power = 105
-        logger.warning(f"Unknown NVIDIA generation for {gpu.name}, using conservative limits")
+    sku_match = _SKU_RE.search(name)
+    sku = sku_match.group(1) if sku_match else ""
+    
+    if not vram_mb:
+        # Estimate from GPU name (conservative 8GB default)
+        size_match = _VRAM_GB_RE.search(name)
+        if size_match:
+            vram_mb = int(size_match.group(1)) * 1024
+        else:
+            vram_mb = _SKU_VRAM_MB.get(sku, 8192)
     
     # Estimate TDP from GPU class
-    tdp = 170  # Default
-    if "3060" in gpu.name:
-        tdp = 170
-    elif "3070" in gpu.name:
-        tdp = 220
-    elif "3080" in gpu.name:
-        tdp = 320
-    elif "3090" in gpu.name:
-        tdp = 350
-    elif "4060" in gpu.name:
-        tdp = 115
-    elif "4070" in gpu.name:
-        tdp = 200
-    elif "4080" in gpu.name:
-        tdp = 320
-    elif "4090" in gpu.name:
-        tdp = 450
-    elif "5080" in gpu.name:
-        tdp = 360
-    elif "5090" in gpu.name:
-        tdp = 575
-    
-    caps = NvidiaGPUCapabilities(
-        generation=detected_gen,
+    tdp = _SKU_TDP_WATTS.get(sku, 170)
+    
+    return NvidiaGPUCapabilities(
+        generation=gen.name,
         architecture_code=arch_code or "unknown",
         vram_mb=vram_mb,
-        safe_core_offset_max=safe_core,
-        safe_mem_offset_max=safe_mem,
-        safe_power_limit_max=safe_power,
-        supports_resizable_bar=detected_gen in ("ampere", "ada", "blackwell"),
+        safe_core_offset_max=gen.safe_core,
+        safe_mem_offset_max=gen.safe_mem,
+        safe_power_limit_max=gen.safe_power,
+        supports_resizable_bar=gen.name in ("ampere", "ada", "blackwell"),
         supports_nvenc=True,  # All modern NVIDIA GPUs support NVENC
         tdp_watts=tdp
     )
-    
-    logger.info(f"Detected NVIDIA {detected_gen.upper()} GPU: {gpu.name} ({arch_code}), "
-                f"VRAM: {vram_mb}MB, safe OC: +{safe_core}MHz core, +{safe_mem}MHz mem")
-    
-    return caps
 
 
 def detect_cpu_capabilities() -> CPUCapabilities:
@@ -844,11 +1265,9 @@ def detect_nic_capabilities() -> Optional[NICCapabilities]:
         # Get PCI device ID
         pci_id = None
         device_id_path = device_path / "device"
-        if device_id_path.exists():
-            try:
-                pci_id = device_id_path.read_text().strip().replace("0x", "")
-            except Exception:
-                pass
+        device_id = _read_sysfs_small(device_id_path)
+        if device_id:
+            pci_id = device_id.replace("0x", "")
         
         # Determine vendor and capabilities
         is_intel = driver in ("igc", "e1000e", "igb", "ixgbe", "i40e")
@@ -886,6 +1305,7 @@ def detect_nic_capabilities() -> Optional[NICCapabilities]:
     return None
 
 
+@functools.lru_cache(maxsize=1)
 def detect_platform() -> PlatformInfo:
     """
     Detect the current platform and return metadata.
@@ -898,6 +1318,11 @@ def detect_platform() -> PlatformInfo:
     - Boot configuration method
     - Special features like ujust
     
+    None of these can change while the process runs, so the result is
+    computed once and shared; use invalidate_detection_cache() to force
+    a re-detection (e.g. in tests), which also drops the cached os-release,
+    boot method and tool lookups it is built from.
+    
     Returns:
         PlatformInfo with all detected metadata
     
@@ -907,9 +1332,9 @@ def detect_platform() -> PlatformInfo:
         >>> if info.is_immutable:
         ...     print("Using rpm-ostree for packages")
     """
-    os_info = _parse_os_release()
+    os_info = parse_os_release()
     is_immutable = _check_rpm_ostree_deployment()
-    has_ujust = shutil.which("ujust") is not None
+    has_ujust = which("ujust") is not None
     
     distro_name = os_info.get("NAME", "Unknown")
     distro_version = os_info.get("VERSION_ID", "")
@@ -932,9 +1357,9 @@ def detect_platform() -> PlatformInfo:
     else:
         platform_type = PlatformType.UNKNOWN
         # Try to detect package manager
-        if shutil.which("dnf"):
+        if which("dnf"):
             package_manager = "dnf"
-        elif shutil.which("apt"):
+        elif which("apt"):
             package_manager = "apt"
         else:
             package_manager = "unknown"
@@ -950,3 +1375,32 @@ def detect_platform() -> PlatformInfo:
         package_manager=package_manager,
         boot_method=boot_method
     )
+
+
+def invalidate_detection_cache() -> None:
+    """
+    Forget all memoized detection results.
+    
+    Platform and hardware detection is cached for the life of the process
+    because it cannot change between calls; call this after hot-plugging
+    hardware (e.g. an eGPU) or in tests that fake the system state.
+    """
+    for cached in (
+        which,
+        parse_os_release,
+        _check_rpm_ostree_deployment,
+        _detect_boot_method,
+        detect_platform,
+        _detect_gpus_cached,
+        _detect_primary_nvidia_capabilities,
+        _load_pci_ids,
+        _query_nvidia_vram_mb,
+    ):
+        cached.cache_clear()
+
+
+def __getattr__(name: str):
+    """Provide PLATFORM lazily so importing this module never probes the system."""
+    if name == "PLATFORM":
+        return detect_platform()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
@@ -1,6 +1,6 @@
 # TEAM_005: Immutable system implementations (rpm-ostree based)
 """Implementations for immutable Linux distributions (Bazzite, Silverblue, Kinoite, Aurora)."""
 
-from .rpm_ostree import RpmOstreeKernelParams, RpmOstreePackageManager
+from .rpm_ostree import RpmOstreeKernelParams, RpmOstreePackageManager, run_batch
 
-__all__ = ["RpmOstreeKernelParams", "RpmOstreePackageManager"]
+__all__ = ["RpmOstreeKernelParams", "RpmOstreePackageManager", "run_batch"]
@@ -15,13 +15,313 @@ Key features:
 - Proper error handling for immutable system constraints
 """
 
-import json
+import asyncio
+import ctypes
+import functools
 import logging
+import os
+import re
+import select
 import subprocess
+import threading
 import time
-from typing import List, Optional
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
 
-from ..base import KernelParamManager, PackageManager
+from ..base import KernelParamManager, PackageManager, _dedup_merge, _param_name
+from ..detection import which
+
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    from json import loads as _json_loads
+
+try:
+    from jeepney import DBusAddress, Properties
+    from jeepney.io.blocking import open_dbus_connection
+    from jeepney.wrappers import unwrap_msg
+    JEEPNEY_AVAILABLE = True
+except ImportError:
+    JEEPNEY_AVAILABLE = False
+
+
+# rpm-ostreed keeps a transaction file here while a transaction is running
+TRANSACTION_DIR = "/run/rpm-ostree"
+TRANSACTION_FILE = f"{TRANSACTION_DIR}/transaction"
+
+# Paths whose mtimes change whenever a deployment is staged or a transaction
+# starts/ends; used to invalidate the cached `rpm-ostree status --json`
+_STATUS_WATCH_PATHS = ("/ostree/deploy", TRANSACTION_FILE)
+
+# inotify(7) event mask: transaction file written, replaced or removed
+_IN_CLOSE_WRITE = 0x008
+_IN_MOVED_TO = 0x080
+_IN_DELETE = 0x200
+_TRANSACTION_EVENTS = _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_DELETE
+
+# rpm-ostreed's error when another client's transaction is still running
+_TRANSACTION_BUSY = b"Transaction in progress"
+
+# Benign failures, matched against raw stderr bytes
+_NO_SUCH_KEY_RE = re.compile(rb"No such key")
+_ALREADY_RE = re.compile(rb"already|nothing to do", re.I)
+_NOT_LAYERED_RE = re.compile(rb"not currently", re.I)
+
+# Upper bound on a single event wait, so a missed event only costs a re-check
+_MAX_EVENT_WAIT = 5.0
+
+# rpm-ostreed's Sysroot object; its ActiveTransaction property is empty when idle
+_SYSROOT_BUS_NAME = "org.projectatomic.rpmostree1"
+_SYSROOT_PATH = "/org/projectatomic/rpmostree1/Sysroot"
+_SYSROOT_INTERFACE = "org.projectatomic.rpmostree1.Sysroot"
+
+# Key only present in the status output when a deployment is mid-transaction
+_TRANSACTION_KEY = b'"transaction-in-progress"'
+
+# Last status: mtimes of _STATUS_WATCH_PATHS, monotonic timestamp, raw
+# stdout and the parsed form (filled lazily, on first use)
+_status_cache: Dict[str, Any] = {"mtime": None, "ts": 0.0, "raw": None, "data": None}
+
+
+def _run_query(argv: List[str], timeout: float) -> subprocess.CompletedProcess:
+    """
+    Run a short read-only command and capture its output.
+    
+    With an absolute executable and close_fds=False, subprocess starts the
+    child with posix_spawn(3) instead of fork+exec and skips closing every
+    inherited descriptor. Nothing leaks: Python's own descriptors are
+    non-inheritable (PEP 446).
+    """
+    return subprocess.run(
+        [which(argv[0]) or argv[0]] + argv[1:],
+        capture_output=True,
+        timeout=timeout,
+        close_fds=False
+    )
+
+
+def _status_mtime() -> tuple:
+    """Snapshot the mtimes of the paths that change with deployment state."""
+    mtimes = []
+    for path in _STATUS_WATCH_PATHS:
+        try:
+            mtimes.append(os.stat(path).st_mtime_ns)
+        except OSError:
+            mtimes.append(None)
+    return tuple(mtimes)
+
+
+def _get_status_raw(max_age: float = 0.5, timeout: int = 10) -> Optional[bytes]:
+    """
+    Return raw `rpm-ostree status --json` output, reusing a recent result.
+    
+    A cached result is reused while it is younger than max_age seconds and
+    the deployment directory and transaction file are unchanged. Returns
+    None if rpm-ostree exits non-zero; subprocess errors propagate.
+    """
+    mtime = _status_mtime()
+    now = time.monotonic()
+    if (_status_cache["raw"] is not None
+            and _status_cache["mtime"] == mtime
+            and now - _status_cache["ts"] < max_age):
+        return _status_cache["raw"]
+    
+    result = _run_query(["rpm-ostree", "status", "--json"], timeout=timeout)
+    if result.returncode != 0:
+        return None
+    _status_cache.update(mtime=mtime, ts=now, raw=result.stdout, data=None)
+    return result.stdout
+
+
+def _get_status_json(max_age: float = 0.5, timeout: int = 10) -> Optional[Dict[str, Any]]:
+    """
+    Return parsed `rpm-ostree status --json`, reusing a recent result.
+    
+    Same caching as _get_status_raw(); the output is parsed at most once
+    per query. JSON errors propagate.
+    """
+    raw = _get_status_raw(max_age, timeout)
+    if raw is None:
+        return None
+    return _parse_status(raw)
+
+
+def _parse_status(raw: bytes) -> Dict[str, Any]:
+    """Parse status output, memoized alongside the cached raw bytes."""
+    if _status_cache["raw"] is raw and _status_cache["data"] is not None:
+        return _status_cache["data"]
+    data = _json_loads(raw)
+    if _status_cache["raw"] is raw:
+        _status_cache["data"] = data
+    return data
+
+
+# System bus connection reused for the lifetime of the process; jeepney's
+# blocking connection is not thread-safe, so queries hold _dbus_lock
+_dbus: Dict[str, Any] = {"conn": None}
+_dbus_lock = threading.Lock()
+
+# rpm-ostreed runs one transaction at a time; concurrent callers in this
+# process queue here instead of colliding with "Transaction in progress"
+_transaction_lock = threading.Lock()
+
+
+def _dbus_transaction_active(timeout: float = 10) -> Optional[bool]:
+    """
+    Ask rpm-ostreed over D-Bus whether a transaction is running.
+    
+    Reads the Sysroot ActiveTransaction property on a persistent system bus
+    connection. Returns None if jeepney is not installed or the daemon
+    cannot be reached, so callers fall back to `rpm-ostree status`.
+    """
+    if not JEEPNEY_AVAILABLE:
+        return None
+    with _dbus_lock:
+        try:
+            if _dbus["conn"] is None:
+                _dbus["conn"] = open_dbus_connection(bus="SYSTEM")
+            address = DBusAddress(_SYSROOT_PATH, bus_name=_SYSROOT_BUS_NAME,
+                                  interface=_SYSROOT_INTERFACE)
+            reply = _dbus["conn"].send_and_get_reply(
+                Properties(address).get("ActiveTransaction"), timeout=timeout
+            )
+            _signature, (method, _sender, _path) = unwrap_msg(reply)[0]
+        except Exception:
+            _close_dbus()
+            return None
+    return bool(method)
+
+
+def _close_dbus() -> None:
+    """Drop the system bus connection; the next query reconnects."""
+    conn, _dbus["conn"] = _dbus["conn"], None
+    if conn is not None:
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+def _status_idle() -> bool:
+    """
+    Whether rpm-ostree answers and no deployment is mid-transaction.
+    
+    rpm-ostreed is asked over D-Bus when possible. Otherwise the status
+    output is used; the usual idle output never mentions
+    "transaction-in-progress", so it is only parsed when that key is present.
+    """
+    active = _dbus_transaction_active()
+    if active is not None:
+        return not active
+    raw = _get_status_raw()
+    if raw is None:
+        return False
+    if _TRANSACTION_KEY not in raw:
+        return True
+    return not _transaction_in_progress(_parse_status(raw))
+
+
+def _invalidate_status_cache() -> None:
+    """Drop the cached status after this process changed the deployment."""
+    _status_cache["raw"] = None
+    _status_cache["data"] = None
+
+
+def _run_transaction(
+    cmd: List[str],
+    timeout: int,
+    ensure_ready: Callable[[], bool],
+) -> subprocess.CompletedProcess:
+    """
+    Run a mutating rpm-ostree command, waiting out a concurrent transaction.
+    
+    The command is tried directly; only if rpm-ostreed rejects it with
+    "Transaction in progress" is ensure_ready() used to wait for the other
+    transaction, after which the command is retried once. Commands from
+    several threads of this process run one at a time, but the wait happens
+    outside the lock, so threads waiting on a busy daemon wait together.
+    """
+    cmd = [which(cmd[0]) or cmd[0]] + cmd[1:]
+    with _transaction_lock:
+        result = subprocess.run(cmd, capture_output=True, timeout=timeout)
+        _invalidate_status_cache()
+    if result.returncode != 0 and _TRANSACTION_BUSY in (result.stderr or b""):
+        ensure_ready()
+        with _transaction_lock:
+            result = subprocess.run(cmd, capture_output=True, timeout=timeout)
+            _invalidate_status_cache()
+    return result
+
+
+async def _in_thread(func: Callable[..., Any], *args: Any) -> Any:
+    """Run a blocking call on the default executor (asyncio.to_thread on 3.9+)."""
+    return await asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+
+def run_batch(*operations: Awaitable[Any]) -> List[Any]:
+    """
+    Run several async rpm-ostree operations together from synchronous code.
+    
+    Their waits for a busy daemon overlap instead of adding up; the transactions
+    themselves still run one after another, as rpm-ostreed requires.
+    
+    Example:
+        >>> kp, pm = RpmOstreeKernelParams(), RpmOstreePackageManager()
+        >>> run_batch(kp.append_params_async(["nowatchdog"]), pm.install_async(["htop"]))
+        [True, True]
+    """
+    async def gather() -> List[Any]:
+        return list(await asyncio.gather(*operations))
+    return asyncio.run(gather())
+
+
+@functools.lru_cache(maxsize=1)
+def _libc() -> Optional[ctypes.CDLL]:
+    """libc handle if it provides inotify, else None."""
+    try:
+        libc = ctypes.CDLL(None, use_errno=True)
+    except OSError:
+        return None
+    if not hasattr(libc, "inotify_init1"):
+        return None
+    return libc
+
+
+def _wait_for_transaction(timeout: float) -> None:
+    """
+    Block until the rpm-ostree transaction file changes or timeout passes.
+    
+    Uses inotify on /run/rpm-ostree so a finished transaction is noticed
+    immediately; falls back to a one-second sleep where inotify or the
+    directory is unavailable. With no transaction file to watch, it still
+    waits up to a second so a caller whose status check says busy does not
+    poll in a tight loop.
+    """
+    libc = _libc()
+    fd = -1
+    if libc is not None and os.path.isdir(TRANSACTION_DIR):
+        fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        time.sleep(min(timeout, 1.0))
+        return
+    try:
+        if libc.inotify_add_watch(fd, TRANSACTION_DIR.encode(), _TRANSACTION_EVENTS) < 0:
+            time.sleep(min(timeout, 1.0))
+            return
+        # No file to watch for removal (the transaction may have ended before
+        # the watch was in place, or the daemon is busy without one): wake
+        # on the next change in the directory, but at most a second later
+        if not os.path.exists(TRANSACTION_FILE):
+            select.select([fd], [], [], min(timeout, 1.0))
+            return
+        select.select([fd], [], [], min(timeout, _MAX_EVENT_WAIT))
+    finally:
+        os.close(fd)
+
+
+def _transaction_in_progress(status: Dict[str, Any]) -> bool:
+    """Check if any deployment has a transaction in progress."""
+    return any(d.get("transaction-in-progress", False)
+               for d in status.get("deployments", []))
 
 
 class RpmOstreeKernelParams(KernelParamManager):
@@ -41,40 +341,41 @@ class RpmOstreeKernelParams(KernelParamManager):
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        # Booted kernel args, cleared whenever this instance changes them
+        self._params_cache: Optional[List[str]] = None
     
     def _ensure_ready(self, timeout_seconds: int = 60) -> bool:
         """Ensure rpm-ostree is ready for operations."""
-        for _ in range(timeout_seconds):
+        deadline = time.monotonic() + timeout_seconds
+        while True:
             try:
-                result = subprocess.run(
-                    ["rpm-ostree", "status", "--json"],
-                    capture_output=True,
-                    timeout=10
-                )
-                if result.returncode == 0:
-                    status = json.loads(result.stdout)
-                    # Check if any deployment has a transaction in progress
-                    deployments = status.get("deployments", [])
-                    if not any(d.get("transaction-in-progress", False) for d in deployments):
-                        return True
-                time.sleep(1)
-            except (subprocess.TimeoutExpired, json.JSONDecodeError, Exception) as e:
+                if _status_idle():
+                    return True
+            except (subprocess.SubprocessError, OSError, ValueError) as e:
                 self.logger.debug(f"Waiting for rpm-ostree: {e}")
-                time.sleep(1)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            _wait_for_transaction(remaining)
         
         self.logger.warning("rpm-ostree transaction timeout, attempting reset")
-        subprocess.run(["systemctl", "restart", "rpm-ostreed"], capture_output=True, timeout=30)
+        subprocess.run([which("systemctl") or "systemctl", "restart", "rpm-ostreed"], capture_output=True, timeout=30)
         time.sleep(5)
         return True
     
     def get_current_params(self) -> List[str]:
         """Get current kernel parameters from rpm-ostree."""
+        if self._params_cache is None:
+            params = self._read_current_params()
+            if not params:
+                return params  # Possibly a failed read; don't cache it
+            self._params_cache = params
+        return list(self._params_cache)
+    
+    def _read_current_params(self) -> List[str]:
+        """Query rpm-ostree for the current kernel parameters."""
         try:
-            result = subprocess.run(
-                ["rpm-ostree", "kargs"],
-                capture_output=True,
-                timeout=30
-            )
+            result = _run_query(["rpm-ostree", "kargs"], timeout=30)
             if result.returncode == 0 and result.stdout:
                 # Parse output - each line may contain params
                 params = []
@@ -85,11 +386,7 @@ class RpmOstreeKernelParams(KernelParamManager):
                 return params
             
             # Fallback to rpm-ostree status
-            result = subprocess.run(
-                ["rpm-ostree", "status"],
-                capture_output=True,
-                timeout=30
-            )
+            result = _run_query(["rpm-ostree", "status"], timeout=30)
             if result.returncode == 0:
                 import re
                 match = re.search(r'Kernel arguments:\s*(.+)', result.stdout.decode())
@@ -104,29 +401,24 @@ class RpmOstreeKernelParams(KernelParamManager):
         if not params:
             return True
         
-        if not self._ensure_ready():
-            self.logger.error("rpm-ostree not ready")
-            return False
-        
-        # Get current params for deduplication
-        current = set(self.get_current_params())
-        
-        # Build append arguments, deduplicating by param name
-        append_args = []
-        for param in params:
-            param_name = param.split("=")[0]
-            # Remove existing param with same name from current set
-            current = {p for p in current if not p.startswith(param_name + "=") and p != param_name}
-            append_args.append(f"--append-if-missing={param}")
+        # Deduplicate by param name: same-named current values are replaced
+        current = self.get_current_params()
+        merged = _dedup_merge(current, params)
+        kept = set(merged)
+        current_set = set(current)
+        delete_args = [f"--delete-if-present={p}" for p in current if p not in kept]
+        append_args = [f"--append-if-missing={p}" for p in merged if p not in current_set]
         
-        if not append_args:
+        if not append_args and not delete_args:
+            self.logger.debug(f"Kernel params already applied: {', '.join(params)}")
             return True
         
-        cmd = ["rpm-ostree", "kargs"] + append_args
+        cmd = ["rpm-ostree", "kargs"] + delete_args + append_args
         self.logger.info(f"Appending kernel params: {', '.join(params)}")
         
         try:
-            result = subprocess.run(cmd, capture_output=True, timeout=120)
+            result = _run_transaction(cmd, 120, self._ensure_ready)
+            self._params_cache = None
             if result.returncode != 0:
                 self.logger.error(f"rpm-ostree kargs failed: {result.stderr.decode()}")
                 return False
@@ -138,25 +430,36 @@ class RpmOstreeKernelParams(KernelParamManager):
             self.logger.error(f"Failed to append params: {e}")
             return False
     
+    async def append_params_async(self, params: List[str]) -> bool:
+        """append_params() without blocking the event loop; see run_batch()."""
+        return await _in_thread(self.append_params, params)
+    
     def remove_params(self, params: List[str]) -> bool:
         """Remove kernel parameters via rpm-ostree kargs."""
         if not params:
             return True
         
-        if not self._ensure_ready():
-            return False
+        # A booted system always has kernel args, so an empty list means the
+        # read failed and rpm-ostree has to decide
+        current = self.get_current_params()
+        if current:
+            present = set(current) | {_param_name(p) for p in current}
+            params = [param for param in params if param in present]
+            if not params:
+                self.logger.debug("Kernel params to remove are not set")
+                return True
         
         delete_args = [f"--delete={param}" for param in params]
         cmd = ["rpm-ostree", "kargs"] + delete_args
         self.logger.info(f"Removing kernel params: {', '.join(params)}")
         
         try:
-            result = subprocess.run(cmd, capture_output=True, timeout=120)
+            result = _run_transaction(cmd, 120, self._ensure_ready)
+            self._params_cache = None
             if result.returncode != 0:
                 # Some params may not exist, which is okay
-                stderr = result.stderr.decode()
-                if "No such key" not in stderr:
-                    self.logger.error(f"rpm-ostree kargs delete failed: {stderr}")
+                if not _NO_SUCH_KEY_RE.search(result.stderr):
+                    self.logger.error(f"rpm-ostree kargs delete failed: {result.stderr.decode()}")
                     return False
             return True
         except Exception as e:
@@ -165,14 +468,17 @@ class RpmOstreeKernelParams(KernelParamManager):
     
     def replace_param(self, old: str, new: str) -> bool:
         """Replace a kernel parameter."""
-        if not self._ensure_ready():
-            return False
+        current = self.get_current_params()
+        if [p for p in current if _param_name(p) == _param_name(new)] == [new]:
+            self.logger.debug(f"Kernel param already set: {new}")
+            return True
         
         old_name = old.split("=")[0]
         cmd = ["rpm-ostree", "kargs", f"--replace={old_name}={new.split('=')[-1]}"]
         
         try:
-            result = subprocess.run(cmd, capture_output=True, timeout=120)
+            result = _run_transaction(cmd, 120, self._ensure_ready)
+            self._params_cache = None
             if result.returncode != 0:
                 # Fallback: delete old, append new
                 self.remove_params([old])
@@ -189,13 +495,8 @@ class RpmOstreeKernelParams(KernelParamManager):
     def get_pending_params(self) -> Optional[List[str]]:
         """Get parameters staged for next boot."""
         try:
-            result = subprocess.run(
-                ["rpm-ostree", "status", "--json"],
-                capture_output=True,
-                timeout=30
-            )
-            if result.returncode == 0:
-                status = json.loads(result.stdout)
+            status = _get_status_json(timeout=30)
+            if status is not None:
                 deployments = status.get("deployments", [])
                 if len(deployments) >= 2:
                     # First deployment is pending, second is current
@@ -225,46 +526,45 @@ class RpmOstreePackageManager(PackageManager):
     
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        # package -> installed, as observed by rpm in the booted deployment
+        self._installed_cache: Dict[str, bool] = {}
+        # Packages layered into the next deployment; not installed until reboot
+        self._pending: Set[str] = set()
+        self._installed_queries = 0
+        self._all_installed_loaded = False
     
     def _ensure_ready(self, timeout_seconds: int = 60) -> bool:
         """Ensure rpm-ostree is ready for operations."""
-        for _ in range(timeout_seconds):
+        deadline = time.monotonic() + timeout_seconds
+        while True:
             try:
-                result = subprocess.run(
-                    ["rpm-ostree", "status", "--json"],
-                    capture_output=True,
-                    timeout=10
-                )
-                if result.returncode == 0:
-                    status = json.loads(result.stdout)
-                    deployments = status.get("deployments", [])
-                    if not any(d.get("transaction-in-progress", False) for d in deployments):
-                        return True
-                time.sleep(1)
-            except Exception:
-                time.sleep(1)
-        return True
+                if _status_idle():
+                    return True
+            except (subprocess.SubprocessError, OSError, ValueError):
+                pass
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            _wait_for_transaction(remaining)
     
     def install(self, packages: List[str], timeout: int = 300) -> bool:
         """Install (layer) packages via rpm-ostree."""
         if not packages:
             return True
         
-        if not self._ensure_ready():
-            self.logger.warning("rpm-ostree may have pending transaction")
-        
         cmd = ["rpm-ostree", "install", "--idempotent"] + packages
         self.logger.info(f"Layering packages: {', '.join(packages)}")
         
         try:
-            result = subprocess.run(cmd, capture_output=True, timeout=timeout)
+            result = _run_transaction(cmd, timeout, self._ensure_ready)
             if result.returncode != 0:
-                stderr = result.stderr.decode()
                 # Check if already installed
-                if "already" in stderr.lower() or "nothing to do" in stderr.lower():
+                if _ALREADY_RE.search(result.stderr):
+                    self._pending.update(packages)
                     return True
-                self.logger.error(f"rpm-ostree install failed: {stderr}")
+                self.logger.error(f"rpm-ostree install failed: {result.stderr.decode()}")
                 return False
+            self._pending.update(packages)
             return True
         except subprocess.TimeoutExpired:
             self.logger.error(f"rpm-ostree install timed out after {timeout}s")
@@ -273,48 +573,89 @@ class RpmOstreePackageManager(PackageManager):
             self.logger.error(f"Failed to install packages: {e}")
             return False
     
+    async def install_async(self, packages: List[str], timeout: int = 300) -> bool:
+        """install() without blocking the event loop; see run_batch()."""
+        return await _in_thread(self.install, packages, timeout)
+    
     def remove(self, packages: List[str]) -> bool:
         """Remove (unlayer) packages via rpm-ostree."""
         if not packages:
             return True
         
-        if not self._ensure_ready():
-            self.logger.warning("rpm-ostree may have pending transaction")
-        
         cmd = ["rpm-ostree", "uninstall"] + packages
         self.logger.info(f"Unlayering packages: {', '.join(packages)}")
         
         try:
-            result = subprocess.run(cmd, capture_output=True, timeout=120)
+            result = _run_transaction(cmd, 120, self._ensure_ready)
             if result.returncode != 0:
-                stderr = result.stderr.decode()
-                if "not currently" in stderr.lower():
+                if _NOT_LAYERED_RE.search(result.stderr):
                     return True  # Not layered
-                self.logger.error(f"rpm-ostree uninstall failed: {stderr}")
+                self.logger.error(f"rpm-ostree uninstall failed: {result.stderr.decode()}")
                 return False
+            self._pending.difference_update(packages)
             return True
         except Exception as e:
             self.logger.error(f"Failed to remove packages: {e}")
             return False
     
+    def get_pending_packages(self) -> List[str]:
+        """Packages layered by install() that take effect after a reboot."""
+        return sorted(self._pending)
+    
+    # After this many single-package lookups, list every package in one query
+    _BULK_QUERY_THRESHOLD = 3
+    
     def is_installed(self, package: str) -> bool:
         """Check if a package is installed (in base or layered)."""
+        if package not in self._installed_cache and not self._all_installed_loaded:
+            self._installed_queries += 1
+            if self._installed_queries > self._BULK_QUERY_THRESHOLD:
+                self._load_all_installed()
+        return self.is_installed_many([package])[package]
+    
+    def is_installed_many(self, packages: List[str]) -> Dict[str, bool]:
+        """
+        Check several packages with at most one rpm query.
+        
+        rpm prints the NAME of every match (several for multi-version
+        packages such as kernel) and a localized message for each miss, so
+        packages are matched by name rather than by output line.
+        """
+        unknown = [p for p in packages if p not in self._installed_cache]
+        if unknown and not self._all_installed_loaded:
+            try:
+                result = _run_query(
+                    ["rpm", "-q", "--queryformat", "%{NAME}\\n"] + unknown, timeout=30
+                )
+            except Exception:
+                result = None
+            if result is not None:
+                if result.returncode == 0:
+                    found = set(unknown)
+                else:
+                    found = set(result.stdout.decode().split("\n"))
+                for package in unknown:
+                    self._installed_cache[package] = package in found
+        return {p: self._installed_cache.get(p, False) for p in packages}
+    
+    def _load_all_installed(self) -> bool:
+        """Mark every installed package name in the cache with one rpm query."""
         try:
-            result = subprocess.run(
-                ["rpm", "-q", package],
-                capture_output=True,
-                timeout=10
-            )
-            return result.returncode == 0
+            result = _run_query(["rpm", "-qa", "--queryformat", "%{NAME}\\n"], timeout=30)
         except Exception:
             return False
+        if result.returncode != 0:
+            return False
+        self._installed_cache.update(dict.fromkeys(result.stdout.decode().split(), True))
+        self._all_installed_loaded = True
+        return True
     
     def update(self) -> bool:
         """Update the base image (rpm-ostree upgrade)."""
         self.logger.info("Checking for system updates")
         try:
             result = subprocess.run(
-                ["rpm-ostree", "upgrade", "--check"],
+                [which("rpm-ostree") or "rpm-ostree", "upgrade", "--check"],
                 capture_output=True,
                 timeout=120
             )
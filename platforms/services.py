@@ -20,13 +20,45 @@ Usage:
     services.package_manager.install(["htop"])
 """
 
+import functools
+import importlib
 import logging
-from typing import Optional
+from typing import Callable, Dict, Optional, Tuple
 
 from .detection import PlatformInfo, PlatformType
 from .base import PackageManager, KernelParamManager
 
 
+# PlatformInfo.package_manager -> (module, factory) implementing it.
+# dnf goes through the process-wide instance so its installed-package cache
+# is shared.
+_PKG_BACKENDS: Dict[str, Tuple[str, str]] = {
+    "rpm-ostree": (".immutable.rpm_ostree", "RpmOstreePackageManager"),
+    "dnf": (".traditional.rpm", "get_package_manager"),
+}
+
+# PlatformInfo.boot_method -> (module, class) implementing it.
+_KARG_BACKENDS: Dict[str, Tuple[str, str]] = {
+    "rpm-ostree-kargs": (".immutable.rpm_ostree", "RpmOstreeKernelParams"),
+    "grub": (".traditional.grub", "GrubKernelParams"),
+}
+
+# Known backends without an implementation yet, with their error message.
+# Future: "apt" -> AptPackageManager, "systemd-boot" -> SystemdBootKernelParams
+_PKG_PENDING: Dict[str, str] = {
+    "apt": "apt package manager not yet implemented",
+}
+_KARG_PENDING: Dict[str, str] = {
+    "systemd-boot": "systemd-boot not yet implemented",
+}
+
+
+@functools.lru_cache(maxsize=None)
+def _load_backend(module: str, name: str) -> Callable:
+    """Import a backend factory on first use; implementations stay lazy."""
+    return getattr(importlib.import_module(module, __package__), name)
+
+
 class UnsupportedPlatformError(Exception):
     """Raised when a platform operation is not supported."""
     pass
@@ -82,56 +114,29 @@ class PlatformServices:
     def _create_package_manager(self) -> PackageManager:
         """Create the appropriate package manager implementation."""
         pkg_mgr = self.platform_info.package_manager
-        
-        if pkg_mgr == "rpm-ostree":
-            from .immutable.rpm_ostree import RpmOstreePackageManager
-            self.logger.debug("Using RpmOstreePackageManager")
-            return RpmOstreePackageManager()
-        
-        elif pkg_mgr == "dnf":
-            from .traditional.rpm import DnfPackageManager
-            self.logger.debug("Using DnfPackageManager")
-            return DnfPackageManager()
-        
-        elif pkg_mgr == "apt":
-            # Future: AptPackageManager
-            raise UnsupportedPlatformError(
-                f"apt package manager not yet implemented. "
-                f"Platform: {self.platform_info.distro_name}"
-            )
-        
-        else:
+        try:
+            backend = _load_backend(*_PKG_BACKENDS[pkg_mgr])
+        except KeyError:
+            reason = _PKG_PENDING.get(pkg_mgr, f"Unsupported package manager: {pkg_mgr}")
             raise UnsupportedPlatformError(
-                f"Unsupported package manager: {pkg_mgr}. "
-                f"Platform: {self.platform_info.distro_name}"
-            )
+                f"{reason}. Platform: {self.platform_info.distro_name}"
+            ) from None
+        manager = backend()
+        self.logger.debug(f"Using {type(manager).__name__}")
+        return manager
     
     def _create_kernel_params(self) -> KernelParamManager:
         """Create the appropriate kernel param manager implementation."""
         boot_method = self.platform_info.boot_method
-        
-        if boot_method == "rpm-ostree-kargs":
-            from .immutable.rpm_ostree import RpmOstreeKernelParams
-            self.logger.debug("Using RpmOstreeKernelParams")
-            return RpmOstreeKernelParams()
-        
-        elif boot_method == "grub":
-            from .traditional.grub import GrubKernelParams
-            self.logger.debug("Using GrubKernelParams")
-            return GrubKernelParams()
-        
-        elif boot_method == "systemd-boot":
-            # Future: SystemdBootKernelParams
-            raise UnsupportedPlatformError(
-                f"systemd-boot not yet implemented. "
-                f"Platform: {self.platform_info.distro_name}"
-            )
-        
-        else:
+        try:
+            backend = _load_backend(*_KARG_BACKENDS[boot_method])
+        except KeyError:
+            reason = _KARG_PENDING.get(boot_method, f"Unsupported boot method: {boot_method}")
             raise UnsupportedPlatformError(
-                f"Unsupported boot method: {boot_method}. "
-                f"Platform: {self.platform_info.distro_name}"
-            )
+                f"{reason}. Platform: {self.platform_info.distro_name}"
+            ) from None
+        self.logger.debug(f"Using {backend.__name__}")
+        return backend()
     
     @property
     def is_immutable(self) -> bool:
@@ -2,6 +2,6 @@
 """Implementations for traditional Linux distributions (Fedora, Ultramarine, Ubuntu)."""
 
 from .grub import GrubKernelParams
-from .rpm import DnfPackageManager
+from .rpm import DnfPackageManager, get_package_manager
 
-__all__ = ["GrubKernelParams", "DnfPackageManager"]
+__all__ = ["GrubKernelParams", "DnfPackageManager", "get_package_manager"]
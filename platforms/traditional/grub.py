@@ -10,14 +10,38 @@ Linux distributions that use GRUB as their bootloader. It:
 - Supports Fedora, Ubuntu, and Debian path conventions
 """
 
+import fcntl
 import logging
+import mmap
+import os
+import re
+import shlex
 import subprocess
 import shutil
 from pathlib import Path
-from typing import List, Optional
+from typing import Callable, List, Optional
 from datetime import datetime
 
-from ..base import KernelParamManager
+from ..base import KernelParamManager, _dedup_merge, _param_name
+
+
+# ioctl(2) request sharing a file's extents with another (linux/fs.h)
+FICLONE = 0x40049409
+
+
+def _clone_file(src: Path, dst: Path) -> None:
+    """
+    Copy src to dst with its metadata, like shutil.copy2.
+    
+    On copy-on-write filesystems (btrfs, xfs) the data is reflinked with
+    FICLONE instead of being copied; elsewhere it falls back to a byte copy.
+    """
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        try:
+            fcntl.ioctl(fdst.fileno(), FICLONE, fsrc.fileno())
+        except OSError:
+            shutil.copyfileobj(fsrc, fdst)
+    shutil.copystat(src, dst)
 
 
 class GrubKernelParams(KernelParamManager):
@@ -36,8 +60,78 @@ class GrubKernelParams(KernelParamManager):
     GRUB_DEFAULT = Path("/etc/default/grub")
     GRUB_BACKUP_DIR = Path("/var/backups/grub")
     
+    # Matches the GRUB_CMDLINE_LINUX= line (not _DEFAULT), keeping its indentation
+    _CMDLINE_RE = re.compile(r'^([ \t]*)GRUB_CMDLINE_LINUX=(.*)$', re.M)
+    _CMDLINE_BYTES_RE = re.compile(_CMDLINE_RE.pattern.encode(), re.M)
+    # One kernel parameter: whitespace-separated, quotes may hold spaces
+    _PARAM_RE = re.compile(r'''(?:[^\s"']|"[^"]*"|'[^']*')+''')
+    # Characters that would end or escape a double-quoted shell string; "$"
+    # is left alone so references like $GRUB_CMDLINE_LINUX_DEFAULT expand
+    _DQUOTE_SPECIAL = frozenset('"`\\')
+    
+    # Generated config locations, in order of preference
+    GRUB_CFG_PATHS = (
+        Path("/boot/grub2/grub.cfg"),           # Fedora BIOS
+        Path("/boot/efi/EFI/fedora/grub.cfg"),  # Fedora EFI
+        Path("/boot/grub/grub.cfg"),            # Debian/Ubuntu BIOS
+        Path("/boot/efi/EFI/ubuntu/grub.cfg"),  # Ubuntu EFI
+    )
+    
     def __init__(self):
         self.logger = logging.getLogger(__name__)
+        # Resolved on first use by _mkconfig_command()
+        self._mkconfig_cmd: Optional[List[str]] = None
+    
+    @classmethod
+    def _parse_cmdline(cls, data: str) -> List[str]:
+        """Extract the GRUB_CMDLINE_LINUX params from grub config contents."""
+        match = cls._CMDLINE_RE.search(data)
+        if not match:
+            return []
+        return cls._split_cmdline(match.group(2))
+    
+    @classmethod
+    def _scan_cmdline(cls, path: Path) -> List[str]:
+        """Extract the GRUB_CMDLINE_LINUX params by scanning the file mapped."""
+        with open(path, "rb") as f:
+            try:
+                mm = mmap.mmap(f.fileno(), 0, prot=mmap.PROT_READ)
+            except ValueError:
+                return []  # Empty files cannot be mapped
+            with mm:
+                match = cls._CMDLINE_BYTES_RE.search(mm)
+                if not match:
+                    return []
+                value = match.group(2).decode(errors="surrogateescape")
+        return cls._split_cmdline(value)
+    
+    @classmethod
+    def _split_cmdline(cls, value: str) -> List[str]:
+        """Split a GRUB_CMDLINE_LINUX value into params."""
+        value = value.strip()
+        try:
+            # The file is sourced by a shell, so unquote the value like one
+            value = " ".join(shlex.split(value))
+        except ValueError:
+            value = value.strip('"').strip("'")
+        return cls._PARAM_RE.findall(value)
+    
+    @classmethod
+    def _render_cmdline(cls, data: str, params: List[str]) -> str:
+        """Return grub config contents with GRUB_CMDLINE_LINUX set to params."""
+        value = " ".join(params)
+        if cls._DQUOTE_SPECIAL.isdisjoint(value):
+            value = f'"{value}"'
+        else:
+            # e.g. acpi_osi="Windows 2020": single-quote so the shell keeps it
+            value = shlex.quote(value)
+        cmdline = f"GRUB_CMDLINE_LINUX={value}"
+        data, found = cls._CMDLINE_RE.subn(lambda m: m.group(1) + cmdline, data)
+        if not found:
+            if data and not data.endswith("\n"):
+                data += "\n"
+            data += cmdline + "\n"
+        return data
     
     def get_current_params(self) -> List[str]:
         """Get current kernel parameters from GRUB config."""
@@ -46,13 +140,7 @@ class GrubKernelParams(KernelParamManager):
             return []
         
         try:
-            with open(self.GRUB_DEFAULT) as f:
-                for line in f:
-                    line = line.strip()
-                    if line.startswith("GRUB_CMDLINE_LINUX="):
-                        _, _, value = line.partition("=")
-                        value = value.strip().strip('"').strip("'")
-                        return value.split() if value else []
+            return self._scan_cmdline(self.GRUB_DEFAULT)
         except Exception as e:
             self.logger.error(f"Failed to read GRUB config: {e}")
         return []
@@ -66,59 +154,111 @@ class GrubKernelParams(KernelParamManager):
             self.GRUB_BACKUP_DIR.mkdir(parents=True, exist_ok=True)
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             backup_path = self.GRUB_BACKUP_DIR / f"grub_{timestamp}"
-            shutil.copy2(self.GRUB_DEFAULT, backup_path)
+            _clone_file(self.GRUB_DEFAULT, backup_path)
             self.logger.info(f"Backed up grub config to {backup_path}")
             return backup_path
         except Exception as e:
             self.logger.warning(f"Failed to backup grub config: {e}")
             return None
     
-    def _write_grub_config(self, params: List[str]) -> bool:
-        """Write kernel parameters to GRUB config."""
-        if not self.GRUB_DEFAULT.exists():
-            self.logger.error(f"{self.GRUB_DEFAULT} not found")
+    def _write_backup(self, raw: bytes) -> Optional[Path]:
+        """Write already-read grub config bytes to a new timestamped backup."""
+        try:
+            self.GRUB_BACKUP_DIR.mkdir(parents=True, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            for attempt in range(100):
+                suffix = f"_{attempt}" if attempt else ""
+                backup_path = self.GRUB_BACKUP_DIR / f"grub_{timestamp}{suffix}"
+                try:
+                    fd = os.open(backup_path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o644)
+                except FileExistsError:
+                    continue  # Several changes within one second
+                try:
+                    os.write(fd, raw)
+                finally:
+                    os.close(fd)
+                self.logger.info(f"Backed up grub config to {backup_path}")
+                return backup_path
+        except OSError as e:
+            self.logger.warning(f"Failed to backup grub config: {e}")
+        return None
+    
+    def _read_modify_write(self, transform: Callable[[List[str]], List[str]],
+                           backup: bool = True) -> bool:
+        """
+        Apply transform to the current params and regenerate the GRUB config.
+        
+        /etc/default/grub is read once; the backup is written from those
+        bytes and the new contents are synced to disk and then replace the
+        file atomically via rename, so a crash never leaves a half-written
+        config. Bytes that are not valid UTF-8 pass through unchanged.
+        
+        Pass backup=False when the caller has already backed the file up.
+        """
+        try:
+            raw = self.GRUB_DEFAULT.read_bytes()
+        except OSError as e:
+            self.logger.error(f"Failed to read GRUB config: {e}")
             return False
         
+        data = raw.decode(errors="surrogateescape")
+        new_data = self._render_cmdline(data, transform(self._parse_cmdline(data)))
+        if backup:
+            self._write_backup(raw)
+        
+        tmp_path = self.GRUB_DEFAULT.with_suffix(".tmp")
         try:
-            lines = self.GRUB_DEFAULT.read_text().splitlines()
-            new_lines = []
-            found = False
-            param_string = " ".join(params)
-            
-            for line in lines:
-                if line.strip().startswith("GRUB_CMDLINE_LINUX="):
-                    new_lines.append(f'GRUB_CMDLINE_LINUX="{param_string}"')
-                    found = True
-                else:
-                    new_lines.append(line)
-            
-            if not found:
-                new_lines.append(f'GRUB_CMDLINE_LINUX="{param_string}"')
-            
-            self.GRUB_DEFAULT.write_text("\n".join(new_lines) + "\n")
-            return True
-        except Exception as e:
+            with open(tmp_path, "wb") as f:
+                f.write(new_data.encode(errors="surrogateescape"))
+                f.flush()
+                os.fsync(f.fileno())
+            shutil.copymode(self.GRUB_DEFAULT, tmp_path)
+            os.rename(tmp_path, self.GRUB_DEFAULT)
+        except OSError as e:
             self.logger.error(f"Failed to write GRUB config: {e}")
+            try:
+                tmp_path.unlink()
+            except OSError:
+                pass
             return False
+        
+        return self._run_grub_mkconfig()
     
-    def _run_grub_mkconfig(self) -> bool:
-        """Regenerate GRUB configuration."""
-        grub_cfg_paths = [
-            Path("/boot/grub2/grub.cfg"),           # Fedora BIOS
-            Path("/boot/efi/EFI/fedora/grub.cfg"),  # Fedora EFI
-            Path("/boot/grub/grub.cfg"),            # Debian/Ubuntu BIOS
-            Path("/boot/efi/EFI/ubuntu/grub.cfg"),  # Ubuntu EFI
-        ]
+    def _find_grub_cfg(self) -> Optional[Path]:
+        """
+        Return the first GRUB_CFG_PATHS entry whose directory exists.
+        
+        Each parent level (/boot, /boot/efi/EFI) is listed at most once
+        rather than stat-ing every candidate directory.
+        """
+        listings = {}
+        for path in self.GRUB_CFG_PATHS:
+            level = path.parent.parent
+            if level not in listings:
+                try:
+                    with os.scandir(level) as it:
+                        listings[level] = {e.name for e in it if e.is_dir()}
+                except OSError:
+                    listings[level] = set()
+            if path.parent.name in listings[level]:
+                return path
+        return None
+    
+    def _mkconfig_command(self) -> Optional[List[str]]:
+        """
+        Find the config path and regeneration command, once per instance.
         
-        grub_cfg = None
-        for path in grub_cfg_paths:
-            if path.parent.exists():
-                grub_cfg = path
-                break
+        Neither changes while the program runs, so later calls skip the
+        $PATH and /boot lookups. Returns None (and retries next time) if
+        either is missing.
+        """
+        if self._mkconfig_cmd is not None:
+            return self._mkconfig_cmd
         
+        grub_cfg = self._find_grub_cfg()
         if grub_cfg is None:
             self.logger.error("Could not find grub config path")
-            return False
+            return None
         
         # Determine which command to use
         if shutil.which("grub2-mkconfig"):
@@ -129,6 +269,15 @@ class GrubKernelParams(KernelParamManager):
             cmd = ["grub-mkconfig", "-o", str(grub_cfg)]
         else:
             self.logger.error("Could not find grub-mkconfig or update-grub")
+            return None
+        
+        self._mkconfig_cmd = cmd
+        return cmd
+    
+    def _run_grub_mkconfig(self) -> bool:
+        """Regenerate GRUB configuration."""
+        cmd = self._mkconfig_command()
+        if cmd is None:
             return False
         
         self.logger.info(f"Running: {' '.join(cmd)}")
@@ -147,55 +296,34 @@ class GrubKernelParams(KernelParamManager):
     
     def append_params(self, params: List[str]) -> bool:
         """Append kernel parameters to GRUB config with deduplication."""
-        self._backup_grub_config()
-        current = self.get_current_params()
-        
-        for param in params:
-            param_name = param.split("=")[0]
-            # Remove existing param with same name
-            current = [p for p in current if not p.startswith(param_name + "=") and p != param_name]
-            current.append(param)
-        
-        if not self._write_grub_config(current):
-            return False
-        
-        return self._run_grub_mkconfig()
+        return self._read_modify_write(lambda current: _dedup_merge(current, params))
     
     def remove_params(self, params: List[str]) -> bool:
         """Remove kernel parameters from GRUB config."""
-        self._backup_grub_config()
-        current = self.get_current_params()
-        
-        for param in params:
-            param_name = param.split("=")[0]
-            current = [p for p in current if not p.startswith(param_name + "=") and p != param_name]
-        
-        if not self._write_grub_config(current):
-            return False
-        
-        return self._run_grub_mkconfig()
+        names = {_param_name(param) for param in params}
+        return self._read_modify_write(
+            lambda current: [p for p in current if _param_name(p) not in names]
+        )
     
     def replace_param(self, old: str, new: str) -> bool:
         """Replace a kernel parameter with a new value."""
-        self._backup_grub_config()
-        current = self.get_current_params()
         old_name = old.split("=")[0]
         
-        new_params = []
-        replaced = False
-        for p in current:
-            if p.startswith(old_name + "=") or p == old_name:
+        def transform(current: List[str]) -> List[str]:
+            new_params = []
+            replaced = False
+            for p in current:
+                if p.startswith(old_name + "=") or p == old_name:
+                    new_params.append(new)
+                    replaced = True
+                else:
+                    new_params.append(p)
+            
+            if not replaced:
                 new_params.append(new)
-                replaced = True
-            else:
-                new_params.append(p)
-        
-        if not replaced:
-            new_params.append(new)
+            return new_params
         
-        if not self._write_grub_config(new_params):
-            return False
-        return self._run_grub_mkconfig()
+        return self._read_modify_write(transform)
     
     def requires_reboot(self) -> bool:
         """GRUB changes always require reboot."""
@@ -289,10 +417,7 @@ class GrubKernelParams(KernelParamManager):
         # Save current as 'previous' for easy rollback
         self.save_profile("previous", self.get_current_params())
         
-        if not self._write_grub_config(params):
-            return False
-        
-        if not self._run_grub_mkconfig():
+        if not self._read_modify_write(lambda _: params, backup=False):
             return False
         
         self.logger.info(f"Applied kernel profile '{name}'. Reboot required.")
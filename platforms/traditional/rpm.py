@@ -6,11 +6,75 @@ This implementation handles package operations for non-immutable
 RPM-based distributions like Fedora Workstation, Ultramarine, CentOS, etc.
 """
 
+import errno
+import functools
 import logging
+import re
 import subprocess
-from typing import List
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Pattern, Set, Tuple, TypeVar
 
 from ..base import PackageManager
+from ..detection import which
+
+try:
+    import rpm as _rpm  # Fedora's python3-rpm bindings, not this module
+    RPM_BINDINGS_AVAILABLE = True
+except ImportError:
+    RPM_BINDINGS_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+# dnf takes a system-wide lock per transaction; queue this process's calls
+# here rather than having them fail or stall on each other
+_DNF_LOCK = threading.Lock()
+
+# stderr lines kept for the error message when a dnf call fails
+_STDERR_TAIL_LINES = 50
+
+# Executables found missing, so later calls fail without another exec
+# (this module can be loaded on hosts without dnf or rpm)
+_BINARIES_AVAILABLE: Dict[str, bool] = {}
+
+_T = TypeVar("_T")
+
+
+def _spawn(start: Callable[..., _T], cmd: List[str], **kwargs: Any) -> _T:
+    """
+    Call start(cmd, **kwargs), either subprocess.run or subprocess.Popen.
+    
+    Raises:
+        FileNotFoundError: cmd[0] does not exist, now or on an earlier call
+    """
+    if _BINARIES_AVAILABLE.get(cmd[0]) is False:
+        raise FileNotFoundError(errno.ENOENT, "No such file or directory", cmd[0])
+    try:
+        return start(cmd, **kwargs)
+    except FileNotFoundError:
+        _BINARIES_AVAILABLE[cmd[0]] = False
+        raise
+
+
+def _run_rpm(args: List[str], timeout: float) -> subprocess.CompletedProcess:
+    """
+    Run a short rpm query and capture its output.
+    
+    An absolute executable with close_fds=False lets subprocess start the
+    child with posix_spawn(3) rather than fork+exec, so the parent's page
+    tables are not copied. Python's own descriptors are non-inheritable
+    (PEP 446), so nothing leaks into rpm.
+    """
+    return _spawn(
+        subprocess.run,
+        [which("rpm") or "rpm"] + args,
+        capture_output=True,
+        stdin=subprocess.DEVNULL,
+        timeout=timeout,
+        close_fds=False
+    )
 
 
 class DnfPackageManager(PackageManager):
@@ -26,110 +90,329 @@ class DnfPackageManager(PackageManager):
         ...     dnf.install(["htop"])
     """
     
-    def __init__(self):
-        self.logger = logging.getLogger(__name__)
+    # More parallel downloads than this mostly adds mirror contention
+    MAX_PARALLEL_DOWNLOADS = 20
+    
+    # rpm -q answers in well under a second; longer means the rpmdb is locked
+    _QUERY_TIMEOUT = 2.0
+    
+    # Shared rpmdb handle for in-process queries (see _query_rpmdb)
+    _ts = None
+    _ts_lock = threading.Lock()
+    
+    # dnf stderr lines that make a failed run count as already done
+    _INSTALL_OK_RE = re.compile(r"already installed|nothing to do", re.IGNORECASE)
+    _REMOVE_OK_RE = re.compile(r"not installed|no match", re.IGNORECASE)
+    
+    def __init__(self, parallel_downloads: int = 10, install_weak_deps: bool = True):
+        """
+        Args:
+            parallel_downloads: Packages dnf fetches at once, capped at
+                MAX_PARALLEL_DOWNLOADS
+            install_weak_deps: Set False to skip recommended packages and
+                download only hard dependencies
+        """
+        self.parallel_downloads = max(1, min(parallel_downloads, self.MAX_PARALLEL_DOWNLOADS))
+        self.install_weak_deps = install_weak_deps
+        # Names of all installed packages, listed once and dropped on changes
+        self._installed_cache: Optional[Set[str]] = None
+        self._cache_lock = threading.Lock()
+        # Operations queued inside batch(), per thread because this instance
+        # is shared process-wide (see get_package_manager)
+        self._local = threading.local()
+    
+    def _current_batch(self) -> Optional[Dict[str, Any]]:
+        """The calling thread's open batch queue, or None outside of one."""
+        return getattr(self._local, "batch", None)
+    
+    @contextmanager
+    def batch(self) -> Iterator[Dict[str, bool]]:
+        """
+        Queue install()/remove() calls and run them together on exit.
+        
+        dnf loads its solver, repo metadata and rpmdb on every start, so N
+        calls in a row pay that N times; inside a batch they pay it once per
+        kind of operation. Queued calls return True immediately; the yielded
+        dict is filled with the real "remove"/"install" results on exit.
+        Removals run first. Nothing runs if the block raises.
+        
+        Only calls from the thread that opened the batch are queued; other
+        threads keep running immediately.
+        
+        Raises:
+            RuntimeError: a batch is already open in this thread
+        
+        Example:
+            >>> with dnf.batch() as results:
+            ...     dnf.install(["gamemode"])
+            ...     dnf.install(["mangohud"])
+            >>> results
+            {'install': True}
+        """
+        if self._current_batch() is not None:
+            raise RuntimeError("DnfPackageManager.batch() cannot be nested")
+        queued: Dict[str, Any] = {"install": [], "remove": [], "timeout": 0}
+        results: Dict[str, bool] = {}
+        self._local.batch = queued
+        try:
+            yield results
+        finally:
+            self._local.batch = None
+        
+        if queued["remove"]:
+            results["remove"] = self.remove(list(dict.fromkeys(queued["remove"])))
+        if queued["install"]:
+            results["install"] = self.install(
+                list(dict.fromkeys(queued["install"])), timeout=queued["timeout"]
+            )
     
     def install(self, packages: List[str], timeout: int = 300) -> bool:
         """Install packages via dnf with idempotent behavior matching rpm-ostree."""
         if not packages:
             return True
         
+        queued = self._current_batch()
+        if queued is not None:
+            queued["install"].extend(packages)
+            queued["timeout"] = max(queued["timeout"], timeout)
+            return True
+        
         # TEAM_013: Check for dry-run mode via environment or builtins
         import builtins
         if getattr(builtins, 'BAZZITE_DRY_RUN', False):
-            self.logger.info(f"[DRY-RUN] Would install packages: {', '.join(packages)}")
+            logger.info(f"[DRY-RUN] Would install packages: {', '.join(packages)}")
             return True
         
-        # Filter out already-installed packages (matches rpm-ostree idempotent behavior)
-        packages_to_install = []
-        for package in packages:
-            if not self.is_installed(package):
-                packages_to_install.append(package)
-            else:
-                self.logger.debug(f"Package {package} already installed (rpm)")
-        
-        if not packages_to_install:
-            self.logger.debug("All packages already installed")
-            return True
-        
-        cmd = ["sudo", "dnf", "install", "-y"] + packages_to_install
-        self.logger.debug(f"Installing {', '.join(packages_to_install)} via DnfPackageManager")
+        # dnf install is idempotent (matches rpm-ostree --idempotent) and also
+        # resolves virtual provides, so no rpm pre-check is needed
+        cmd = ["sudo", "dnf", "install", "-y"] + self._install_options() + packages
+        logger.info("Installing %d packages", len(packages))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Installing {', '.join(packages)} via DnfPackageManager")
         
         try:
-            result = subprocess.run(cmd, capture_output=True, timeout=timeout)
-            if result.returncode != 0:
-                stderr = result.stderr.decode()
+            with _DNF_LOCK:
                 # Handle "already installed" or "nothing to do" cases gracefully
-                if "already installed" in stderr.lower() or "nothing to do" in stderr.lower():
-                    self.logger.debug(f"Packages already satisfied: {', '.join(packages_to_install)}")
+                returncode, benign, stderr = self._run_dnf(cmd, timeout, self._INSTALL_OK_RE)
+            if returncode != 0:
+                if benign:
+                    logger.debug(f"Packages already satisfied: {', '.join(packages)}")
                     return True
-                self.logger.error(f"dnf install failed: {stderr}")
+                logger.error(f"dnf install failed: {stderr}")
                 return False
+            self.refresh_cache()
             return True
         except subprocess.TimeoutExpired:
-            self.logger.error(f"dnf install timed out after {timeout}s")
+            logger.error(f"dnf install timed out after {timeout}s")
             return False
-        except Exception as e:
-            self.logger.error(f"Failed to run dnf: {e}")
+        except OSError as e:
+            logger.error(f"Failed to run dnf: {e}")
             return False
     
+    def _run_dnf(self, cmd: List[str], timeout: int,
+                 benign: Optional[Pattern[str]] = None) -> Tuple[int, bool, str]:
+        """
+        Run a dnf command, scanning its stderr as it is written.
+        
+        stdout (progress and the transaction table) is discarded and stderr
+        is read line by line instead of being buffered whole. Lines go to the
+        debug log as they arrive. stdin is /dev/null, so a prompt that -y
+        does not answer (e.g. a GPG key import) fails instead of blocking.
+        
+        Returns:
+            (returncode, whether any line matched benign, the last lines
+            of stderr)
+        
+        Raises:
+            subprocess.TimeoutExpired: dnf ran longer than timeout and was killed
+        """
+        process = _spawn(
+            subprocess.Popen, cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE, text=True, errors="replace"
+        )
+        expired = threading.Event()
+        
+        def kill() -> None:
+            expired.set()
+            process.kill()
+        
+        # A silent, hung dnf would block the read loop, so the timeout kills it
+        timer = threading.Timer(timeout, kill)
+        timer.start()
+        matched = False
+        tail = deque(maxlen=_STDERR_TAIL_LINES)
+        # Checked once so lines are not formatted when debug is off
+        debug = logger.isEnabledFor(logging.DEBUG)
+        try:
+            for line in process.stderr:
+                if debug:
+                    logger.debug(f"dnf: {line.rstrip()}")
+                tail.append(line)
+                if not matched and benign is not None:
+                    matched = benign.search(line) is not None
+            returncode = process.wait()
+        finally:
+            timer.cancel()
+            process.stderr.close()
+        if expired.is_set():
+            raise subprocess.TimeoutExpired(cmd, timeout)
+        return returncode, matched, "".join(tail)
+    
+    def _install_options(self) -> List[str]:
+        """dnf --setopt flags for download parallelism and weak deps."""
+        options = [f"--setopt=max_parallel_downloads={self.parallel_downloads}"]
+        if not self.install_weak_deps:
+            options.append("--setopt=install_weak_deps=False")
+        return options
+    
+    def install_many(self, groups: List[List[str]], timeout: int = 300) -> List[bool]:
+        """
+        Install independent package groups, one dnf transaction per group.
+        
+        A failing group does not stop the others. Groups run one after
+        another: dnf locks the system for each transaction and does all of
+        its work inside it, so a thread pool would gain nothing.
+        
+        Returns:
+            One result per group, in the order given
+        """
+        return [self.install(group, timeout) for group in groups]
+    
     def remove(self, packages: List[str]) -> bool:
         """Remove packages via dnf with graceful handling matching rpm-ostree."""
         if not packages:
             return True
         
-        # Filter to only installed packages (matches rpm-ostree behavior)
-        packages_to_remove = []
-        for package in packages:
-            if self.is_installed(package):
-                packages_to_remove.append(package)
-            else:
-                self.logger.debug(f"Package {package} not installed, skipping")
-        
-        if not packages_to_remove:
-            self.logger.debug("No packages to remove (none installed)")
+        queued = self._current_batch()
+        if queued is not None:
+            queued["remove"].extend(packages)
             return True
         
-        cmd = ["sudo", "dnf", "remove", "-y"] + packages_to_remove
-        self.logger.info(f"Removing packages: {', '.join(packages_to_remove)}")
+        # dnf skips packages that are not installed; an all-missing list is
+        # reported on stderr and handled below (matches rpm-ostree)
+        cmd = ["sudo", "dnf", "remove", "-y"] + packages
+        logger.info("Removing %d packages", len(packages))
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(f"Removing packages: {', '.join(packages)}")
         
         try:
-            result = subprocess.run(cmd, capture_output=True, timeout=120)
-            if result.returncode != 0:
-                stderr = result.stderr.decode()
+            with _DNF_LOCK:
                 # Handle "not installed" case gracefully (matches rpm-ostree)
-                if "not installed" in stderr.lower() or "no match" in stderr.lower():
-                    self.logger.debug(f"Packages not installed: {', '.join(packages_to_remove)}")
+                returncode, benign, stderr = self._run_dnf(cmd, 120, self._REMOVE_OK_RE)
+            if returncode != 0:
+                if benign:
+                    logger.debug(f"Packages not installed: {', '.join(packages)}")
                     return True
-                self.logger.error(f"dnf remove failed: {stderr}")
+                logger.error(f"dnf remove failed: {stderr}")
                 return False
+            self.refresh_cache()
             return True
-        except Exception as e:
-            self.logger.error(f"Failed to remove packages: {e}")
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.error(f"Failed to remove packages: {e}")
             return False
     
     def is_installed(self, package: str) -> bool:
         """Check if a package is installed via rpm."""
+        installed, _missing = self._filter_installed([package])
+        return package in installed
+    
+    def refresh_cache(self) -> None:
+        """Forget the installed-package list; the next query re-reads it."""
+        with self._cache_lock:
+            self._installed_cache = None
+    
+    def _get_installed_set(self) -> Optional[Set[str]]:
+        """Names of all installed packages, from one `rpm -qa` per session."""
+        with self._cache_lock:
+            if self._installed_cache is None:
+                try:
+                    result = _run_rpm(["-qa", "--qf", "%{NAME}\\n"], timeout=30)
+                except (subprocess.SubprocessError, OSError):
+                    return None
+                if result.returncode != 0:
+                    return None
+                self._installed_cache = set(result.stdout.decode().split())
+            return self._installed_cache
+    
+    @classmethod
+    def _query_rpmdb(cls, packages: List[str]) -> Optional[Set[str]]:
+        """
+        Names in packages found in the rpmdb, via the rpm Python bindings.
+        
+        The database is opened once per process and each lookup is an
+        in-process index query. Returns None if the bindings are missing or
+        the query fails.
+        """
+        if not RPM_BINDINGS_AVAILABLE:
+            return None
+        try:
+            with cls._ts_lock:
+                if cls._ts is None:
+                    cls._ts = _rpm.TransactionSet()
+                return {p for p in packages if any(True for _ in cls._ts.dbMatch("name", p))}
+        except (_rpm.error, OSError):
+            return None
+    
+    def _filter_installed(self, packages: List[str]) -> Tuple[Set[str], Set[str]]:
+        """
+        Split packages into (installed, missing).
+        
+        Asks the rpmdb directly when the rpm bindings are installed,
+        otherwise uses the cached package list; if that cannot be read, a
+        single `rpm -q` for all packages is used. rpm prints the NAME of
+        every match and a localized "is not installed" message for each
+        miss, so the output is matched by package name. A timed-out query
+        is retried once; if rpm cannot be run, every package counts as
+        missing.
+        """
+        installed = self._query_rpmdb(packages)
+        if installed is not None:
+            return installed, set(packages) - installed
+        
+        names = self._get_installed_set()
+        if names is not None:
+            installed = {p for p in packages if p in names}
+            return installed, set(packages) - installed
+        
+        args = ["-q", "--qf", "%{NAME}\\n"] + list(packages)
         try:
-            result = subprocess.run(
-                ["rpm", "-q", package],
-                capture_output=True,
-                timeout=10
+            try:
+                result = _run_rpm(args, timeout=self._QUERY_TIMEOUT)
+            except subprocess.TimeoutExpired:
+                # Usually another rpm/dnf holds the rpmdb lock for a moment
+                time.sleep(0.05)
+                result = _run_rpm(args, timeout=self._QUERY_TIMEOUT)
+        except subprocess.TimeoutExpired:
+            logger.warning(
+                f"rpm -q timed out twice; treating {len(packages)} package(s) as not installed"
             )
-            return result.returncode == 0
-        except Exception:
-            return False
+            return set(), set(packages)
+        except (subprocess.SubprocessError, OSError):
+            return set(), set(packages)
+        if result.returncode == 0:
+            return set(packages), set()
+        names = set(result.stdout.decode().split("\n"))
+        installed = {p for p in packages if p in names}
+        return installed, set(packages) - installed
     
     def update(self) -> bool:
         """Update dnf package cache."""
-        self.logger.info("Updating dnf cache")
+        logger.info("Updating dnf cache")
         try:
-            result = subprocess.run(
-                ["sudo", "dnf", "makecache"],
-                capture_output=True,
-                timeout=120
-            )
-            return result.returncode == 0
-        except Exception as e:
-            self.logger.error(f"Failed to update cache: {e}")
+            with _DNF_LOCK:
+                returncode, _benign, _stderr = self._run_dnf(["sudo", "dnf", "makecache"], 120)
+            return returncode == 0
+        except (subprocess.SubprocessError, OSError) as e:
+            logger.error(f"Failed to update cache: {e}")
             return False
+
+
+@functools.lru_cache(maxsize=None)
+def get_package_manager() -> DnfPackageManager:
+    """
+    The process-wide DnfPackageManager.
+    
+    Callers share one installed-package cache instead of each re-reading
+    the rpmdb; the rpmdb handle itself is already shared at class level.
+    """
+    return DnfPackageManager()
@@ -1,6 +1,7 @@
 import importlib.util
 import subprocess
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 
 
 def load_bazzite_optimizer():
@@ -41,6 +42,69 @@ def test_run_command_timeout(monkeypatch):
     assert code == -1 and out == "" and "timed out" in err.lower()
 
 
+def test_run_command_skips_shell_when_not_needed(monkeypatch):
+    m = load_bazzite_optimizer()
+    calls = []
+
+    def fake_subprocess_run(args, shell=False, **kwargs):
+        calls.append((args, shell))
+        return subprocess.CompletedProcess(args, 0, "", "")
+
+    monkeypatch.setattr(subprocess, "run", fake_subprocess_run)
+    m.run_command("systemctl is-active tuned", check=False)
+    m.run_command("lsmod | grep nvidia", check=False)
+    m.run_command("LANG=C locale", check=False)
+
+    assert calls == [
+        (["systemctl", "is-active", "tuned"], False),
+        ("lsmod | grep nvidia", True),
+        ("LANG=C locale", True),
+    ]
+
+
+def test_query_shell_runs_commands_in_one_shell(monkeypatch):
+    m = load_bazzite_optimizer()
+    spawned = []
+    real_popen = subprocess.Popen
+
+    def recording_popen(*args, **kwargs):
+        spawned.append(args[0])
+        return real_popen(*args, **kwargs)
+
+    monkeypatch.setattr(subprocess, "Popen", recording_popen)
+    with m.query_shell():
+        assert m.run_command("echo out; echo err >&2; false", check=False) == (1, "out\n", "err\n")
+        assert m.run_command("printf abc", check=False) == (0, "abc", "")
+        code, out, err = m.run_command("sleep 5", check=False, timeout=0.2)
+        assert code == -1 and "timed out" in err
+        assert m.run_command("echo again", check=False) == (0, "again\n", "")
+
+    # One shell, plus a replacement after the timed-out query was killed
+    assert len(spawned) == 2
+
+
+def test_query_shell_shared_by_worker_threads():
+    m = load_bazzite_optimizer()
+    with m.query_shell():
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            results = list(executor.map(
+                lambda i: m.run_command(f"echo {i}", check=False), range(16)))
+    assert results == [(0, f"{i}\n", "") for i in range(16)]
+    assert m._QUERY_SHELL is None
+
+
+def test_system_info_callers_get_independent_copies(monkeypatch):
+    m = load_bazzite_optimizer()
+    monkeypatch.setattr(m, "_system_info_cache", None)
+    monkeypatch.setattr(m, "_collect_system_info", lambda: {"gpus": ["nvidia"], "ram_gb": 32})
+
+    first = m.get_system_info()
+    first["gpus"].append("amd")
+    first["ram_gb"] = 0
+
+    assert m.get_system_info() == {"gpus": ["nvidia"], "ram_gb": 32}
+
+
 def test_check_kernel_version(monkeypatch):
     m = load_bazzite_optimizer()
 
@@ -58,6 +122,184 @@ def test_check_kernel_version(monkeypatch):
     assert m.check_kernel_version() is False
 
 
+def test_get_system_info_cached(monkeypatch):
+    m = load_bazzite_optimizer()
+    calls = []
+
+    def fake_collect():
+        calls.append(1)
+        return {"kernel_version": (6, 8, 0), "gpus": []}
+
+    monkeypatch.setattr(m, "_collect_system_info", fake_collect)
+    first = m.get_system_info()
+    first["kernel_version"] = (0, 0, 0)
+    assert m.get_system_info()["kernel_version"] == (6, 8, 0)
+    assert len(calls) == 1
+
+    monkeypatch.setattr(m, "_SYSTEM_INFO_TTL", 0)
+    m.get_system_info()
+    assert len(calls) == 2
+
+
+def test_lspci_run_once(monkeypatch):
+    m = load_bazzite_optimizer()
+    calls = []
+
+    def fake_run_command(command, **kwargs):
+        calls.append(command)
+        return 0, ("00:02.0 VGA compatible controller: Intel Corporation UHD 770\n"
+                   "05:00.0 Ethernet controller: Intel Corporation Ethernet Controller I225-V\n"), ""
+
+    monkeypatch.setattr(m, "run_command", fake_run_command)
+    monkeypatch.setattr(m, "get_system_info", lambda: {
+        "gpu_vendor": "intel", "nvme_devices": [], "is_immutable": False,
+        "ram_gb": 16, "cpu_vendor": "intel",
+    })
+    caps = m.check_hardware_capabilities()
+    assert caps["has_intel_nic"] is True
+    assert caps["has_creative_audio"] is False
+    assert caps["has_intel_gpu"] is True and caps["has_nvidia"] is False
+    assert m._LSPCI_GPU_RE.findall(m._lspci_output()) == [
+        "00:02.0 VGA compatible controller: Intel Corporation UHD 770"
+    ]
+    assert calls.count("lspci") == 1
+    assert any(c.startswith("lspci -vv") for c in calls)
+
+
+def test_cpu_vendor_pattern():
+    m = load_bazzite_optimizer()
+
+    assert m._CPU_VENDOR_RE.search("Intel(R) Core(TM) i9-10850K").group(0).lower() == "intel"
+    assert m._CPU_VENDOR_RE.search("AMD Ryzen 7 7800X3D").group(0).lower() == "amd"
+    assert m._CPU_VENDOR_RE.search("x86_64") is None
+
+
+def test_os_release_patterns():
+    m = load_bazzite_optimizer()
+    os_release = 'NAME="Bazzite"\nID=bazzite\nID_LIKE="fedora"\nVARIANT_ID="kinoite"\n'
+
+    assert m._OS_RELEASE_ID_RE.search(os_release).group(1) == "bazzite"
+    assert m._OS_RELEASE_VARIANT_RE.search(os_release).group(1) == "kinoite"
+
+
+def test_read_sysfs_text(tmp_path):
+    m = load_bazzite_optimizer()
+    cmdline = tmp_path / "cmdline"
+    cmdline.write_text("quiet mitigations=off\n")
+
+    assert m.read_sysfs_text(str(cmdline)) == "quiet mitigations=off\n"
+    assert m.read_sysfs_text(str(tmp_path / "missing")) is None
+
+
+def test_system_snapshot_reads_once(tmp_path):
+    m = load_bazzite_optimizer()
+    cmdline = tmp_path / "cmdline"
+    cmdline.write_text("quiet\n")
+
+    with m.system_snapshot():
+        assert m.read_sysfs_text(str(cmdline)) == "quiet\n"
+        cmdline.write_text("changed\n")
+        assert m.read_sysfs_text(str(cmdline)) == "quiet\n"
+
+    assert m.read_sysfs_text(str(cmdline)) == "changed\n"
+
+
+def test_ram_bytes_reads_meminfo():
+    m = load_bazzite_optimizer()
+    import psutil
+
+    assert m._MEMTOTAL_RE.search(b"MemTotal:       32768000 kB\nMemFree: 1 kB\n").group(1) == b"32768000"
+    # Agrees with psutil, which reads the same MemTotal line
+    assert m._ram_bytes() == psutil.virtual_memory().total
+
+
+def test_nvidia_driver_version_from_sysfs(monkeypatch):
+    m = load_bazzite_optimizer()
+    files = {
+        "/sys/module/nvidia/version": "570.133.07\n",
+        "/proc/driver/nvidia/version": "NVRM version: NVIDIA UNIX Open Kernel Module for x86_64  570.133.07\n",
+    }
+
+    def no_subprocess(command, **kwargs):
+        raise AssertionError(f"unexpected command: {command}")
+
+    monkeypatch.setattr(m, "read_sysfs_text", files.get)
+    monkeypatch.setattr(m, "run_command", no_subprocess)
+
+    assert m.check_nvidia_driver_version() == "570.133.07 (Open)"
+
+
+def test_setup_logging_idempotent(monkeypatch):
+    m = load_bazzite_optimizer()
+    monkeypatch.setattr(m, "ensure_directory_with_fallback", lambda *a, **k: None)
+    monkeypatch.setattr(m, "setup_log_rotation", lambda: None)
+    monkeypatch.setattr(m.LOGGER, "handlers", [])
+
+    logger = m.setup_logging()
+    handlers = list(logger.handlers)
+    assert m.setup_logging() is logger
+    assert logger.handlers == handlers
+
+
+def test_backup_file_keeps_contents_and_mode(tmp_path, monkeypatch):
+    m = load_bazzite_optimizer()
+    monkeypatch.setattr(m, "CONFIG_BACKUP_DIR", tmp_path / "backups")
+    script = tmp_path / "gaming-mode.sh"
+    script.write_text("#!/bin/sh\n")
+    script.chmod(0o750)
+
+    backup = m.backup_file(script)
+
+    assert backup.read_text() == "#!/bin/sh\n"
+    assert backup.stat().st_mode == script.stat().st_mode
+
+
+def test_write_config_file_replaces_atomically(tmp_path, monkeypatch):
+    m = load_bazzite_optimizer()
+    monkeypatch.setattr(m, "backup_file", lambda filepath: None)
+    target = tmp_path / "60-gaming.conf"
+    target.write_text("old\n")
+
+    replaced = []
+    real_replace = m.os.replace
+
+    def recording_replace(src, dst):
+        replaced.append(Path(src).name)
+        real_replace(src, dst)
+
+    monkeypatch.setattr(m.os, "replace", recording_replace)
+    assert m.write_config_file(target, "vm.swappiness = 10\n", executable=True) is True
+    monkeypatch.undo()
+
+    assert target.read_text() == "vm.swappiness = 10\n"
+    assert target.stat().st_mode & 0o777 == 0o755
+    assert len(replaced) == 1 and replaced[0].startswith("60-gaming.conf.")
+    assert list(tmp_path.iterdir()) == [target]
+
+
+def test_write_config_file_leaves_existing_tmp_alone(tmp_path, monkeypatch):
+    m = load_bazzite_optimizer()
+    monkeypatch.setattr(m, "backup_file", lambda filepath: None)
+    unrelated = tmp_path / "60-gaming.conf.tmp"
+    unrelated.write_text("keep\n")
+
+    assert m.write_config_file(tmp_path / "60-gaming.conf", "vm.swappiness = 10\n") is True
+
+    assert unrelated.read_text() == "keep\n"
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["60-gaming.conf", "60-gaming.conf.tmp"]
+
+
+def test_write_config_file_accepts_bytes(tmp_path, monkeypatch):
+    m = load_bazzite_optimizer()
+    monkeypatch.setattr(m, "backup_file", lambda filepath: None)
+    content = "options nvidia NVreg_UsePageAttributeTable=1\n".encode()
+
+    for name in ("a.conf", "b.conf"):
+        assert m.write_config_file(tmp_path / name, content) is True
+
+    assert (tmp_path / "b.conf").read_bytes() == content
+
+
 def test_validate_file_exists(tmp_path, monkeypatch):
     m = load_bazzite_optimizer()
 
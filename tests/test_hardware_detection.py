@@ -4,8 +4,11 @@ TEAM_015: Tests for CPU and NIC hardware detection functions.
 These tests verify the detection logic works correctly for various hardware configurations.
 """
 
+import subprocess
+from dataclasses import replace
+
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, mock_open
 from pathlib import Path
 
 
@@ -89,6 +92,382 @@ core id		: 1
                 assert caps.safe_undervolt_mv == 80
 
 
+class TestCPUTopology:
+    """Tests for detect_cpu_topology and its sysfs helpers."""
+
+    def test_parse_cpumask_ranges(self, tmp_path):
+        """Test cpumask ranges and single CPUs are expanded."""
+        from platforms.detection import _parse_cpumask
+
+        mask = tmp_path / "cpus"
+        mask.write_text("0-3,8,10-11\n")
+        assert _parse_cpumask(mask) == [0, 1, 2, 3, 8, 10, 11]
+
+    def test_read_sysfs_small(self, tmp_path):
+        """Test short attributes are read stripped, and missing ones yield None."""
+        from platforms.detection import _read_sysfs_small
+
+        (tmp_path / "status").write_text("connected\n")
+        assert _read_sysfs_small(str(tmp_path / "status")) == "connected"
+        assert _read_sysfs_small(str(tmp_path / "missing")) is None
+
+    def test_parse_cpumask_missing_file(self, tmp_path):
+        """Test a missing cpumask yields no CPUs."""
+        from platforms.detection import _parse_cpumask
+
+        assert _parse_cpumask(tmp_path / "missing") == []
+
+    def test_count_physical_cores_from_cpuinfo(self):
+        """Test SMT siblings and sockets are counted by (physical id, core id)."""
+        from platforms.detection import _count_physical_cores
+
+        blocks = []
+        for cpu, (package, core) in enumerate([(0, 0), (0, 1), (1, 0), (1, 1),
+                                               (0, 0), (0, 1), (1, 0), (1, 1)]):
+            blocks.append(f"processor\t: {cpu}\nphysical id\t: {package}\n"
+                          f"core id\t\t: {core}\n")
+        cpuinfo = "\n".join(blocks)
+        with patch("builtins.open", mock_open(read_data=cpuinfo)):
+            assert _count_physical_cores(list(range(8))) == 4
+
+    def test_read_cpu_max_freqs(self, tmp_path):
+        """Test max frequencies are read per CPU, skipping CPUs without cpufreq."""
+        from platforms.detection import _read_cpu_max_freqs
+
+        for cpu_id, freq in ((0, "4700000"), (1, "3500000")):
+            cpufreq = tmp_path / f"cpu{cpu_id}" / "cpufreq"
+            cpufreq.mkdir(parents=True)
+            (cpufreq / "cpuinfo_max_freq").write_text(freq + "\n")
+        (tmp_path / "cpu2").mkdir()
+
+        freqs = _read_cpu_max_freqs([0, 1, 2], base=str(tmp_path))
+        assert freqs == {0: 4700000, 1: 3500000}
+
+    def test_hybrid_split_from_cpu_core_and_cpu_atom(self):
+        """Test P/E cores come from the kernel's cpu_core/cpu_atom lists."""
+        from platforms import detection
+
+        masks = {
+            "/sys/devices/system/cpu/online": list(range(8)),
+            "/sys/devices/cpu_core/cpus": [0, 1, 2, 3],
+            "/sys/devices/cpu_atom/cpus": [4, 5, 6, 7],
+        }
+        with patch.object(detection, "_parse_cpumask", side_effect=lambda p: masks[str(p)]):
+            topology = detection.detect_cpu_topology()
+
+        assert topology.is_hybrid is True
+        assert topology.p_cores == [0, 1, 2, 3]
+        assert topology.e_cores == [4, 5, 6, 7]
+        assert topology.recommended_isolate == [4, 5, 6, 7]
+
+    def test_online_cpus_fall_back_to_affinity(self):
+        """Test the scheduler affinity mask is used without sysfs."""
+        from platforms import detection
+
+        with patch.object(detection, "_parse_cpumask", return_value=[]):
+            with patch("os.sched_getaffinity", return_value={3, 1, 0, 2}):
+                with patch.object(detection, "_detect_hybrid_from_cpuid", return_value=None):
+                    topology = detection.detect_cpu_topology()
+
+        assert topology.total_threads == 4
+        assert topology.is_hybrid is False
+
+    def test_hybrid_split_from_cpuid_leaf_1a(self):
+        """Test CPUID leaf 0x1A classifies cores when sysfs lists are absent."""
+        from platforms import detection
+
+        def fake_cpuid(cpu_id, leaf, subleaf=0):
+            if leaf == 0x0:
+                return (0x20, 0, 0, 0)
+            if leaf == 0x7:
+                return (0, 0, 0, 1 << 15)
+            core_type = 0x40 if cpu_id < 2 else 0x20
+            return (core_type << 24, 0, 0, 0)
+
+        with patch.object(detection, "_cpuid", side_effect=fake_cpuid):
+            assert detection._detect_hybrid_from_cpuid([0, 1, 2, 3]) == ([0, 1], [2, 3])
+
+    def test_cpuid_without_hybrid_flag(self):
+        """Test non-hybrid CPUs are not split by the CPUID fallback."""
+        from platforms import detection
+
+        with patch.object(detection, "_cpuid", return_value=(0x20, 0, 0, 0)):
+            assert detection._detect_hybrid_from_cpuid([0, 1]) is None
+
+
+class TestGPUDetection:
+    """Tests for GPU detection helpers."""
+
+    def test_read_uevent(self, tmp_path):
+        """Test uevent parsing exposes driver, PCI ID and slot."""
+        from platforms.detection import _read_uevent
+
+        (tmp_path / "uevent").write_text(
+            "DRIVER=nvidia\nPCI_CLASS=30000\nPCI_ID=10DE:2504\n"
+            "PCI_SUBSYS_ID=1458:4074\nPCI_SLOT_NAME=0000:01:00.0\n"
+        )
+        uevent = _read_uevent(tmp_path)
+
+        assert uevent["DRIVER"] == "nvidia"
+        assert uevent["PCI_ID"] == "10DE:2504"
+        assert uevent["PCI_SLOT_NAME"] == "0000:01:00.0"
+
+    def test_load_pci_ids(self, tmp_path):
+        """Test pci.ids parsing keeps GPU vendors' device names only."""
+        from platforms import detection
+
+        pci_ids = tmp_path / "pci.ids"
+        pci_ids.write_text(
+            "# comment\n"
+            "0e11  Compaq Computer Corporation\n"
+            "\t0001  PCI to EISA Bridge\n"
+            "10de  NVIDIA Corporation\n"
+            "\t2504  GA106 [GeForce RTX 3060 Lite Hash Rate]\n"
+            "\t\t1458 4074  GeForce RTX 3060 GAMING OC 12G\n"
+            "1002  Advanced Micro Devices, Inc. [AMD/ATI]\n"
+            "\t744C  Navi 31 [Radeon RX 7900 XT/7900 XTX]\n"
+            "8086  Intel Corporation\n"
+            "\t56a0  DG2 [Arc A770]\n"
+            "9005  Adaptec\n"
+            "\t0010  AHA-2940U2/U2W\n"
+            "C 03  Display controller\n"
+            "\t00  VGA compatible controller\n"
+        )
+        detection._load_pci_ids.cache_clear()
+        try:
+            with patch.object(detection, "PCI_IDS_PATHS", (str(pci_ids),)):
+                keys, names = detection._load_pci_ids()
+                lookup = detection._lookup_pci_name
+                assert lookup("0x10de", "0x2504") == "GA106 [GeForce RTX 3060 Lite Hash Rate]"
+                assert lookup("0x1002", "0x744c") == "Navi 31 [Radeon RX 7900 XT/7900 XTX]"
+                assert lookup("0x8086", "0x56a0") == "DG2 [Arc A770]"
+                assert lookup("0x10de", "0x9999") is None
+                assert lookup("0x0e11", "0x0001") is None
+                assert lookup("0x9005", "0x0010") is None
+                assert lookup("", "") is None
+        finally:
+            detection._load_pci_ids.cache_clear()
+
+        assert list(keys) == sorted(keys)
+        assert len(names) == 3
+
+    def test_gpu_name_falls_back_to_lspci(self):
+        """Test lspci is only consulted for IDs missing from pci.ids."""
+        from platforms import detection
+
+        with patch.object(detection, "_lookup_pci_name",
+                          side_effect=lambda v, d: "GA106" if d == "0x2504" else None):
+            with patch.object(detection, "_get_gpu_name_from_lspci", return_value="lspci") as lspci:
+                assert detection._get_gpu_name("0x10de", "0x2504", "0000:01:00.0") == "GA106"
+                assert detection._get_gpu_name("0x10de", "0x9999", "0000:01:00.0") == "lspci"
+        lspci.assert_called_once_with("0000:01:00.0")
+
+    @staticmethod
+    def _pci_tree(tmp_path, bridge_device):
+        """Build root port -> bridge -> GPU under a fake /sys/devices."""
+        root_port = tmp_path / "pci0000:00" / "0000:00:1c.4"
+        bridge = root_port / "0000:3b:00.0"
+        gpu = bridge / "0000:3c:00.0"
+        gpu.mkdir(parents=True)
+        for path, vendor, device in (
+            (root_port, "0x8086", "0xa33c"),
+            (bridge, "0x8086", bridge_device),
+        ):
+            (path / "class").write_text("0x060400\n")
+            (path / "vendor").write_text(vendor + "\n")
+            (path / "device").write_text(device + "\n")
+        return gpu
+
+    def test_gpu_behind_thunderbolt_bridge(self, tmp_path):
+        """Test a GPU below an Intel Thunderbolt bridge is external."""
+        from platforms.detection import _pci_device_is_behind_thunderbolt
+
+        gpu = self._pci_tree(tmp_path, "0x15d3")
+        assert _pci_device_is_behind_thunderbolt(gpu) is True
+
+    def test_gpu_on_internal_bridge(self, tmp_path):
+        """Test a high bus number alone does not make a GPU external."""
+        from platforms.detection import _pci_device_is_behind_thunderbolt
+
+        gpu = self._pci_tree(tmp_path, "0x1901")
+        assert _pci_device_is_behind_thunderbolt(gpu) is False
+
+        (gpu / "removable").write_text("removable\n")
+        assert _pci_device_is_behind_thunderbolt(gpu) is True
+
+    def test_scan_drm_class(self, tmp_path, monkeypatch):
+        """Test cards sort numerically and connectors drive the active GPU."""
+        from platforms import detection
+
+        for name in ("card10", "card1", "card1-DP-1", "card1-HDMI-A-1",
+                     "renderD128", "version"):
+            (tmp_path / name).mkdir()
+        (tmp_path / "card1-DP-1" / "status").write_text("disconnected\n")
+        (tmp_path / "card1-HDMI-A-1" / "status").write_text("connected\n")
+        monkeypatch.setattr(detection, "DRM_CLASS_PATH", str(tmp_path))
+        monkeypatch.delenv("DRI_PRIME", raising=False)
+
+        cards, connectors = detection._scan_drm_class()
+        assert cards == ["card1", "card10"]
+        assert connectors == ["card1-DP-1", "card1-HDMI-A-1"]
+        assert detection._get_active_rendering_gpu(connectors) == "card1"
+
+    def test_has_egpu_enclosure(self, tmp_path, monkeypatch):
+        """Test enclosure names are matched case-insensitively."""
+        from platforms import detection
+
+        monkeypatch.setattr(detection, "THUNDERBOLT_DEVICES_PATH", str(tmp_path))
+        (tmp_path / "0-0").mkdir()
+        (tmp_path / "0-0" / "device_name").write_text("Dock\n")
+        assert detection._has_egpu_enclosure() is False
+
+        (tmp_path / "0-1").mkdir()
+        (tmp_path / "0-1" / "device_name").write_text("Razer Core X\n")
+        assert detection._has_egpu_enclosure() is True
+
+        monkeypatch.setattr(detection, "THUNDERBOLT_DEVICES_PATH", str(tmp_path / "missing"))
+        assert detection._has_egpu_enclosure() is False
+
+    def test_read_uevent_missing(self, tmp_path):
+        """Test a missing uevent yields an empty mapping."""
+        from platforms.detection import _read_uevent
+
+        assert _read_uevent(tmp_path) == {}
+
+
+class TestNvidiaCapabilities:
+    """Tests for NVIDIA generation classification."""
+
+    @pytest.fixture(autouse=True)
+    def clear_detection_caches(self):
+        from platforms.detection import invalidate_detection_cache
+
+        invalidate_detection_cache()
+        yield
+        invalidate_detection_cache()
+
+    @staticmethod
+    def _gpu(name):
+        from platforms.detection import GPUInfo
+
+        return GPUInfo(
+            card_path="/sys/class/drm/card0",
+            vendor="nvidia",
+            vendor_id="0x10de",
+            device_id="0x2504",
+            name=name,
+            is_egpu=False,
+            is_primary=True,
+            is_rendering=True,
+            driver="nvidia",
+        )
+
+    @pytest.mark.parametrize("name, arch, generation", [
+        ("GA106 [GeForce RTX 3060 Lite Hash Rate]", "GA106", "ampere"),
+        ("AD102 [GeForce RTX 4090]", "AD102", "ada"),
+        ("GB202 [GeForce RTX 5090]", "GB202", "blackwell"),
+        ("TU116 [GeForce GTX 1660 SUPER]", "TU116", "turing"),
+        ("GP104 [GeForce GTX 1080]", "GP104", "pascal"),
+    ])
+    def test_architecture_code(self, name, arch, generation):
+        """Test the architecture code selects the generation."""
+        from platforms.detection import _detect_nvidia_capabilities_uncached
+
+        with patch("subprocess.run", side_effect=FileNotFoundError):
+            caps = _detect_nvidia_capabilities_uncached(self._gpu(name))
+
+        assert caps.architecture_code == arch
+        assert caps.generation == generation
+
+    @pytest.mark.parametrize("name, generation", [
+        ("NVIDIA GeForce RTX 4070", "ada"),
+        ("NVIDIA GeForce GTX 1660 Ti", "turing"),
+        ("NVIDIA GeForce GTX 1070", "pascal"),
+        ("NVIDIA RTX A4000", "ampere"),
+    ])
+    def test_name_pattern_fallback(self, name, generation):
+        """Test the marketing name is used when no architecture code is present."""
+        from platforms.detection import _detect_nvidia_capabilities_uncached
+
+        with patch("subprocess.run", side_effect=FileNotFoundError):
+            caps = _detect_nvidia_capabilities_uncached(self._gpu(name))
+
+        assert caps.architecture_code == "unknown"
+        assert caps.generation == generation
+
+    def test_vram_queried_once_per_gpu(self):
+        """Test nvidia-smi runs once per PCI slot and is scoped to that GPU."""
+        from platforms.detection import _detect_nvidia_capabilities_uncached
+
+        gpu = replace(self._gpu("GA106 [GeForce RTX 3060 Lite Hash Rate]"),
+                      pci_slot="0000:01:00.0")
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0, stdout=b"12288\n")
+            first = _detect_nvidia_capabilities_uncached(gpu)
+            second = _detect_nvidia_capabilities_uncached(gpu)
+
+        assert first.vram_mb == second.vram_mb == 12288
+        mock_run.assert_called_once()
+        assert mock_run.call_args[0][0][-2:] == ["-i", "0000:01:00.0"]
+
+    def test_vram_failure_not_cached(self):
+        """Test a failed nvidia-smi query is retried on the next detection."""
+        from platforms.detection import _detect_nvidia_capabilities_uncached
+
+        gpu = replace(self._gpu("GA106 [GeForce RTX 3060 Lite Hash Rate]"),
+                      pci_slot="0000:02:00.0")
+        with patch("subprocess.run") as mock_run:
+            mock_run.side_effect = [subprocess.TimeoutExpired("nvidia-smi", 5),
+                                    MagicMock(returncode=0, stdout=b"12288\n")]
+            _detect_nvidia_capabilities_uncached(gpu)
+            caps = _detect_nvidia_capabilities_uncached(gpu)
+
+        assert caps.vram_mb == 12288
+        assert mock_run.call_count == 2
+
+    def test_unknown_generation_uses_conservative_limits(self):
+        """Test GPUs matching no generation get the conservative defaults."""
+        from platforms.detection import _classify_nvidia
+
+        caps = _classify_nvidia("GM204 [GeForce GTX 970]")
+
+        assert caps.generation == "unknown"
+        assert (caps.safe_core_offset_max, caps.safe_mem_offset_max,
+                caps.safe_power_limit_max) == (100, 300, 105)
+        assert caps.supports_resizable_bar is False
+
+    def test_classify_nvidia_without_io(self):
+        """Test classification by name alone touches neither sysfs nor nvidia-smi."""
+        from platforms.detection import _classify_nvidia
+
+        with patch("subprocess.run") as mock_run, patch("builtins.open") as mock_open_:
+            caps = _classify_nvidia("AD103 [GeForce RTX 4080]", vram_mb=16376)
+
+        assert caps.generation == "ada"
+        assert caps.vram_mb == 16376
+        assert caps.tdp_watts == 320
+        mock_run.assert_not_called()
+        mock_open_.assert_not_called()
+
+    @pytest.mark.parametrize("name, vram_mb, tdp", [
+        ("GA106 [GeForce RTX 3060 Lite Hash Rate]", 12288, 170),
+        ("GA102 [GeForce RTX 3080]", 10240, 320),
+        ("GA102 [GeForce RTX 3080 12GB]", 12288, 320),
+        ("AD102 [GeForce RTX 4090]", 24576, 450),
+        ("GB202 [GeForce RTX 5090]", 8192, 575),
+        ("TU116 [GeForce GTX 1660 SUPER]", 8192, 170),
+    ])
+    def test_sku_estimates_without_nvidia_smi(self, name, vram_mb, tdp):
+        """Test VRAM and TDP are estimated from the model number."""
+        from platforms.detection import _detect_nvidia_capabilities_uncached
+
+        with patch("subprocess.run", side_effect=FileNotFoundError):
+            caps = _detect_nvidia_capabilities_uncached(self._gpu(name))
+
+        assert caps.vram_mb == vram_mb
+        assert caps.tdp_watts == tdp
+
+
 class TestNICCapabilities:
     """Tests for NICCapabilities dataclass and detect_nic_capabilities function."""
 
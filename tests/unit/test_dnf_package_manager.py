@@ -1,10 +1,23 @@
 # TEAM_005: Unit tests for DnfPackageManager
 """Tests for the platforms.traditional.rpm module."""
 
+import io
+import subprocess
+import threading
+
 import pytest
 from unittest.mock import patch, MagicMock
 
-from platforms.traditional.rpm import DnfPackageManager
+from platforms.traditional import rpm as rpm_module
+from platforms.traditional.rpm import DnfPackageManager, get_package_manager
+
+
+def dnf_process(returncode=0, stderr=""):
+    """Build a fake dnf Popen object whose stderr streams the given text."""
+    process = MagicMock()
+    process.stderr = io.StringIO(stderr)
+    process.wait.return_value = returncode
+    return process
 
 
 class TestDnfPackageManager:
@@ -13,34 +26,75 @@ class TestDnfPackageManager:
     def test_is_installed_true(self):
         """Test checking an installed package."""
         with patch("subprocess.run") as mock_run:
-            mock_run.return_value = MagicMock(returncode=0)
+            mock_run.return_value = MagicMock(returncode=0, stdout=b"bash\npython3\n")
             dnf = DnfPackageManager()
             result = dnf.is_installed("python3")
         
         assert result is True
         mock_run.assert_called_once()
-        assert "rpm" in mock_run.call_args[0][0]
-        assert "-q" in mock_run.call_args[0][0]
+        assert mock_run.call_args[0][0][0].endswith("rpm")
+        assert "-qa" in mock_run.call_args[0][0]
     
     def test_is_installed_false(self):
         """Test checking a non-installed package."""
         with patch("subprocess.run") as mock_run:
-            mock_run.return_value = MagicMock(returncode=1)
+            mock_run.return_value = MagicMock(returncode=0, stdout=b"bash\npython3\n")
             dnf = DnfPackageManager()
             result = dnf.is_installed("nonexistent-package-12345")
         
         assert result is False
     
+    def test_is_installed_uses_rpm_bindings(self):
+        """Test the rpmdb is queried in-process when python3-rpm is present."""
+        ts = MagicMock()
+        ts.dbMatch.side_effect = lambda tag, name: iter([object()] if name == "bash" else [])
+        fake_rpm = MagicMock(TransactionSet=MagicMock(return_value=ts))
+        with patch.object(rpm_module, "RPM_BINDINGS_AVAILABLE", True), \
+                patch.object(rpm_module, "_rpm", fake_rpm, create=True), \
+                patch.object(DnfPackageManager, "_ts", None), \
+                patch("subprocess.run") as mock_run:
+            dnf = DnfPackageManager()
+            assert dnf.is_installed("bash") is True
+            assert dnf.is_installed("htop") is False
+        
+        mock_run.assert_not_called()
+        fake_rpm.TransactionSet.assert_called_once()
+    
+    def test_rpm_queries_spawn_without_closing_fds(self):
+        """Test rpm runs by absolute path with close_fds=False (posix_spawn)."""
+        with patch.object(rpm_module, "which", return_value="/usr/bin/rpm"):
+            with patch("subprocess.run", return_value=MagicMock(returncode=0, stdout=b"bash\n")) as mock_run:
+                DnfPackageManager().is_installed("bash")
+        
+        assert mock_run.call_args[0][0][0] == "/usr/bin/rpm"
+        assert mock_run.call_args[1]["close_fds"] is False
+        assert mock_run.call_args[1]["stdin"] == subprocess.DEVNULL
+    
+    def test_missing_rpm_is_not_executed_again(self):
+        """Test a missing rpm binary is remembered and later probes fail fast."""
+        with patch.object(rpm_module, "which", return_value="/nonexistent/rpm"), \
+                patch.dict(rpm_module._BINARIES_AVAILABLE, clear=True), \
+                patch("subprocess.run", wraps=subprocess.run) as mock_run:
+            dnf = DnfPackageManager()
+            assert dnf.is_installed("bash") is False
+            assert dnf.is_installed("htop") is False
+        
+        mock_run.assert_called_once()
+    
+    def test_programming_errors_propagate(self):
+        """Test only process errors are turned into a False result."""
+        with patch("subprocess.Popen", side_effect=TypeError("bad argument")):
+            with pytest.raises(TypeError):
+                DnfPackageManager().install(["htop"])
+    
     def test_install_success(self):
         """Test successful package installation."""
-        with patch.object(DnfPackageManager, "is_installed", return_value=False):
-            with patch("subprocess.run") as mock_run:
-                mock_run.return_value = MagicMock(returncode=0)
-                dnf = DnfPackageManager()
-                result = dnf.install(["htop", "neofetch"])
+        with patch("subprocess.Popen", return_value=dnf_process()) as mock_popen:
+            dnf = DnfPackageManager()
+            result = dnf.install(["htop", "neofetch"])
         
         assert result is True
-        cmd = mock_run.call_args[0][0]
+        cmd = mock_popen.call_args[0][0]
         assert "dnf" in cmd
         assert "install" in cmd
         assert "-y" in cmd
@@ -49,7 +103,8 @@ class TestDnfPackageManager:
     
     def test_install_already_installed(self):
         """Test install returns True when packages already installed (idempotent)."""
-        with patch.object(DnfPackageManager, "is_installed", return_value=True):
+        stderr = "Package htop-3.3.0-1.fc40.x86_64 is already installed.\n"
+        with patch("subprocess.Popen", return_value=dnf_process(0, stderr)):
             dnf = DnfPackageManager()
             result = dnf.install(["htop", "neofetch"])
         
@@ -57,14 +112,160 @@ class TestDnfPackageManager:
     
     def test_install_failure(self):
         """Test failed package installation."""
-        with patch.object(DnfPackageManager, "is_installed", return_value=False):
-            with patch("subprocess.run") as mock_run:
-                mock_run.return_value = MagicMock(returncode=1, stderr=b"Error: No package found")
-                dnf = DnfPackageManager()
-                result = dnf.install(["nonexistent-package"])
+        with patch("subprocess.Popen", return_value=dnf_process(1, "Error: No package found\n")):
+            dnf = DnfPackageManager()
+            result = dnf.install(["nonexistent-package"])
         
         assert result is False
     
+    def test_install_nothing_to_do(self):
+        """Test a "Nothing to do" failure from dnf counts as success."""
+        stderr = "Last metadata expiration check: 0:01:02 ago\nNothing to do.\n"
+        with patch("subprocess.Popen", return_value=dnf_process(1, stderr)):
+            assert DnfPackageManager().install(["htop"]) is True
+    
+    def test_run_dnf_discards_stdout_and_streams_stderr(self):
+        """Test dnf stdout is not captured and stderr is scanned per line."""
+        with patch("subprocess.Popen", return_value=dnf_process(0, "a\nPackage htop is already installed.\n")) as mock_popen:
+            result = DnfPackageManager()._run_dnf(["dnf"], 10, DnfPackageManager._INSTALL_OK_RE)
+        
+        assert result == (0, True, "a\nPackage htop is already installed.\n")
+        assert mock_popen.call_args[1]["stdout"] == subprocess.DEVNULL
+        assert mock_popen.call_args[1]["stdin"] == subprocess.DEVNULL
+    
+    def test_run_dnf_timeout_kills(self):
+        """Test a dnf run past its timeout is killed and reported."""
+        with pytest.raises(subprocess.TimeoutExpired):
+            DnfPackageManager()._run_dnf(["sleep", "5"], 0.1)
+    
+    def test_install_leaves_idempotency_to_dnf(self):
+        """Test install runs no rpm pre-check and passes every package to dnf."""
+        with patch("subprocess.run") as mock_run, \
+                patch("subprocess.Popen", return_value=dnf_process()) as mock_popen:
+            dnf = DnfPackageManager()
+            result = dnf.install(["htop", "neofetch"])
+        
+        assert result is True
+        mock_run.assert_not_called()
+        assert mock_popen.call_args[0][0] == [
+            "sudo", "dnf", "install", "-y", "--setopt=max_parallel_downloads=10", "htop", "neofetch"
+        ]
+    
+    def test_filter_installed_single_query(self):
+        """Test the rpm fallback answers every package with one call."""
+        probe = MagicMock(returncode=1, stdout=b"htop\npaket neofetch ist nicht installiert\n")
+        with patch.object(DnfPackageManager, "_get_installed_set", return_value=None), \
+                patch("subprocess.run", return_value=probe) as mock_run:
+            result = DnfPackageManager()._filter_installed(["htop", "neofetch"])
+        
+        assert result == ({"htop"}, {"neofetch"})
+        mock_run.assert_called_once()
+    
+    def test_filter_installed_retries_timeout_once(self, caplog):
+        """Test a locked rpmdb gets one retry, then a warning."""
+        timeout = subprocess.TimeoutExpired("rpm", 2.0)
+        with patch.object(DnfPackageManager, "_get_installed_set", return_value=None), \
+                patch.object(rpm_module.time, "sleep"):
+            with patch("subprocess.run", side_effect=[timeout, MagicMock(returncode=0)]) as mock_run:
+                assert DnfPackageManager()._filter_installed(["htop"]) == ({"htop"}, set())
+            assert mock_run.call_args[1]["timeout"] == DnfPackageManager._QUERY_TIMEOUT
+            
+            with patch("subprocess.run", side_effect=timeout) as mock_run:
+                assert DnfPackageManager()._filter_installed(["htop"]) == (set(), {"htop"})
+        
+        assert mock_run.call_count == 2
+        assert "timed out twice" in caplog.text
+    
+    def test_installed_list_read_once(self):
+        """Test repeated probes share one rpm -qa until packages change."""
+        listing = MagicMock(returncode=0, stdout=b"bash\nhtop\n")
+        with patch("subprocess.run", return_value=listing) as mock_run, \
+                patch("subprocess.Popen", return_value=dnf_process()):
+            dnf = DnfPackageManager()
+            assert dnf.is_installed("htop") is True
+            assert dnf.is_installed("neofetch") is False
+            assert dnf.install(["htop", "neofetch"]) is True
+            assert mock_run.call_count == 1
+            dnf.is_installed("htop")
+        
+        assert mock_run.call_count == 2
+    
+    def test_install_download_options(self):
+        """Test parallel downloads are capped and weak deps can be skipped."""
+        with patch("subprocess.Popen", return_value=dnf_process()) as mock_popen:
+            DnfPackageManager(parallel_downloads=100, install_weak_deps=False).install(["htop"])
+        
+        cmd = mock_popen.call_args[0][0]
+        assert "--setopt=max_parallel_downloads=20" in cmd
+        assert "--setopt=install_weak_deps=False" in cmd
+    
+    def test_install_many_keeps_group_order(self):
+        """Test each group gets its own dnf call and result, in order."""
+        def popen(cmd, **kwargs):
+            return dnf_process(1 if "bad" in cmd else 0, "Error: Unable to find a match\n")
+        
+        with patch("subprocess.Popen", side_effect=popen) as mock_popen:
+            results = DnfPackageManager().install_many([["htop"], ["bad"], ["gamemode", "mangohud"]])
+        
+        assert results == [True, False, True]
+        assert mock_popen.call_count == 3
+    
+    def test_batch_runs_one_transaction_per_kind(self):
+        """Test queued calls are merged into one remove and one install."""
+        with patch("subprocess.Popen", side_effect=lambda *a, **k: dnf_process()) as mock_popen:
+            dnf = DnfPackageManager()
+            with dnf.batch() as results:
+                assert dnf.install(["gamemode"]) is True
+                dnf.remove(["gnome-tour"])
+                dnf.install(["mangohud", "gamemode"])
+                mock_popen.assert_not_called()
+        
+        assert results == {"remove": True, "install": True}
+        commands = [c[0][0] for c in mock_popen.call_args_list]
+        assert commands[0] == ["sudo", "dnf", "remove", "-y", "gnome-tour"]
+        assert commands[1][-2:] == ["gamemode", "mangohud"]
+    
+    def test_batch_discarded_on_error(self):
+        """Test nothing runs when the batch block raises."""
+        with patch("subprocess.Popen") as mock_popen:
+            dnf = DnfPackageManager()
+            with pytest.raises(RuntimeError):
+                with dnf.batch():
+                    dnf.install(["htop"])
+                    raise RuntimeError("abort")
+        
+        mock_popen.assert_not_called()
+        assert dnf._current_batch() is None
+    
+    def test_batch_only_queues_calls_from_its_thread(self):
+        """Test another thread's install runs at once instead of joining the batch."""
+        with patch("subprocess.Popen", side_effect=lambda *a, **k: dnf_process()) as mock_popen:
+            dnf = DnfPackageManager()
+            with dnf.batch() as results:
+                worker = threading.Thread(target=dnf.install, args=(["htop"],))
+                worker.start()
+                worker.join()
+                assert mock_popen.call_count == 1
+                dnf.install(["gamemode"])
+        
+        assert results == {"install": True}
+        assert [c[0][0][-1] for c in mock_popen.call_args_list] == ["htop", "gamemode"]
+    
+    def test_nested_batch_raises(self):
+        """Test a nested batch is rejected and the outer batch still runs."""
+        with patch("subprocess.Popen", side_effect=lambda *a, **k: dnf_process()) as mock_popen:
+            dnf = DnfPackageManager()
+            with dnf.batch() as results:
+                dnf.install(["gamemode"])
+                with pytest.raises(RuntimeError):
+                    with dnf.batch():
+                        pass
+                dnf.install(["mangohud"])
+        
+        assert results == {"install": True}
+        mock_popen.assert_called_once()
+        assert mock_popen.call_args[0][0][-2:] == ["gamemode", "mangohud"]
+    
     def test_install_empty_list(self):
         """Test installing empty package list."""
         dnf = DnfPackageManager()
@@ -73,20 +274,28 @@ class TestDnfPackageManager:
     
     def test_remove_success(self):
         """Test successful package removal."""
-        with patch.object(DnfPackageManager, "is_installed", return_value=True):
-            with patch("subprocess.run") as mock_run:
-                mock_run.return_value = MagicMock(returncode=0)
-                dnf = DnfPackageManager()
-                result = dnf.remove(["htop"])
+        with patch("subprocess.Popen", return_value=dnf_process()) as mock_popen:
+            dnf = DnfPackageManager()
+            result = dnf.remove(["htop"])
         
         assert result is True
-        cmd = mock_run.call_args[0][0]
+        cmd = mock_popen.call_args[0][0]
         assert "dnf" in cmd
         assert "remove" in cmd
     
+    def test_remove_logs_count_at_info(self, caplog):
+        """Test package names are kept out of the info log."""
+        caplog.set_level("INFO", logger=rpm_module.__name__)
+        with patch("subprocess.Popen", return_value=dnf_process()):
+            DnfPackageManager().remove(["htop", "neofetch"])
+        
+        assert "Removing 2 packages" in caplog.text
+        assert "htop" not in caplog.text
+    
     def test_remove_not_installed(self):
         """Test remove returns True when package not installed (idempotent)."""
-        with patch.object(DnfPackageManager, "is_installed", return_value=False):
+        stderr = "No match for argument: htop\nError: No packages marked for removal.\n"
+        with patch("subprocess.Popen", return_value=dnf_process(1, stderr)):
             dnf = DnfPackageManager()
             result = dnf.remove(["htop"])
         
@@ -94,12 +303,16 @@ class TestDnfPackageManager:
     
     def test_update_success(self):
         """Test successful cache update."""
-        with patch("subprocess.run") as mock_run:
-            mock_run.return_value = MagicMock(returncode=0)
+        with patch("subprocess.Popen", return_value=dnf_process()) as mock_popen:
             dnf = DnfPackageManager()
             result = dnf.update()
         
         assert result is True
-        cmd = mock_run.call_args[0][0]
+        cmd = mock_popen.call_args[0][0]
         assert "dnf" in cmd
         assert "makecache" in cmd
+    
+    def test_get_package_manager_is_shared(self):
+        """Test every caller gets the same manager and installed-package cache."""
+        assert isinstance(get_package_manager(), DnfPackageManager)
+        assert get_package_manager() is get_package_manager()
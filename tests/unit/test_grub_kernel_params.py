@@ -1,8 +1,10 @@
 # TEAM_005: Unit tests for GrubKernelParams
 """Tests for the platforms.traditional.grub module."""
 
+import os
+
 import pytest
-from unittest.mock import patch, mock_open, MagicMock
+from unittest.mock import patch, MagicMock
 from pathlib import Path
 
 from platforms.traditional.grub import GrubKernelParams
@@ -21,28 +23,83 @@ GRUB_DISABLE_RECOVERY="true"
 class TestGrubKernelParams:
     """Tests for GrubKernelParams class."""
     
-    def test_get_current_params(self):
+    @staticmethod
+    def _read_params(tmp_path, contents):
+        """Read params from a grub config holding contents."""
+        grub_file = tmp_path / "grub"
+        grub_file.write_text(contents)
+        with patch.object(GrubKernelParams, "GRUB_DEFAULT", grub_file):
+            return GrubKernelParams().get_current_params()
+    
+    def test_get_current_params(self, tmp_path):
         """Test reading current params from grub config."""
-        with patch("builtins.open", mock_open(read_data=SAMPLE_GRUB)):
-            with patch.object(Path, "exists", return_value=True):
-                grub = GrubKernelParams()
-                params = grub.get_current_params()
+        params = self._read_params(tmp_path, SAMPLE_GRUB)
         
         assert "rhgb" in params
         assert "quiet" in params
         assert len(params) == 2
     
-    def test_get_current_params_empty(self):
+    def test_get_current_params_empty(self, tmp_path):
         """Test reading empty params."""
-        grub_empty = '''GRUB_CMDLINE_LINUX=""
-'''
-        with patch("builtins.open", mock_open(read_data=grub_empty)):
-            with patch.object(Path, "exists", return_value=True):
-                grub = GrubKernelParams()
-                params = grub.get_current_params()
+        params = self._read_params(tmp_path, 'GRUB_CMDLINE_LINUX=""\n')
         
         assert params == []
     
+    def test_get_current_params_empty_file(self, tmp_path):
+        """Test an empty config, which cannot be mapped, has no params."""
+        assert self._read_params(tmp_path, "") == []
+    
+    def test_get_current_params_ignores_default_and_comments(self, tmp_path):
+        """Test only the GRUB_CMDLINE_LINUX line is read, with shell quoting."""
+        grub_config = '''#GRUB_CMDLINE_LINUX="commented"
+GRUB_CMDLINE_LINUX_DEFAULT="splash"
+GRUB_CMDLINE_LINUX='rhgb quiet acpi_osi="Windows 2020"'
+'''
+        params = self._read_params(tmp_path, grub_config)
+
+        assert params == ["rhgb", "quiet", 'acpi_osi="Windows 2020"']
+
+    @staticmethod
+    def _write_params(grub_file, params):
+        """Replace every param in grub_file without backups or grub-mkconfig."""
+        with patch.object(GrubKernelParams, "GRUB_DEFAULT", grub_file):
+            with patch.object(GrubKernelParams, "_run_grub_mkconfig", return_value=True):
+                return GrubKernelParams()._read_modify_write(lambda _: params, backup=False)
+
+    def test_write_grub_config_replaces_cmdline(self, tmp_path):
+        """Test writing swaps the cmdline line and leaves the rest untouched."""
+        grub_file = tmp_path / "grub"
+        grub_file.write_text(SAMPLE_GRUB)
+        assert self._write_params(grub_file, ["rhgb", "mitigations=off"]) is True
+
+        expected = SAMPLE_GRUB.replace('"rhgb quiet"', '"rhgb mitigations=off"')
+        assert grub_file.read_text() == expected
+
+    def test_write_grub_config_appends_missing_cmdline(self, tmp_path):
+        """Test a config without GRUB_CMDLINE_LINUX gets one appended."""
+        grub_file = tmp_path / "grub"
+        grub_file.write_text("GRUB_TIMEOUT=5")
+        assert self._write_params(grub_file, ["quiet"]) is True
+
+        assert grub_file.read_text() == 'GRUB_TIMEOUT=5\nGRUB_CMDLINE_LINUX="quiet"\n'
+
+    def test_get_current_params_single_quoted_value(self, tmp_path):
+        """Test a single-quoted value inside the param stays one param."""
+        params = self._read_params(tmp_path, '''GRUB_CMDLINE_LINUX="foo='a b' bar"\n''')
+        
+        assert params == ["foo='a b'", "bar"]
+    
+    @pytest.mark.parametrize("params", [
+        ["rhgb", "quiet"],
+        ["quiet", 'acpi_osi="Windows 2020"'],
+        ["foo='a b'", "bar"],
+    ])
+    def test_render_round_trips_quoted_params(self, params):
+        """Test rendered configs parse back to the same params."""
+        data = GrubKernelParams._render_cmdline("GRUB_TIMEOUT=5\n", params)
+        
+        assert GrubKernelParams._parse_cmdline(data) == params
+    
     def test_get_current_params_no_file(self):
         """Test handling missing grub config."""
         with patch.object(Path, "exists", return_value=False):
@@ -51,47 +108,99 @@ class TestGrubKernelParams:
         
         assert params == []
     
-    def test_append_deduplicates(self):
+    @pytest.fixture
+    def grub_file(self, tmp_path):
+        """A writable grub config and backup dir in place of the system paths."""
+        grub_file = tmp_path / "grub"
+        grub_file.write_text(SAMPLE_GRUB.replace('"rhgb quiet"', '"rhgb quiet mitigations=auto"'))
+        with patch.object(GrubKernelParams, "GRUB_DEFAULT", grub_file):
+            with patch.object(GrubKernelParams, "GRUB_BACKUP_DIR", tmp_path / "backups"):
+                with patch.object(GrubKernelParams, "_run_grub_mkconfig", return_value=True):
+                    yield grub_file
+    
+    def test_append_deduplicates(self, grub_file):
         """Test that append deduplicates by param name."""
-        with patch.object(GrubKernelParams, "get_current_params", return_value=["rhgb", "quiet", "mitigations=auto"]):
-            with patch.object(GrubKernelParams, "_backup_grub_config", return_value=None):
-                with patch.object(GrubKernelParams, "_write_grub_config") as mock_write:
-                    with patch.object(GrubKernelParams, "_run_grub_mkconfig", return_value=True):
-                        grub = GrubKernelParams()
-                        result = grub.append_params(["mitigations=off"])
+        result = GrubKernelParams().append_params(["mitigations=off"])
         
         assert result is True
-        written_params = mock_write.call_args[0][0]
-        assert "mitigations=off" in written_params
-        assert "mitigations=auto" not in written_params
-        assert "rhgb" in written_params
-        assert "quiet" in written_params
+        written_params = GrubKernelParams._parse_cmdline(grub_file.read_text())
+        assert written_params == ["rhgb", "quiet", "mitigations=off"]
     
-    def test_remove_params(self):
+    def test_append_backs_up_and_swaps_atomically(self, grub_file):
+        """Test the original is backed up and the config replaced in one rename."""
+        original = grub_file.read_text()
+        with patch("os.rename", wraps=os.rename) as mock_rename:
+            assert GrubKernelParams().append_params(["nowatchdog"]) is True
+        
+        backups = list((grub_file.parent / "backups").iterdir())
+        assert [b.read_text() for b in backups] == [original]
+        mock_rename.assert_called_once_with(grub_file.with_suffix(".tmp"), grub_file)
+        assert not grub_file.with_suffix(".tmp").exists()
+    
+    def test_append_keeps_non_utf8_bytes_and_syncs(self, grub_file):
+        """Test Latin-1 comments survive the rewrite and the temp file is fsynced."""
+        grub_file.write_bytes(b"# caf\xe9\n" + grub_file.read_bytes())
+        with patch("os.fsync", wraps=os.fsync) as mock_fsync:
+            assert GrubKernelParams().append_params(["nowatchdog"]) is True
+        
+        assert grub_file.read_bytes().startswith(b"# caf\xe9\n")
+        mock_fsync.assert_called_once()
+    
+    def test_get_current_params_non_utf8_cmdline(self, grub_file):
+        """Test a non-UTF-8 byte on the cmdline line is read like the write path reads it."""
+        grub_file.write_bytes(b'GRUB_CMDLINE_LINUX="quiet label=caf\xe9"\n')
+        
+        params = GrubKernelParams().get_current_params()
+        
+        assert params == ["quiet", "label=caf\udce9"]
+        assert params == GrubKernelParams._parse_cmdline(
+            grub_file.read_bytes().decode(errors="surrogateescape"))
+    
+    def test_apply_profile_swaps_atomically(self, grub_file):
+        """Test a profile replaces every param through the atomic rename, non-UTF-8 bytes kept."""
+        grub_file.write_bytes(b"# caf\xe9\n" + grub_file.read_bytes())
+        profiles = grub_file.parent / "profiles"
+        profiles.mkdir()
+        (profiles / "gaming.conf").write_text("quiet\nnowatchdog\n")
+        with patch.object(GrubKernelParams, "PROFILE_DIR", profiles):
+            with patch("os.rename", wraps=os.rename) as mock_rename:
+                assert GrubKernelParams().apply_profile("gaming") is True
+        
+        mock_rename.assert_called_once_with(grub_file.with_suffix(".tmp"), grub_file)
+        assert grub_file.read_bytes().startswith(b"# caf\xe9\n")
+        assert GrubKernelParams._scan_cmdline(grub_file) == ["quiet", "nowatchdog"]
+        assert len(list((grub_file.parent / "backups").iterdir())) == 1
+    
+    def test_backup_grub_config_copies_metadata(self, grub_file):
+        """Test the profile backup matches the original's contents and mode."""
+        grub_file.chmod(0o600)
+        backup = GrubKernelParams()._backup_grub_config()
+        
+        assert backup.read_text() == grub_file.read_text()
+        assert backup.stat().st_mode == grub_file.stat().st_mode
+    
+    def test_backup_falls_back_without_reflink(self, grub_file):
+        """Test a byte copy is made where FICLONE is unsupported."""
+        with patch("fcntl.ioctl", side_effect=OSError(95, "Operation not supported")):
+            backup = GrubKernelParams()._backup_grub_config()
+        
+        assert backup.read_text() == grub_file.read_text()
+    
+    def test_remove_params(self, grub_file):
         """Test removing params."""
-        with patch.object(GrubKernelParams, "get_current_params", return_value=["rhgb", "quiet", "mitigations=off"]):
-            with patch.object(GrubKernelParams, "_backup_grub_config", return_value=None):
-                with patch.object(GrubKernelParams, "_write_grub_config") as mock_write:
-                    with patch.object(GrubKernelParams, "_run_grub_mkconfig", return_value=True):
-                        grub = GrubKernelParams()
-                        result = grub.remove_params(["mitigations"])
+        result = GrubKernelParams().remove_params(["mitigations"])
         
         assert result is True
-        written_params = mock_write.call_args[0][0]
-        assert "mitigations=off" not in written_params
+        written_params = GrubKernelParams._parse_cmdline(grub_file.read_text())
+        assert "mitigations=auto" not in written_params
         assert "rhgb" in written_params
     
-    def test_replace_param(self):
+    def test_replace_param(self, grub_file):
         """Test replacing a param."""
-        with patch.object(GrubKernelParams, "get_current_params", return_value=["rhgb", "quiet", "mitigations=auto"]):
-            with patch.object(GrubKernelParams, "_backup_grub_config", return_value=None):
-                with patch.object(GrubKernelParams, "_write_grub_config") as mock_write:
-                    with patch.object(GrubKernelParams, "_run_grub_mkconfig", return_value=True):
-                        grub = GrubKernelParams()
-                        result = grub.replace_param("mitigations=auto", "mitigations=off")
+        result = GrubKernelParams().replace_param("mitigations=auto", "mitigations=off")
         
         assert result is True
-        written_params = mock_write.call_args[0][0]
+        written_params = GrubKernelParams._parse_cmdline(grub_file.read_text())
         assert "mitigations=off" in written_params
         assert "mitigations=auto" not in written_params
     
@@ -113,7 +222,7 @@ class TestGrubMkconfig:
         """Test using grub2-mkconfig on Fedora."""
         with patch("shutil.which") as mock_which:
             mock_which.side_effect = lambda x: "/usr/sbin/grub2-mkconfig" if x == "grub2-mkconfig" else None
-            with patch.object(Path, "exists", return_value=True):
+            with patch.object(GrubKernelParams, "_find_grub_cfg", return_value=Path("/boot/grub2/grub.cfg")):
                 with patch("subprocess.run") as mock_run:
                     mock_run.return_value = MagicMock(returncode=0)
                     grub = GrubKernelParams()
@@ -122,6 +231,18 @@ class TestGrubMkconfig:
         assert result is True
         assert "grub2-mkconfig" in mock_run.call_args[0][0]
     
+    def test_command_resolved_once(self):
+        """Test the tool lookup is reused across regenerations."""
+        with patch("shutil.which", return_value="/usr/sbin/grub2-mkconfig") as mock_which:
+            with patch.object(GrubKernelParams, "_find_grub_cfg", return_value=Path("/boot/grub2/grub.cfg")):
+                with patch("subprocess.run", return_value=MagicMock(returncode=0)) as mock_run:
+                    grub = GrubKernelParams()
+                    assert grub._run_grub_mkconfig() is True
+                    assert grub._run_grub_mkconfig() is True
+        
+        mock_which.assert_called_once_with("grub2-mkconfig")
+        assert mock_run.call_count == 2
+    
     def test_update_grub_debian(self):
         """Test using update-grub on Debian."""
         with patch("shutil.which") as mock_which:
@@ -130,10 +251,28 @@ class TestGrubMkconfig:
                     return "/usr/sbin/update-grub"
                 return None
             mock_which.side_effect = which_side_effect
-            with patch.object(Path, "exists", return_value=True):
+            with patch.object(GrubKernelParams, "_find_grub_cfg", return_value=Path("/boot/grub2/grub.cfg")):
                 with patch("subprocess.run") as mock_run:
                     mock_run.return_value = MagicMock(returncode=0)
                     grub = GrubKernelParams()
                     result = grub._run_grub_mkconfig()
         
         assert result is True
+    
+    def test_find_grub_cfg_prefers_listed_order(self, tmp_path):
+        """Test the Fedora EFI layout wins over Debian's when both exist."""
+        (tmp_path / "grub").mkdir()
+        (tmp_path / "efi" / "EFI" / "fedora").mkdir(parents=True)
+        paths = (
+            tmp_path / "grub2" / "grub.cfg",
+            tmp_path / "efi" / "EFI" / "fedora" / "grub.cfg",
+            tmp_path / "grub" / "grub.cfg",
+        )
+        with patch.object(GrubKernelParams, "GRUB_CFG_PATHS", paths):
+            assert GrubKernelParams()._find_grub_cfg() == paths[1]
+    
+    def test_find_grub_cfg_missing(self, tmp_path):
+        """Test no path is returned when no layout directory exists."""
+        paths = (tmp_path / "grub2" / "grub.cfg", tmp_path / "missing" / "EFI" / "grub.cfg")
+        with patch.object(GrubKernelParams, "GRUB_CFG_PATHS", paths):
+            assert GrubKernelParams()._find_grub_cfg() is None
@@ -0,0 +1,126 @@
+"""Tests for the platform_support.handheld_extended module."""
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+from platform_support.handheld_extended import (
+    MobileAMDAPU,
+    MultiMonitorManager,
+    _detect_mobile_apu,
+)
+
+
+XRANDR_CURRENT = """Screen 0: minimum 8 x 8, current 4480 x 1440, maximum 32767 x 32767
+DP-0 connected primary 2560x1440+0+0 (normal left inverted right x axis y axis) 597mm x 336mm
+   2560x1440    164.96*+ 143.97   59.95
+   1920x1080     60.00    59.94
+DP-1 disconnected (normal left inverted right x axis y axis)
+HDMI-0 connected 1920x1080+2560+0 (normal left inverted right x axis y axis) 527mm x 296mm
+   1920x1080     60.00*+  74.97
+"""
+
+
+@pytest.fixture(autouse=True)
+def xrandr_available():
+    """Pretend xrandr is on PATH regardless of the test host."""
+    with patch("platform_support.handheld_extended.which", return_value="/usr/bin/xrandr"):
+        yield
+
+
+class TestMultiMonitorManager:
+    """Tests for MultiMonitorManager."""
+
+    def test_detect_monitors_parses_connected_outputs(self):
+        """Only connected outputs are returned, with geometry and primary flag."""
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0, stdout=XRANDR_CURRENT)
+            monitors = MultiMonitorManager().detect_monitors()
+
+        assert [m.name for m in monitors] == ["DP-0", "HDMI-0"]
+        assert monitors[0].resolution == "2560x1440"
+        assert monitors[0].position == "0+0"
+        assert monitors[0].primary is True
+        assert monitors[1].position == "2560+0"
+        assert monitors[1].primary is False
+        assert mock_run.call_args[0][0] == ["xrandr", "--current"]
+
+    def test_detect_monitors_reads_modes_and_current_rate(self):
+        """Mode lines are collected per output and the starred rate is current."""
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0, stdout=XRANDR_CURRENT)
+            monitors = MultiMonitorManager().detect_monitors()
+
+        assert monitors[0].refresh_rate == 165
+        assert ("2560x1440", 143.97) in monitors[0].modes
+        assert ("1920x1080", 59.94) in monitors[0].modes
+        assert monitors[1].refresh_rate == 60
+        assert monitors[1].modes == [("1920x1080", 60.0), ("1920x1080", 74.97)]
+
+    def test_create_gaming_profile_rejects_unknown_mode(self):
+        """An unsupported mode is refused without invoking xrandr to set it."""
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0, stdout=XRANDR_CURRENT)
+            manager = MultiMonitorManager()
+            result = manager.create_gaming_profile("HDMI-0", "1920x1080", 144)
+
+        assert result is False
+        assert mock_run.call_count == 1
+
+    def test_apply_per_monitor_settings_single_call(self):
+        """All outputs are configured by one xrandr invocation."""
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0)
+            result = MultiMonitorManager().apply_per_monitor_settings({
+                "DP-0": {"resolution": "2560x1440", "refresh_rate": 165, "primary": True},
+                "HDMI-0": {"position": "2560x0"},
+            })
+
+        assert result is True
+        mock_run.assert_called_once()
+        assert mock_run.call_args[0][0] == [
+            "xrandr",
+            "--output", "DP-0", "--mode", "2560x1440", "--rate", "165", "--primary",
+            "--output", "HDMI-0", "--pos", "2560x0",
+        ]
+
+    def test_detect_monitors_reuses_recent_result(self):
+        """A second call inside the cache window does not run xrandr again."""
+        with patch("subprocess.run") as mock_run:
+            mock_run.return_value = MagicMock(returncode=0, stdout=XRANDR_CURRENT)
+            manager = MultiMonitorManager()
+            manager.detect_monitors()
+            manager.detect_monitors()
+            assert mock_run.call_count == 1
+
+            manager.detect_monitors(force=True)
+            assert mock_run.call_count == 2
+
+    def test_detect_monitors_xrandr_missing(self):
+        """Missing xrandr yields no monitors without spawning anything."""
+        with patch("platform_support.handheld_extended.which", return_value=None):
+            with patch("subprocess.run") as mock_run:
+                assert MultiMonitorManager().detect_monitors() == []
+        mock_run.assert_not_called()
+
+
+class TestMobileAMDAPU:
+    """Tests for MobileAMDAPU detection."""
+
+    @pytest.fixture(autouse=True)
+    def clear_cache(self):
+        _detect_mobile_apu.cache_clear()
+        yield
+        _detect_mobile_apu.cache_clear()
+
+    @pytest.mark.parametrize("model_name, expected", [
+        ("AMD Ryzen Z1 Extreme", "Z1 Extreme"),
+        ("AMD Ryzen Z1", "Z1"),
+        ("AMD Ryzen 7 6800HS with Radeon Graphics", "6800HS"),
+        ("AMD Ryzen 7 7840U w/ Radeon 780M Graphics", "7840U"),
+        ("AMD Ryzen 9 7950X 16-Core Processor", None),
+    ])
+    def test_detect_apu_prefers_longest_match(self, model_name, expected):
+        """The most specific model name is reported."""
+        cpuinfo = f"processor\t: 0\nmodel name\t: {model_name}\n"
+        with patch("pathlib.Path.read_text", return_value=cpuinfo):
+            assert MobileAMDAPU.detect_apu() == expected
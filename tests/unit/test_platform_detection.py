@@ -1,95 +1,173 @@
 # TEAM_005: Unit tests for platform detection
 """Tests for the platforms.detection module."""
 
+import dataclasses
+import os
+
 import pytest
-from unittest.mock import patch, mock_open, MagicMock
+from unittest.mock import patch, MagicMock
 
+from platforms import detection
 from platforms.detection import (
     PlatformType,
     PlatformInfo,
     detect_platform,
-    _parse_os_release,
+    parse_os_release,
     _check_rpm_ostree_deployment,
     _detect_boot_method,
+    detect_gpus,
+    detect_nvidia_capabilities,
+    invalidate_detection_cache,
 )
 
 
+@pytest.fixture(autouse=True)
+def clear_detection_caches():
+    """Detection results are cached per process; reset them around each test."""
+    invalidate_detection_cache()
+    yield
+    invalidate_detection_cache()
+
+
 class TestParseOsRelease:
-    """Tests for _parse_os_release()."""
+    """Tests for parse_os_release()."""
     
-    def test_parse_fedora(self):
-        os_release = '''NAME="Fedora Linux"
+    def test_parse_fedora(self, tmp_path):
+        os_release = tmp_path / "os-release"
+        os_release.write_text('''NAME="Fedora Linux"
 VERSION_ID="40"
 ID=fedora
 VARIANT_ID=workstation
-'''
-        with patch("builtins.open", mock_open(read_data=os_release)):
-            with patch("pathlib.Path.exists", return_value=True):
-                result = _parse_os_release()
+''')
+        result = parse_os_release(str(os_release))
         
         assert result["NAME"] == "Fedora Linux"
         assert result["VERSION_ID"] == "40"
         assert result["ID"] == "fedora"
         assert result["VARIANT_ID"] == "workstation"
     
-    def test_parse_ultramarine(self):
-        os_release = '''NAME="Ultramarine Linux"
+    def test_parse_ultramarine(self, tmp_path):
+        os_release = tmp_path / "os-release"
+        os_release.write_text('''NAME="Ultramarine Linux"
 VERSION_ID="40"
 ID=ultramarine
-'''
-        with patch("builtins.open", mock_open(read_data=os_release)):
-            with patch("pathlib.Path.exists", return_value=True):
-                result = _parse_os_release()
+''')
+        result = parse_os_release(str(os_release))
         
         assert result["NAME"] == "Ultramarine Linux"
         assert result["ID"] == "ultramarine"
     
-    def test_parse_bazzite(self):
-        os_release = '''NAME="Bazzite"
+    def test_parse_bazzite(self, tmp_path):
+        os_release = tmp_path / "os-release"
+        os_release.write_text('''NAME="Bazzite"
 VERSION_ID="40"
 ID=bazzite
 VARIANT_ID=bazzite
-'''
-        with patch("builtins.open", mock_open(read_data=os_release)):
-            with patch("pathlib.Path.exists", return_value=True):
-                result = _parse_os_release()
+''')
+        result = parse_os_release(str(os_release))
         
         assert result["ID"] == "bazzite"
     
-    def test_missing_file(self):
-        with patch("pathlib.Path.exists", return_value=False):
-            result = _parse_os_release()
+    def test_shell_quoting(self, tmp_path):
+        os_release = tmp_path / "os-release"
+        os_release.write_text(
+            '# comment line\n'
+            'PRETTY_NAME="Fedora Linux 40 (Workstation Edition)"\n'
+            "NAME='Pop!_OS'\n"
+            'ID_LIKE="rhel centos fedora"\n'
+            'VARIANT="Say \\"hi\\""\n'
+        )
+        result = parse_os_release(str(os_release))
+
+        assert result["PRETTY_NAME"] == "Fedora Linux 40 (Workstation Edition)"
+        assert result["NAME"] == "Pop!_OS"
+        assert result["ID_LIKE"] == "rhel centos fedora"
+        assert result["VARIANT"] == 'Say "hi"'
+        assert len(result) == 4
+
+    def test_unbalanced_quotes(self, tmp_path):
+        os_release = tmp_path / "os-release"
+        os_release.write_text('ID=fedora\nNAME="Broken\n')
+        result = parse_os_release(str(os_release))
+
+        assert result == {"ID": "fedora", "NAME": "Broken"}
+
+    def test_missing_file(self, tmp_path):
+        result = parse_os_release(str(tmp_path / "missing"))
         assert result == {}
 
+    def test_result_is_read_only(self, tmp_path):
+        os_release = tmp_path / "os-release"
+        os_release.write_text("ID=fedora\n")
+        result = parse_os_release(str(os_release))
+        with pytest.raises(TypeError):
+            result["ID"] = "ubuntu"
+        assert parse_os_release(str(os_release))["ID"] == "fedora"
+
+    def test_result_is_cached(self, tmp_path):
+        os_release = tmp_path / "os-release"
+        os_release.write_text("ID=fedora\n")
+        with patch("os.read", wraps=os.read) as mocked:
+            parse_os_release(str(os_release))
+            parse_os_release(str(os_release))
+        assert mocked.call_count == 1
+
 
 class TestCheckRpmOstreeDeployment:
     """Tests for _check_rpm_ostree_deployment()."""
     
-    def test_rpm_ostree_present(self):
+    def test_ostree_booted_marker(self):
         with patch("shutil.which", return_value="/usr/bin/rpm-ostree"):
-            with patch("subprocess.run") as mock_run:
-                mock_run.return_value = MagicMock(
-                    returncode=0,
-                    stdout=b'{"deployments": []}'
-                )
-                result = _check_rpm_ostree_deployment()
+            with patch("os.path.isfile", return_value=True):
+                with patch("subprocess.run") as mock_run:
+                    result = _check_rpm_ostree_deployment()
+        assert result is True
+        mock_run.assert_not_called()
+
+    def test_deploy_dir_without_subprocess(self):
+        with patch("os.path.isfile", return_value=False), patch("os.path.isdir", return_value=True):
+            with patch("shutil.which", return_value="/usr/bin/rpm-ostree"):
+                with patch("subprocess.run") as mock_run:
+                    result = _check_rpm_ostree_deployment()
+        assert result is True
+        mock_run.assert_not_called()
+
+    def test_rpm_ostree_present(self):
+        with patch("os.path.isfile", return_value=False), patch("os.path.isdir", return_value=True):
+            with patch("shutil.which", return_value="/usr/bin/rpm-ostree"):
+                with patch("subprocess.run") as mock_run:
+                    mock_run.return_value = MagicMock(
+                        returncode=0,
+                        stdout=b'{"deployments": []}'
+                    )
+                    result = _check_rpm_ostree_deployment(verify=True)
         assert result is True
     
     def test_rpm_ostree_not_installed(self):
-        with patch("shutil.which", return_value=None):
-            result = _check_rpm_ostree_deployment()
+        with patch("os.path.isdir", return_value=True):
+            with patch("shutil.which", return_value=None):
+                result = _check_rpm_ostree_deployment()
         assert result is False
     
     def test_rpm_ostree_no_deployment(self):
-        with patch("shutil.which", return_value="/usr/bin/rpm-ostree"):
-            with patch("subprocess.run") as mock_run:
-                mock_run.return_value = MagicMock(
-                    returncode=1,
-                    stdout=b''
-                )
-                result = _check_rpm_ostree_deployment()
+        with patch("os.path.isfile", return_value=False), patch("os.path.isdir", return_value=True):
+            with patch("shutil.which", return_value="/usr/bin/rpm-ostree"):
+                with patch("subprocess.run") as mock_run:
+                    mock_run.return_value = MagicMock(
+                        returncode=1,
+                        stdout=b''
+                    )
+                    result = _check_rpm_ostree_deployment(verify=True)
         assert result is False
 
+    def test_no_ostree_deploy_dir_skips_subprocess(self):
+        with patch("os.path.isfile", return_value=False), patch("os.path.isdir", return_value=False):
+            with patch("shutil.which", return_value="/usr/bin/rpm-ostree"):
+                with patch("subprocess.run") as mock_run:
+                    result = _check_rpm_ostree_deployment(verify=True)
+        assert result is False
+        mock_run.assert_not_called()
+
 
 class TestDetectBootMethod:
     """Tests for _detect_boot_method()."""
@@ -99,10 +177,16 @@ class TestDetectBootMethod:
         assert result == "rpm-ostree-kargs"
     
     def test_grub_system(self):
-        with patch("pathlib.Path.exists", return_value=True):
+        with patch("os.path.isfile", return_value=True):
             result = _detect_boot_method(is_immutable=False)
         assert result == "grub"
 
+    def test_systemd_boot_system(self):
+        with patch("os.path.isfile", return_value=False):
+            with patch("os.path.isdir", return_value=True):
+                result = _detect_boot_method(is_immutable=False)
+        assert result == "systemd-boot"
+
 
 class TestDetectPlatform:
     """Tests for detect_platform()."""
@@ -112,7 +196,7 @@ class TestDetectPlatform:
 VERSION_ID="40"
 ID=fedora
 '''
-        with patch("platforms.detection._parse_os_release") as mock_parse:
+        with patch("platforms.detection.parse_os_release") as mock_parse:
             mock_parse.return_value = {
                 "NAME": "Fedora Linux",
                 "VERSION_ID": "40",
@@ -120,7 +204,7 @@ ID=fedora
             }
             with patch("platforms.detection._check_rpm_ostree_deployment", return_value=False):
                 with patch("shutil.which", return_value=None):  # No ujust
-                    with patch("pathlib.Path.exists", return_value=True):  # Has grub
+                    with patch("os.path.isfile", return_value=True):  # Has grub
                         info = detect_platform()
         
         assert info.platform_type == PlatformType.FEDORA_TRADITIONAL
@@ -130,7 +214,7 @@ ID=fedora
         assert info.boot_method == "grub"
     
     def test_detect_ultramarine(self):
-        with patch("platforms.detection._parse_os_release") as mock_parse:
+        with patch("platforms.detection.parse_os_release") as mock_parse:
             mock_parse.return_value = {
                 "NAME": "Ultramarine Linux",
                 "VERSION_ID": "40",
@@ -138,7 +222,7 @@ ID=fedora
             }
             with patch("platforms.detection._check_rpm_ostree_deployment", return_value=False):
                 with patch("shutil.which", return_value=None):
-                    with patch("pathlib.Path.exists", return_value=True):
+                    with patch("os.path.isfile", return_value=True):
                         info = detect_platform()
         
         assert info.platform_type == PlatformType.FEDORA_TRADITIONAL
@@ -146,7 +230,7 @@ ID=fedora
         assert info.package_manager == "dnf"
     
     def test_detect_bazzite(self):
-        with patch("platforms.detection._parse_os_release") as mock_parse:
+        with patch("platforms.detection.parse_os_release") as mock_parse:
             mock_parse.return_value = {
                 "NAME": "Bazzite",
                 "VERSION_ID": "40",
@@ -164,7 +248,7 @@ ID=fedora
         assert info.boot_method == "rpm-ostree-kargs"
     
     def test_detect_silverblue(self):
-        with patch("platforms.detection._parse_os_release") as mock_parse:
+        with patch("platforms.detection.parse_os_release") as mock_parse:
             mock_parse.return_value = {
                 "NAME": "Fedora Linux",
                 "VERSION_ID": "40",
@@ -179,3 +263,53 @@ ID=fedora
         assert info.is_immutable is True
         assert info.has_ujust is False
         assert info.package_manager == "rpm-ostree"
+
+    def test_result_is_cached(self):
+        with patch("platforms.detection.parse_os_release", return_value={"ID": "fedora"}) as mock_parse:
+            with patch("platforms.detection._check_rpm_ostree_deployment", return_value=False):
+                first = detect_platform()
+                second = detect_platform()
+                lazy = detection.PLATFORM
+
+        assert first is second is lazy
+        assert mock_parse.call_count == 1
+
+
+class TestDetectionCache:
+    """Tests for memoized hardware detection."""
+
+    def test_detect_gpus_scans_once(self):
+        with patch("platforms.detection._detect_gpus_uncached", return_value=[]) as mock_scan:
+            detect_gpus()
+            detect_gpus()
+        assert mock_scan.call_count == 1
+
+    def test_detect_gpus_returns_fresh_list(self):
+        with patch("platforms.detection._detect_gpus_uncached", return_value=[]):
+            detect_gpus().append("mutated")
+            assert detect_gpus() == []
+
+    def test_cached_results_are_immutable(self):
+        with patch("platforms.detection.parse_os_release", return_value={"ID": "fedora"}):
+            with patch("platforms.detection._check_rpm_ostree_deployment", return_value=False):
+                info = detect_platform()
+        with pytest.raises(dataclasses.FrozenInstanceError):
+            info.is_immutable = True
+
+    def test_invalidate_forces_rescan(self):
+        with patch("platforms.detection._detect_gpus_uncached", return_value=[]) as mock_scan:
+            detect_gpus()
+            invalidate_detection_cache()
+            detect_gpus()
+        assert mock_scan.call_count == 2
+
+    def test_nvidia_capabilities_cached_for_primary_only(self):
+        with patch("platforms.detection._detect_nvidia_capabilities_uncached",
+                   return_value=None) as mock_detect:
+            with patch("platforms.detection.get_primary_gpu", return_value=None):
+                detect_nvidia_capabilities()
+                detect_nvidia_capabilities()
+                gpu = MagicMock()
+                detect_nvidia_capabilities(gpu)
+                detect_nvidia_capabilities(gpu)
+        assert mock_detect.call_count == 3
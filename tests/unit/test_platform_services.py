@@ -30,6 +30,15 @@ class TestPlatformServices:
         
         assert "Dnf" in type(services.package_manager).__name__
     
+    def test_dnf_package_manager_is_shared(self):
+        """Test that every PlatformServices gets the process-wide dnf manager."""
+        info = make_platform_info(PlatformType.FEDORA_TRADITIONAL, "dnf", "grub")
+        
+        first = PlatformServices(info).package_manager
+        second = PlatformServices(info).package_manager
+        
+        assert first is second
+    
     def test_fedora_traditional_returns_grub(self):
         """Test that Fedora traditional gets GrubKernelParams."""
         info = make_platform_info(PlatformType.FEDORA_TRADITIONAL, "dnf", "grub")
@@ -64,7 +73,7 @@ class TestPlatformServices:
         info = make_platform_info(PlatformType.DEBIAN_BASED, "apt", "grub")
         services = PlatformServices(info)
         
-        with pytest.raises(UnsupportedPlatformError):
+        with pytest.raises(UnsupportedPlatformError, match="apt package manager not yet implemented"):
             _ = services.package_manager
     
     def test_unsupported_boot_method_raises(self):
@@ -72,7 +81,7 @@ class TestPlatformServices:
         info = make_platform_info(PlatformType.UNKNOWN, "dnf", "systemd-boot")
         services = PlatformServices(info)
         
-        with pytest.raises(UnsupportedPlatformError):
+        with pytest.raises(UnsupportedPlatformError, match="systemd-boot not yet implemented"):
             _ = services.kernel_params
     
     def test_lazy_loading(self):
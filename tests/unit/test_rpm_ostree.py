@@ -0,0 +1,381 @@
+# TEAM_005: Unit tests for rpm-ostree implementations
+"""Tests for the platforms.immutable.rpm_ostree module."""
+
+import json
+import threading
+import time
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+from platforms.immutable import rpm_ostree
+from platforms.immutable.rpm_ostree import RpmOstreeKernelParams, RpmOstreePackageManager
+
+# The autouse fixture replaces which; keep the real one for its own test
+_real_which = rpm_ostree.which
+
+
+def status_result(deployments):
+    """Build a fake `rpm-ostree status --json` CompletedProcess."""
+    return MagicMock(returncode=0, stdout=json.dumps({"deployments": deployments}).encode())
+
+
+IDLE = [{"kernel-args": ["rhgb", "quiet"]}]
+
+
+@pytest.fixture(autouse=True)
+def clear_status_cache():
+    """The parsed status is cached per process; reset it around each test."""
+    rpm_ostree._invalidate_status_cache()
+    with patch.object(rpm_ostree, "_status_mtime", return_value=(1, None)):
+        with patch.object(rpm_ostree, "JEEPNEY_AVAILABLE", False):
+            # Keep commands comparable whether or not the tools are installed
+            with patch.object(rpm_ostree, "which", side_effect=lambda tool: tool):
+                yield
+    rpm_ostree._invalidate_status_cache()
+
+
+class TestStatusCache:
+    """Tests for the shared `rpm-ostree status --json` cache."""
+
+    def test_status_reused_between_calls(self):
+        """Readiness and pending-param checks share one status query."""
+        with patch("subprocess.run", return_value=status_result(IDLE)) as mock_run:
+            assert RpmOstreeKernelParams()._ensure_ready() is True
+            assert RpmOstreeKernelParams().get_pending_params() is None
+        mock_run.assert_called_once()
+
+    def test_status_refreshed_when_deployments_change(self):
+        """A changed /ostree/deploy mtime forces a new query."""
+        with patch("subprocess.run", return_value=status_result(IDLE)) as mock_run:
+            rpm_ostree._get_status_json()
+            with patch.object(rpm_ostree, "_status_mtime", return_value=(2, None)):
+                rpm_ostree._get_status_json()
+        assert mock_run.call_count == 2
+
+    def test_status_refreshed_after_max_age(self):
+        """A result older than max_age is not reused."""
+        with patch("subprocess.run", return_value=status_result(IDLE)) as mock_run:
+            rpm_ostree._get_status_json()
+            rpm_ostree._get_status_json(max_age=0)
+        assert mock_run.call_count == 2
+
+    def test_mutation_invalidates_status(self):
+        """Changing kernel args drops the cached status."""
+        with patch("subprocess.run", return_value=status_result(IDLE)) as mock_run:
+            kp = RpmOstreeKernelParams()
+            kp.remove_params(["nowatchdog"])
+            rpm_ostree._get_status_json()
+        # kargs --delete, status again
+        assert mock_run.call_count == 2
+
+    def test_idle_status_not_parsed(self):
+        """The readiness check skips JSON parsing when no transaction is listed."""
+        with patch("subprocess.run", return_value=status_result(IDLE)):
+            with patch.object(rpm_ostree, "_json_loads") as mock_loads:
+                assert rpm_ostree._status_idle() is True
+        mock_loads.assert_not_called()
+
+    def test_busy_status_parsed(self):
+        """A listed transaction key is confirmed against the parsed status."""
+        busy = status_result([{"transaction-in-progress": True}])
+        with patch("subprocess.run", return_value=busy):
+            assert rpm_ostree._status_idle() is False
+        rpm_ostree._invalidate_status_cache()
+        done = status_result([{"transaction-in-progress": False}])
+        with patch("subprocess.run", return_value=done):
+            assert rpm_ostree._status_idle() is True
+
+
+class TestDBusReadiness:
+    """Tests for the D-Bus ActiveTransaction readiness check."""
+
+    def test_idle_over_dbus_skips_status(self):
+        """A D-Bus answer avoids running `rpm-ostree status`."""
+        with patch.object(rpm_ostree, "_dbus_transaction_active", return_value=False):
+            with patch("subprocess.run") as mock_run:
+                assert rpm_ostree._status_idle() is True
+        mock_run.assert_not_called()
+
+    def test_busy_over_dbus(self):
+        with patch.object(rpm_ostree, "_dbus_transaction_active", return_value=True):
+            with patch("subprocess.run") as mock_run:
+                assert rpm_ostree._status_idle() is False
+        mock_run.assert_not_called()
+
+    def test_without_jeepney_falls_back(self):
+        """Without jeepney the status command is used."""
+        assert rpm_ostree._dbus_transaction_active() is None
+        with patch("subprocess.run", return_value=status_result(IDLE)) as mock_run:
+            assert rpm_ostree._status_idle() is True
+        mock_run.assert_called_once()
+
+
+class TestRunQuery:
+    """Tests for the read-only command helper."""
+
+    def test_spawns_absolute_path_without_closing_fds(self):
+        with patch.object(rpm_ostree, "which", return_value="/usr/bin/rpm"):
+            with patch("subprocess.run") as mock_run:
+                rpm_ostree._run_query(["rpm", "-q", "htop"], timeout=10)
+        assert mock_run.call_args[0][0] == ["/usr/bin/rpm", "-q", "htop"]
+        assert mock_run.call_args[1]["close_fds"] is False
+
+    def test_which_resolves_once(self):
+        """Tool paths are looked up on $PATH once per process."""
+        _real_which.cache_clear()
+        with patch("shutil.which", return_value="/usr/bin/rpm-ostree") as mock_which:
+            assert _real_which("rpm-ostree") == "/usr/bin/rpm-ostree"
+            assert _real_which("rpm-ostree") == "/usr/bin/rpm-ostree"
+        _real_which.cache_clear()
+        mock_which.assert_called_once_with("rpm-ostree")
+
+    def test_missing_tool_runs_by_name(self):
+        """A tool that is not on $PATH is still run by its bare name."""
+        with patch.object(rpm_ostree, "which", return_value=None):
+            with patch("subprocess.run") as mock_run:
+                rpm_ostree._run_query(["rpm", "-q", "htop"], timeout=10)
+        assert mock_run.call_args[0][0] == ["rpm", "-q", "htop"]
+
+    def test_captures_output(self):
+        result = rpm_ostree._run_query(["echo", "ready"], timeout=10)
+        assert result.returncode == 0
+        assert result.stdout == b"ready\n"
+
+
+class TestRpmOstreePackageManager:
+    """Tests for RpmOstreePackageManager."""
+
+    def test_install_runs_without_status_check(self):
+        """On an idle system install is a single rpm-ostree call."""
+        with patch("subprocess.run", return_value=MagicMock(returncode=0, stderr=b"")) as mock_run:
+            assert RpmOstreePackageManager().install(["htop"]) is True
+        mock_run.assert_called_once()
+        assert mock_run.call_args[0][0] == ["rpm-ostree", "install", "--idempotent", "htop"]
+
+    def test_install_waits_for_transaction(self):
+        """A busy daemon is waited out and the install retried once."""
+        busy = MagicMock(returncode=1, stderr=b"error: Transaction in progress: upgrade")
+        status_busy = status_result([{"transaction-in-progress": True}])
+        responses = [busy, status_busy, status_result(IDLE), MagicMock(returncode=0, stderr=b"")]
+        with patch("subprocess.run", side_effect=responses) as mock_run:
+            with patch.object(rpm_ostree, "_wait_for_transaction") as mock_wait:
+                with patch.object(rpm_ostree, "_status_mtime", side_effect=[(1, 1), (1, None)]):
+                    assert RpmOstreePackageManager().install(["htop"]) is True
+        mock_wait.assert_called_once()
+        assert mock_run.call_count == 4
+        assert mock_run.call_args[0][0] == ["rpm-ostree", "install", "--idempotent", "htop"]
+
+
+    def test_is_installed_cached(self):
+        """Repeat lookups of a package reuse the first rpm query."""
+        pm = RpmOstreePackageManager()
+        missing = MagicMock(returncode=1, stdout=b"package htop is not installed\n")
+        with patch("subprocess.run", return_value=missing) as mock_run:
+            assert pm.is_installed("htop") is False
+            assert pm.is_installed("htop") is False
+        mock_run.assert_called_once()
+
+    def test_is_installed_bulk_query_after_threshold(self):
+        """Many distinct lookups switch to one `rpm -qa` listing."""
+        pm = RpmOstreePackageManager()
+        single = MagicMock(returncode=0)
+        listing = MagicMock(returncode=0, stdout=b"mesa-dri-drivers\npipewire\n")
+        with patch("subprocess.run", side_effect=[single] * 3 + [listing]) as mock_run:
+            for package in ("a", "b", "c"):
+                pm.is_installed(package)
+            assert pm.is_installed("pipewire") is True
+            assert pm.is_installed("gamemode") is False
+        assert mock_run.call_count == 4
+        assert mock_run.call_args[0][0][1] == "-qa"
+
+    def test_install_already_layered(self):
+        """An "already requested" failure counts as success, in any case."""
+        result = MagicMock(returncode=1, stderr=b"error: Package htop is ALREADY requested")
+        with patch("subprocess.run", return_value=result):
+            assert RpmOstreePackageManager().install(["htop"]) is True
+
+    def test_remove_not_layered(self):
+        result = MagicMock(returncode=1, stderr=b"error: Package/capability 'htop' is not currently requested")
+        with patch("subprocess.run", return_value=result):
+            assert RpmOstreePackageManager().remove(["htop"]) is True
+
+    def test_is_installed_many_single_query(self):
+        """One rpm call answers every package, including multi-version ones."""
+        pm = RpmOstreePackageManager()
+        out = b"kernel\nkernel\npaquet gamemode n'est pas install\xc3\xa9\npipewire\n"
+        with patch("subprocess.run", return_value=MagicMock(returncode=1, stdout=out)) as mock_run:
+            result = pm.is_installed_many(["kernel", "gamemode", "pipewire"])
+            assert pm.is_installed("pipewire") is True
+        assert result == {"kernel": True, "gamemode": False, "pipewire": True}
+        mock_run.assert_called_once()
+        assert mock_run.call_args[0][0][-3:] == ["kernel", "gamemode", "pipewire"]
+
+    def test_install_stages_without_marking_installed(self):
+        """Layered packages are pending until reboot, not installed."""
+        pm = RpmOstreePackageManager()
+        ok = MagicMock(returncode=0, stderr=b"")
+        missing = MagicMock(returncode=1, stdout=b"package htop is not installed\n")
+        with patch("subprocess.run", side_effect=[ok, missing, ok]) as mock_run:
+            pm.install(["htop"])
+            assert pm.get_pending_packages() == ["htop"]
+            assert pm.is_installed("htop") is False
+            pm.remove(["htop"])
+        assert pm.get_pending_packages() == []
+        assert mock_run.call_count == 3
+
+
+class TestRunBatch:
+    """Tests for running async operations together."""
+
+    def test_results_in_order_and_transactions_serialized(self):
+        """Operations run concurrently but never overlap their rpm-ostree calls."""
+        active = []
+        overlapped = []
+
+        def run(cmd, **kwargs):
+            active.append(cmd)
+            overlapped.append(len(active) > 1)
+            time.sleep(0.05)
+            active.remove(cmd)
+            return MagicMock(returncode=0, stderr=b"")
+
+        kp, pm = RpmOstreeKernelParams(), RpmOstreePackageManager()
+        with patch.object(RpmOstreeKernelParams, "get_current_params", return_value=[]):
+            with patch("subprocess.run", side_effect=run) as mock_run:
+                results = rpm_ostree.run_batch(
+                    kp.append_params_async(["nowatchdog"]),
+                    pm.install_async(["htop"]),
+                )
+        assert results == [True, True]
+        assert mock_run.call_count == 2
+        assert not any(overlapped)
+
+    def test_busy_waits_overlap(self):
+        """Threads told the daemon is busy wait together, outside the lock."""
+        attempts = {}
+        waiting = []
+        peak = []
+
+        def run(cmd, **kwargs):
+            attempts[cmd[-1]] = attempts.get(cmd[-1], 0) + 1
+            if attempts[cmd[-1]] == 1:
+                return MagicMock(returncode=1, stderr=rpm_ostree._TRANSACTION_BUSY)
+            return MagicMock(returncode=0, stderr=b"")
+
+        def ensure_ready():
+            waiting.append(1)
+            time.sleep(0.1)
+            peak.append(len(waiting))
+            waiting.pop()
+            return True
+
+        with patch("subprocess.run", side_effect=run):
+            threads = [
+                threading.Thread(target=rpm_ostree._run_transaction,
+                                 args=(["rpm-ostree", "install", pkg], 10, ensure_ready))
+                for pkg in ("htop", "nvtop")
+            ]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        assert attempts == {"htop": 2, "nvtop": 2}
+        assert max(peak) == 2
+
+
+class TestWaitForTransaction:
+    """Tests for the event-driven transaction wait."""
+
+    def test_returns_on_transaction_file_removal(self, tmp_path):
+        """A removed transaction file wakes the waiter well before the timeout."""
+        if rpm_ostree._libc() is None:
+            pytest.skip("inotify not available")
+        transaction = tmp_path / "transaction"
+        transaction.write_text("busy")
+        threading.Timer(0.1, transaction.unlink).start()
+
+        with patch.object(rpm_ostree, "TRANSACTION_DIR", str(tmp_path)):
+            with patch.object(rpm_ostree, "TRANSACTION_FILE", str(transaction)):
+                start = time.monotonic()
+                rpm_ostree._wait_for_transaction(10)
+        assert time.monotonic() - start < 2
+
+    def test_waits_without_transaction_file(self, tmp_path):
+        """A busy daemon with no transaction file still waits between polls."""
+        if rpm_ostree._libc() is None:
+            pytest.skip("inotify not available")
+        with patch.object(rpm_ostree, "TRANSACTION_DIR", str(tmp_path)):
+            with patch.object(rpm_ostree, "TRANSACTION_FILE", str(tmp_path / "transaction")):
+                start = time.monotonic()
+                rpm_ostree._wait_for_transaction(0.3)
+        assert time.monotonic() - start >= 0.25
+
+    def test_falls_back_to_sleep_without_directory(self, tmp_path):
+        """Without /run/rpm-ostree the wait degrades to a short sleep."""
+        with patch.object(rpm_ostree, "TRANSACTION_DIR", str(tmp_path / "missing")):
+            with patch("time.sleep") as mock_sleep:
+                rpm_ostree._wait_for_transaction(30)
+        mock_sleep.assert_called_once_with(1.0)
+
+
+class TestRpmOstreeKernelParams:
+    """Tests for RpmOstreeKernelParams."""
+
+    def test_append_replaces_same_named_params(self):
+        """Same-named params are swapped; repeated untouched names survive."""
+        current = ["rhgb", "console=tty0", "console=ttyS0", "mitigations=auto"]
+        with patch("subprocess.run", return_value=MagicMock(returncode=0)) as mock_run:
+            with patch.object(RpmOstreeKernelParams, "_ensure_ready", return_value=True):
+                with patch.object(RpmOstreeKernelParams, "get_current_params", return_value=current):
+                    result = RpmOstreeKernelParams().append_params(["mitigations=off", "rhgb"])
+
+        assert result is True
+        assert mock_run.call_args[0][0] == [
+            "rpm-ostree", "kargs",
+            "--delete-if-present=mitigations=auto",
+            "--append-if-missing=mitigations=off",
+        ]
+
+    def test_append_noop_when_present(self):
+        """Nothing is run when every param is already set."""
+        with patch("subprocess.run") as mock_run:
+            with patch.object(RpmOstreeKernelParams, "_ensure_ready", return_value=True):
+                with patch.object(RpmOstreeKernelParams, "get_current_params", return_value=["quiet"]):
+                    assert RpmOstreeKernelParams().append_params(["quiet"]) is True
+        mock_run.assert_not_called()
+
+    def test_remove_skips_absent_params(self):
+        """Nothing is run when none of the params are set."""
+        with patch("subprocess.run") as mock_run:
+            with patch.object(RpmOstreeKernelParams, "get_current_params", return_value=["quiet"]):
+                assert RpmOstreeKernelParams().remove_params(["nowatchdog", "mitigations"]) is True
+        mock_run.assert_not_called()
+
+    def test_remove_only_present_params(self):
+        """Absent params are dropped; names match valued params."""
+        with patch("subprocess.run", return_value=MagicMock(returncode=0)) as mock_run:
+            with patch.object(RpmOstreeKernelParams, "get_current_params",
+                              return_value=["quiet", "mitigations=off"]):
+                RpmOstreeKernelParams().remove_params(["nowatchdog", "mitigations"])
+        assert mock_run.call_args[0][0] == ["rpm-ostree", "kargs", "--delete=mitigations"]
+
+    def test_replace_noop_when_already_set(self):
+        with patch("subprocess.run") as mock_run:
+            with patch.object(RpmOstreeKernelParams, "get_current_params",
+                              return_value=["quiet", "mitigations=off"]):
+                assert RpmOstreeKernelParams().replace_param("mitigations=auto", "mitigations=off") is True
+        mock_run.assert_not_called()
+
+    def test_current_params_cached_until_changed(self):
+        """Kernel args are read once and re-read after a change."""
+        kargs = MagicMock(returncode=0, stdout=b"rhgb quiet\n")
+        with patch("subprocess.run", return_value=kargs) as mock_run:
+            kp = RpmOstreeKernelParams()
+            assert kp.get_current_params() == ["rhgb", "quiet"]
+            assert kp.get_current_params() == ["rhgb", "quiet"]
+            assert mock_run.call_count == 1
+            kp.remove_params(["quiet"])
+            kp.get_current_params()
+        # kargs, kargs --delete, kargs
+        assert mock_run.call_count == 3
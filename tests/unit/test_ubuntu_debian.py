@@ -0,0 +1,105 @@
+"""Tests for the platform_support.ubuntu_debian module."""
+
+import subprocess
+
+import pytest
+from unittest.mock import patch, MagicMock
+
+from platform_support.sysfs import SysfsWriter
+from platform_support.ubuntu_debian import PPAManager, UbuntuDebianOptimizer
+
+
+TUNING_STEPS = ("_optimize_kernel_parameters", "_optimize_cpu_governor", "_optimize_io_scheduler")
+
+
+@pytest.fixture
+def optimizer():
+    return UbuntuDebianOptimizer()
+
+
+def block_devices(*names):
+    """A fake os.scandir('/sys/block') listing the given device names."""
+    entries = []
+    for name in names:
+        entry = MagicMock()
+        entry.name = name
+        entries.append(entry)
+    scandir = MagicMock()
+    scandir.return_value.__enter__.return_value = entries
+    return scandir
+
+
+class TestApplyGamingOptimizations:
+    """Tests for UbuntuDebianOptimizer.apply_gaming_optimizations."""
+
+    def test_failed_sudo_runs_no_step(self, optimizer):
+        """A failed `sudo -v` returns False before any tuning or apt step."""
+        steps = {name: MagicMock(return_value=True) for name in TUNING_STEPS + ("_install_gaming_tools",)}
+        with patch.multiple(optimizer, **steps):
+            with patch("subprocess.run", side_effect=subprocess.CalledProcessError(1, "sudo")) as mock_run:
+                assert optimizer.apply_gaming_optimizations() is False
+
+        mock_run.assert_called_once()
+        assert mock_run.call_args[0][0] == ["sudo", "-v"]
+        for step in steps.values():
+            step.assert_not_called()
+
+    def test_apt_runs_after_tuning_steps(self, optimizer):
+        """The apt install starts only once every tuning step has finished."""
+        order = []
+        steps = {name: MagicMock(side_effect=lambda name=name: order.append(name) or True)
+                 for name in TUNING_STEPS + ("_install_gaming_tools",)}
+        with patch.multiple(optimizer, **steps):
+            with patch("subprocess.run"):
+                assert optimizer.apply_gaming_optimizations() is True
+
+        assert sorted(order[:3]) == sorted(TUNING_STEPS)
+        assert order[3] == "_install_gaming_tools"
+
+
+class TestTuningSteps:
+    """Tests for the individual tuning steps."""
+
+    def test_kernel_parameters_single_sysctl(self, optimizer):
+        """Every sysctl assignment goes into one `sysctl -w` call."""
+        with patch("subprocess.run") as mock_run:
+            assert optimizer._optimize_kernel_parameters() is True
+
+        mock_run.assert_called_once()
+        assert mock_run.call_args[0][0] == [
+            "sudo", "sysctl", "-w",
+            "vm.swappiness=10",
+            "vm.vfs_cache_pressure=50",
+            "kernel.sched_migration_cost_ns=5000000",
+            "kernel.sched_min_granularity_ns=10000000",
+        ]
+
+    def test_io_scheduler_single_sudo_tee(self, optimizer):
+        """Without root, one `sudo tee` sets every NVMe scheduler."""
+        with patch("os.scandir", block_devices("nvme0n1", "sda", "nvme1n1")), \
+                patch("os.path.exists", return_value=True), \
+                patch.object(SysfsWriter, "available", return_value=False), \
+                patch("subprocess.run") as mock_run:
+            assert optimizer._optimize_io_scheduler() is True
+
+        mock_run.assert_called_once()
+        assert mock_run.call_args[0][0] == [
+            "sudo", "tee",
+            "/sys/block/nvme0n1/queue/scheduler",
+            "/sys/block/nvme1n1/queue/scheduler",
+        ]
+        assert mock_run.call_args[1]["input"] == b"none"
+
+
+class TestPPAManager:
+    """Tests for PPAManager."""
+
+    def test_gaming_ppas_update_once(self):
+        """Adding the gaming PPAs refreshes the package index a single time."""
+        with patch("subprocess.run") as mock_run:
+            assert PPAManager().add_gaming_ppas() is True
+
+        commands = [c[0][0] for c in mock_run.call_args_list]
+        assert commands.count(["sudo", "apt", "update"]) == 1
+        assert sum(cmd[1] == "add-apt-repository" for cmd in commands) == 2
+        assert commands[-1] == ["sudo", "apt", "update"]